@@ -0,0 +1,44 @@
+"""Add import_jobs table
+
+Revision ID: 004
+Revises: 003
+Create Date: 2026-10-17
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = '004'
+down_revision: Union[str, None] = '003'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'import_jobs',
+        sa.Column('id', sa.String(36), primary_key=True),
+        sa.Column('organization_id', sa.String(36), sa.ForeignKey('organizations.id'), nullable=False),
+        sa.Column('store_id', sa.String(36), sa.ForeignKey('stores.id'), nullable=True),
+        sa.Column('user_id', sa.String(36), sa.ForeignKey('users.id'), nullable=False),
+        sa.Column('filename', sa.String(255), nullable=True),
+        sa.Column('status', sa.String(20), nullable=False, server_default='queued'),
+        sa.Column('rows_total', sa.Integer(), nullable=True),
+        sa.Column('rows_processed', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('record_count', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('skip_count', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('issue_count', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('error', sa.Text(), nullable=True),
+        sa.Column('created_at', sa.DateTime(timezone=True), nullable=False, server_default=sa.func.now()),
+        sa.Column('started_at', sa.DateTime(timezone=True), nullable=True),
+        sa.Column('finished_at', sa.DateTime(timezone=True), nullable=True),
+    )
+    op.create_index('ix_import_jobs_org_created', 'import_jobs', ['organization_id', 'created_at'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_import_jobs_org_created', table_name='import_jobs')
+    op.drop_table('import_jobs')
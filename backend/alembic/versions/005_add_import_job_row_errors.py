@@ -0,0 +1,28 @@
+"""Add row error columns to import_jobs
+
+Revision ID: 005
+Revises: 004
+Create Date: 2026-10-17
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = '005'
+down_revision: Union[str, None] = '004'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('import_jobs', sa.Column('error_count', sa.Integer(), nullable=False, server_default='0'))
+    op.add_column('import_jobs', sa.Column('row_errors', sa.JSON(), nullable=False, server_default='[]'))
+
+
+def downgrade() -> None:
+    with op.batch_alter_table('import_jobs') as batch_op:
+        batch_op.drop_column('row_errors')
+        batch_op.drop_column('error_count')
@@ -0,0 +1,78 @@
+"""Denormalize organization, store, employee and date onto issues
+
+Revision ID: 006
+Revises: 005
+Create Date: 2026-10-17
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = '006'
+down_revision: Union[str, None] = '005'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    with op.batch_alter_table('issues') as batch_op:
+        batch_op.add_column(sa.Column('organization_id', sa.String(36), nullable=True))
+        batch_op.add_column(sa.Column('store_id', sa.String(36), nullable=True))
+        batch_op.add_column(sa.Column('employee_id', sa.String(36), nullable=True))
+        batch_op.add_column(sa.Column('date', sa.Date(), nullable=True))
+
+    # 既存データを勤怠レコード・従業員から埋める
+    op.execute(sa.text("""
+        UPDATE issues SET
+            employee_id = (
+                SELECT ar.employee_id FROM attendance_records ar
+                WHERE ar.id = issues.attendance_record_id
+            ),
+            date = (
+                SELECT ar.date FROM attendance_records ar
+                WHERE ar.id = issues.attendance_record_id
+            ),
+            organization_id = (
+                SELECT e.organization_id FROM attendance_records ar
+                JOIN employees e ON e.id = ar.employee_id
+                WHERE ar.id = issues.attendance_record_id
+            ),
+            store_id = (
+                SELECT e.store_id FROM attendance_records ar
+                JOIN employees e ON e.id = ar.employee_id
+                WHERE ar.id = issues.attendance_record_id
+            )
+    """))
+
+    with op.batch_alter_table('issues') as batch_op:
+        batch_op.alter_column('organization_id', existing_type=sa.String(36), nullable=False)
+        batch_op.alter_column('store_id', existing_type=sa.String(36), nullable=False)
+        batch_op.alter_column('employee_id', existing_type=sa.String(36), nullable=False)
+        batch_op.alter_column('date', existing_type=sa.Date(), nullable=False)
+        batch_op.create_foreign_key('fk_issues_organization_id', 'organizations', ['organization_id'], ['id'])
+        batch_op.create_foreign_key('fk_issues_store_id', 'stores', ['store_id'], ['id'])
+        batch_op.create_foreign_key('fk_issues_employee_id', 'employees', ['employee_id'], ['id'])
+
+    op.create_index('ix_issues_org_detected', 'issues', ['organization_id', sa.text('detected_at DESC')])
+    op.create_index('ix_issues_org_status_detected', 'issues', ['organization_id', 'status', sa.text('detected_at DESC')])
+    op.create_index('ix_issues_org_store_date', 'issues', ['organization_id', 'store_id', 'date'])
+    op.create_index('ix_issues_employee_date', 'issues', ['employee_id', 'date'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_issues_employee_date', table_name='issues')
+    op.drop_index('ix_issues_org_store_date', table_name='issues')
+    op.drop_index('ix_issues_org_status_detected', table_name='issues')
+    op.drop_index('ix_issues_org_detected', table_name='issues')
+
+    with op.batch_alter_table('issues') as batch_op:
+        batch_op.drop_constraint('fk_issues_employee_id', type_='foreignkey')
+        batch_op.drop_constraint('fk_issues_store_id', type_='foreignkey')
+        batch_op.drop_constraint('fk_issues_organization_id', type_='foreignkey')
+        batch_op.drop_column('date')
+        batch_op.drop_column('employee_id')
+        batch_op.drop_column('store_id')
+        batch_op.drop_column('organization_id')
@@ -0,0 +1,35 @@
+"""Add id to issue list indexes for keyset pagination
+
+Revision ID: 007
+Revises: 006
+Create Date: 2026-10-17
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = '007'
+down_revision: Union[str, None] = '006'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # 一覧は (detected_at, id) の降順で並べるため、id まで含めて索引順と一致させる
+    op.drop_index('ix_issues_org_status_detected', table_name='issues')
+    op.drop_index('ix_issues_org_detected', table_name='issues')
+    op.create_index('ix_issues_org_detected', 'issues', ['organization_id', sa.text('detected_at DESC'), sa.text('id DESC')])
+    op.create_index(
+        'ix_issues_org_status_detected', 'issues',
+        ['organization_id', 'status', sa.text('detected_at DESC'), sa.text('id DESC')],
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_issues_org_status_detected', table_name='issues')
+    op.drop_index('ix_issues_org_detected', table_name='issues')
+    op.create_index('ix_issues_org_detected', 'issues', ['organization_id', sa.text('detected_at DESC')])
+    op.create_index('ix_issues_org_status_detected', 'issues', ['organization_id', 'status', sa.text('detected_at DESC')])
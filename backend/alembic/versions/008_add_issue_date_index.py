@@ -0,0 +1,24 @@
+"""Add (organization_id, date) index on issues
+
+Revision ID: 008
+Revises: 007
+Create Date: 2026-10-17
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = '008'
+down_revision: Union[str, None] = '007'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index('ix_issues_org_date', 'issues', ['organization_id', 'date'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_issues_org_date', table_name='issues')
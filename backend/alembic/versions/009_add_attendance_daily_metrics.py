@@ -0,0 +1,44 @@
+"""Add attendance_daily_metrics table
+
+Revision ID: 009
+Revises: 008
+Create Date: 2026-10-17
+
+既存の勤怠レコードの集計値は 012 で作成する。
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = '009'
+down_revision: Union[str, None] = '008'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'attendance_daily_metrics',
+        sa.Column('attendance_record_id', sa.String(36), sa.ForeignKey('attendance_records.id'), primary_key=True),
+        sa.Column('organization_id', sa.String(36), sa.ForeignKey('organizations.id'), nullable=False),
+        sa.Column('store_id', sa.String(36), sa.ForeignKey('stores.id'), nullable=False),
+        sa.Column('employee_id', sa.String(36), sa.ForeignKey('employees.id'), nullable=False),
+        sa.Column('date', sa.Date(), nullable=False),
+        sa.Column('worked_minutes', sa.Integer(), nullable=True),
+        sa.Column('break_minutes', sa.Integer(), nullable=True),
+        sa.Column('night_minutes', sa.Integer(), nullable=True),
+        sa.Column('overtime_minutes', sa.Integer(), nullable=True),
+        sa.Column('computed_at', sa.DateTime(timezone=True)),
+    )
+    op.create_index('ix_daily_metrics_org_store_date', 'attendance_daily_metrics', ['organization_id', 'store_id', 'date'])
+    op.create_index('ix_daily_metrics_org_date', 'attendance_daily_metrics', ['organization_id', 'date'])
+    op.create_index('ix_daily_metrics_employee_date', 'attendance_daily_metrics', ['employee_id', 'date'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_daily_metrics_employee_date', table_name='attendance_daily_metrics')
+    op.drop_index('ix_daily_metrics_org_date', table_name='attendance_daily_metrics')
+    op.drop_index('ix_daily_metrics_org_store_date', table_name='attendance_daily_metrics')
+    op.drop_table('attendance_daily_metrics')
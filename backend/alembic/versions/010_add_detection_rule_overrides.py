@@ -0,0 +1,37 @@
+"""Add detection_rule_overrides table
+
+Revision ID: 010
+Revises: 009
+Create Date: 2026-10-17
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = '010'
+down_revision: Union[str, None] = '009'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'detection_rule_overrides',
+        sa.Column('id', sa.String(36), primary_key=True),
+        sa.Column('organization_id', sa.String(36), sa.ForeignKey('organizations.id'), nullable=False),
+        sa.Column('store_id', sa.String(36), sa.ForeignKey('stores.id'), nullable=True),
+        sa.Column('work_type', sa.String(20), nullable=True),
+        sa.Column('break_minutes_6h', sa.Integer(), nullable=True),
+        sa.Column('break_minutes_8h', sa.Integer(), nullable=True),
+        sa.Column('daily_work_hours_alert', sa.Integer(), nullable=True),
+        sa.Column('created_at', sa.DateTime()),
+        sa.Column('updated_at', sa.DateTime()),
+    )
+    op.create_index('ix_rule_overrides_org', 'detection_rule_overrides', ['organization_id'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_rule_overrides_org', table_name='detection_rule_overrides')
+    op.drop_table('detection_rule_overrides')
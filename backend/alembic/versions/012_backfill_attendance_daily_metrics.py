@@ -0,0 +1,168 @@
+"""Backfill attendance_daily_metrics for existing attendance records
+
+Revision ID: 012
+Revises: 011
+Create Date: 2026-10-17
+
+009 で作成した日次集計は取り込み時にしか登録されないため、それ以前の
+勤怠レコードの集計値をここで作成する（集計のないレコードのみ。再実行しても重複しない）。
+深夜時間帯は組織の検知ルール（未設定なら既定値）を使う。
+既存データに対する複数日ルール（週40時間・36協定など）の異常は
+scripts/rebuild_attendance_metrics.py で作成する。
+
+アプリケーションのコードが後で変わっても結果が変わらないよう、集計の計算
+（services/attendance_metrics.compute_daily_metrics の作成時点の内容）と
+深夜時間帯の既定値はこのファイルに固定している。
+"""
+from datetime import datetime, time, timezone
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = '012'
+down_revision: Union[str, None] = '011'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+BATCH_SIZE = 5000
+
+DAY_SECONDS = 24 * 3600
+LEGAL_DAILY_MINUTES = 8 * 60  # これを超えた実労働を時間外とする
+DEFAULT_NIGHT_START_HOUR = 22
+DEFAULT_NIGHT_END_HOUR = 5
+
+attendance_records = sa.table(
+    'attendance_records',
+    sa.column('id', sa.String),
+    sa.column('employee_id', sa.String),
+    sa.column('date', sa.Date),
+    sa.column('clock_in', sa.Time),
+    sa.column('clock_out', sa.Time),
+    sa.column('break_minutes', sa.Integer),
+)
+employees = sa.table(
+    'employees',
+    sa.column('id', sa.String),
+    sa.column('organization_id', sa.String),
+    sa.column('store_id', sa.String),
+)
+detection_rules = sa.table(
+    'detection_rules',
+    sa.column('organization_id', sa.String),
+    sa.column('night_start_hour', sa.Integer),
+    sa.column('night_end_hour', sa.Integer),
+)
+metrics = sa.table(
+    'attendance_daily_metrics',
+    sa.column('attendance_record_id', sa.String),
+    sa.column('organization_id', sa.String),
+    sa.column('store_id', sa.String),
+    sa.column('employee_id', sa.String),
+    sa.column('date', sa.Date),
+    sa.column('worked_minutes', sa.Integer),
+    sa.column('break_minutes', sa.Integer),
+    sa.column('night_minutes', sa.Integer),
+    sa.column('overtime_minutes', sa.Integer),
+    sa.column('computed_at', sa.DateTime(timezone=True)),
+)
+
+
+def _seconds(t: time) -> int:
+    return t.hour * 3600 + t.minute * 60 + t.second
+
+
+def _daily_metrics(
+    clock_in: time | None,
+    clock_out: time | None,
+    break_minutes: int | None,
+    night_start_hour: int,
+    night_end_hour: int,
+) -> dict:
+    """1レコードの日次集計（打刻欠損の場合は実労働・深夜・時間外を NULL）"""
+    values = {
+        "worked_minutes": None,
+        "break_minutes": break_minutes,
+        "night_minutes": None,
+        "overtime_minutes": None,
+    }
+    if clock_in is None or clock_out is None:
+        return values
+
+    # 退勤が出勤より前なら翌日退勤
+    start, end = _seconds(clock_in), _seconds(clock_out)
+    if end < start:
+        end += DAY_SECONDS
+    worked = max((end - start) // 60 - (break_minutes or 0), 0)
+
+    # 深夜帯（終了が開始以前なら翌日まで）の前日・当日・翌日分との重なり
+    band_start, band_end = night_start_hour * 3600, night_end_hour * 3600
+    if band_end <= band_start:
+        band_end += DAY_SECONDS
+    night = sum(
+        max(min(end, band_end + offset) - max(start, band_start + offset), 0)
+        for offset in (-DAY_SECONDS, 0, DAY_SECONDS)
+    )
+
+    values.update(
+        worked_minutes=worked,
+        night_minutes=night // 60,
+        overtime_minutes=max(worked - LEGAL_DAILY_MINUTES, 0),
+    )
+    return values
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    night_hours = {
+        organization_id: (start, end)
+        for organization_id, start, end in bind.execute(sa.select(
+            detection_rules.c.organization_id, detection_rules.c.night_start_hour, detection_rules.c.night_end_hour,
+        ))
+    }
+    default_hours = (DEFAULT_NIGHT_START_HOUR, DEFAULT_NIGHT_END_HOUR)
+
+    organization_ids = bind.execute(sa.select(employees.c.organization_id).distinct()).scalars().all()
+    for organization_id in organization_ids:
+        night_start_hour, night_end_hour = night_hours.get(organization_id, default_hours)
+        while True:
+            # 登録済みの行は条件から外れるため、毎回先頭から読めばよい
+            rows = bind.execute(
+                sa.select(
+                    attendance_records.c.id,
+                    attendance_records.c.employee_id,
+                    employees.c.store_id,
+                    attendance_records.c.date,
+                    attendance_records.c.clock_in,
+                    attendance_records.c.clock_out,
+                    attendance_records.c.break_minutes,
+                )
+                .join(employees, employees.c.id == attendance_records.c.employee_id)
+                .where(
+                    employees.c.organization_id == organization_id,
+                    ~sa.exists().where(metrics.c.attendance_record_id == attendance_records.c.id),
+                )
+                .limit(BATCH_SIZE)
+            ).all()
+            if not rows:
+                break
+
+            computed_at = datetime.now(timezone.utc)
+            bind.execute(metrics.insert(), [
+                {
+                    "attendance_record_id": record_id,
+                    "organization_id": organization_id,
+                    "store_id": store_id,
+                    "employee_id": employee_id,
+                    "date": record_date,
+                    **_daily_metrics(clock_in, clock_out, break_minutes, night_start_hour, night_end_hour),
+                    "computed_at": computed_at,
+                }
+                for record_id, employee_id, store_id, record_date, clock_in, clock_out, break_minutes in rows
+            ])
+
+
+def downgrade() -> None:
+    # 集計は勤怠レコードから再計算できるため、バックフィル分だけを区別して削除はしない
+    pass
@@ -0,0 +1,51 @@
+"""Add redetection_jobs table
+
+Revision ID: 014
+Revises: 013
+Create Date: 2026-10-17
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = '014'
+down_revision: Union[str, None] = '013'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'redetection_jobs',
+        sa.Column('id', sa.String(36), primary_key=True),
+        sa.Column('organization_id', sa.String(36), sa.ForeignKey('organizations.id'), nullable=False),
+        sa.Column('user_id', sa.String(36), sa.ForeignKey('users.id'), nullable=False),
+        sa.Column('rules', sa.JSON(), nullable=False),
+        sa.Column('issue_types', sa.JSON(), nullable=False),
+        sa.Column('date_from', sa.Date(), nullable=True),
+        sa.Column('date_to', sa.Date(), nullable=True),
+        sa.Column('rebuild_metrics', sa.Boolean(), nullable=False, server_default=sa.false()),
+        sa.Column('status', sa.String(20), nullable=False, server_default='queued'),
+        sa.Column('employees_total', sa.Integer(), nullable=True),
+        sa.Column('employees_processed', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('record_count', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('metrics_count', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('created_count', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('updated_count', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('closed_count', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('reopened_count', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('kept_count', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('error', sa.Text(), nullable=True),
+        sa.Column('created_at', sa.DateTime(timezone=True), nullable=False, server_default=sa.func.now()),
+        sa.Column('started_at', sa.DateTime(timezone=True), nullable=True),
+        sa.Column('finished_at', sa.DateTime(timezone=True), nullable=True),
+    )
+    op.create_index('ix_redetection_jobs_org_created', 'redetection_jobs', ['organization_id', 'created_at'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_redetection_jobs_org_created', table_name='redetection_jobs')
+    op.drop_table('redetection_jobs')
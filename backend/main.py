@@ -11,6 +11,7 @@ from fastapi.responses import JSONResponse
 
 from src.config import settings
 from src.api import api_router
+from src.services import import_jobs, redetection, render_pool
 
 logger = logging.getLogger(__name__)
 
@@ -34,9 +35,14 @@ async def lifespan(app: FastAPI):
     """アプリケーションライフサイクル"""
     # 起動時
     print(f"Starting {settings.app_name}...")
+    import_jobs.start_workers()
+    redetection.start_worker()
     yield
     # 終了時
     print("Shutting down...")
+    await import_jobs.stop_workers()
+    await redetection.stop_worker()
+    render_pool.shutdown()
 
 
 # FastAPI アプリケーション
@@ -78,7 +84,7 @@ app.include_router(api_router, prefix="/api")
 @app.get("/api/health")
 async def health_check():
     """ヘルスチェック"""
-    return {"status": "healthy", "app": settings.app_name}
+    return {"status": "healthy", "app": settings.app_name, "render_pool": render_pool.stats()}
 
 
 if __name__ == "__main__":
@@ -0,0 +1,88 @@
+"""起動時の import 時間のベンチマーク
+
+`python -X importtime -c "import main"` を別プロセスで実行し、アプリ全体の
+import 時間と時間のかかったモジュールを表示する。次の場合は終了コード 1 を返すため、
+デプロイ前のチェックとして使える。
+  - 起動時に読み込まない前提の重いモジュール（pandas / numpy / chardet / reportlab）が読み込まれた
+  - import 時間の中央値が --budget-ms を超えた
+
+Usage:
+    cd backend && source venv/bin/activate
+    python scripts/bench_import_time.py [--repeat 5] [--top 15] [--budget-ms 1500]
+"""
+
+import argparse
+import os
+import re
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+# 初回利用時に遅延 import する前提のモジュール
+LAZY_MODULES = ("pandas", "numpy", "chardet", "reportlab")
+
+_LINE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)$")
+
+
+def run_importtime() -> list[tuple[str, int, int]]:
+    """-X importtime の結果を (モジュール名, 累積μs, 深さ) のリストで返す"""
+    env = dict(os.environ)
+    if not env.get("JWT_SECRET_KEY"):
+        env.setdefault("DEBUG", "true")
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import main"],
+        cwd=BACKEND_DIR,
+        env=env,
+        capture_output=True,
+        text=True,
+    )
+    if proc.returncode != 0:
+        sys.exit(f"import main に失敗しました:\n{proc.stderr}")
+
+    modules = []
+    for line in proc.stderr.splitlines():
+        match = _LINE.match(line)
+        if match:
+            _, cumulative, indent, name = match.groups()
+            modules.append((name, int(cumulative), len(indent) // 2))
+    return modules
+
+
+def main(args: argparse.Namespace) -> int:
+    totals = []
+    modules: list[tuple[str, int, int]] = []
+    for _ in range(args.repeat):
+        modules = run_importtime()
+        totals.append(next(cumulative for name, cumulative, _ in modules if name == "main") / 1000)
+    total_ms = statistics.median(totals)
+
+    print(f"import main: {total_ms:.0f} ms (median of {args.repeat}, budget {args.budget_ms} ms)")
+    print(f"  {'cumulative':>10}  module")
+    # main 直下（深さ1〜2）の時間がかかったモジュール
+    for name, cumulative, depth in sorted(
+        (m for m in modules if 1 <= m[2] <= 2), key=lambda m: m[1], reverse=True
+    )[:args.top]:
+        print(f"  {cumulative / 1000:8.1f}ms  {'  ' * (depth - 1)}{name}")
+
+    failed = False
+    loaded = sorted({name.split(".")[0] for name, _, _ in modules} & set(LAZY_MODULES))
+    if loaded:
+        print(f"NG: 起動時に読み込まれています: {', '.join(loaded)}")
+        failed = True
+    if total_ms > args.budget_ms:
+        print(f"NG: import 時間が上限を超えています（{total_ms:.0f} ms > {args.budget_ms} ms）")
+        failed = True
+    if not failed:
+        print("OK")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--top", type=int, default=15, help="表示するモジュール数")
+    parser.add_argument("--budget-ms", type=int, default=1500, help="import 時間の上限（中央値）")
+    sys.exit(main(parser.parse_args()))
@@ -0,0 +1,149 @@
+"""異常一覧クエリのベンチマーク
+
+一時SQLiteに異常データ（対応ログ付き）を生成し、1ページあたりの処理時間と
+メモリ確保量を比較する。
+  - before: 旧実装（Issue → 勤怠 → 従業員 → 店舗 と Issue → ログ → ユーザー の joinedload）
+  - after:  現行の list_issues（カラム射影 + ログの一括取得）
+
+Usage:
+    cd backend && source venv/bin/activate
+    PYTHONPATH=. python scripts/bench_issue_list.py [--issues 20000] [--logs 5] [--page-size 50]
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import tempfile
+import time
+import tracemalloc
+import uuid
+from datetime import date, datetime, time as dtime, timedelta, timezone
+
+from sqlalchemy import insert, select
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine, async_sessionmaker
+from sqlalchemy.orm import joinedload
+
+from src.core.database import Base
+import src.models  # noqa: F401  全テーブルを登録
+from src.models.store import Organization, Store
+from src.models.user import User, UserRole
+from src.models.employee import Employee
+from src.models.attendance import AttendanceRecord
+from src.models.issue import Issue, IssueLog
+from src.api.issues import list_issues, build_issue_response
+
+
+async def seed(session: AsyncSession, issue_count: int, logs_per_issue: int) -> User:
+    """ベンチマーク用データを生成"""
+    org_id, store_id, user_id = str(uuid.uuid4()), str(uuid.uuid4()), str(uuid.uuid4())
+    session.add(Organization(id=org_id, name="bench"))
+    session.add(Store(id=store_id, organization_id=org_id, code="B1", name="ベンチ店"))
+    user = User(id=user_id, organization_id=org_id, email="bench@example.com", password_hash="x", name="bench", role=UserRole.ADMIN.value)
+    session.add(user)
+
+    employees = [
+        {"id": str(uuid.uuid4()), "organization_id": org_id, "store_id": store_id, "employee_code": f"E{i:04d}", "name": f"従業員{i}"}
+        for i in range(100)
+    ]
+    await session.execute(insert(Employee), employees)
+
+    start = date(2026, 1, 1)
+    detected = datetime(2026, 2, 1, tzinfo=timezone.utc)
+    records, issues, logs = [], [], []
+    for i in range(issue_count):
+        emp = employees[i % len(employees)]
+        record_id, issue_id = str(uuid.uuid4()), str(uuid.uuid4())
+        d = start + timedelta(days=i // len(employees))
+        records.append({
+            "id": record_id, "employee_id": emp["id"], "date": d,
+            "clock_in": dtime(9, 0), "clock_out": dtime(20, 0), "break_minutes": 30,
+        })
+        issues.append({
+            "id": issue_id, "attendance_record_id": record_id, "organization_id": org_id,
+            "store_id": store_id, "employee_id": emp["id"], "date": d,
+            "type": "overtime", "severity": "medium", "rule_description": "日次勤務時間が10時間を超えています",
+            "detected_at": detected + timedelta(seconds=i),
+        })
+        logs.extend(
+            {"id": str(uuid.uuid4()), "issue_id": issue_id, "user_id": user_id, "action": "memo", "memo": "確認済み"}
+            for _ in range(logs_per_issue)
+        )
+    await session.execute(insert(AttendanceRecord), records)
+    await session.execute(insert(Issue), issues)
+    if logs:
+        await session.execute(insert(IssueLog), logs)
+    await session.commit()
+    return user
+
+
+async def legacy_page(session: AsyncSession, user: User, page: int, page_size: int) -> list:
+    """旧実装のページ取得（比較用）"""
+    query = (
+        select(Issue)
+        .where(Issue.organization_id == user.organization_id)
+        .options(
+            joinedload(Issue.attendance_record).joinedload(AttendanceRecord.employee).joinedload(Employee.store),
+            joinedload(Issue.logs).joinedload(IssueLog.user),
+        )
+        .order_by(Issue.detected_at.desc(), Issue.id.desc())
+        .offset((page - 1) * page_size)
+        .limit(page_size)
+    )
+    result = await session.execute(query)
+    return [build_issue_response(issue) for issue in result.scalars().unique().all()]
+
+
+async def current_page(session: AsyncSession, user: User, page: int, page_size: int) -> list:
+    """現行実装のページ取得"""
+    response = await list_issues(
+        db=session, current_user=user, page=page, page_size=page_size,
+        store_id=None, employee_id=None, type=None, severity=None, status=None,
+        date_from=None, date_to=None, cursor=None, total_mode="none", view="full",
+    )
+    return response.items
+
+
+async def measure(maker, user: User, fetch, pages: list[int], page_size: int, repeat: int) -> tuple[float, float]:
+    """(1ページあたりの処理時間の中央値[ms], 1ページあたりの確保量のピーク[KB])"""
+    timings, peaks = [], []
+    for _ in range(repeat):
+        for page in pages:
+            async with maker() as session:
+                tracemalloc.start()
+                started = time.perf_counter()
+                await fetch(session, user, page, page_size)
+                timings.append((time.perf_counter() - started) * 1000)
+                peaks.append(tracemalloc.get_traced_memory()[1] / 1024)
+                tracemalloc.stop()
+    return statistics.median(timings), statistics.median(peaks)
+
+
+async def main(args: argparse.Namespace) -> None:
+    path = os.path.join(tempfile.mkdtemp(), "bench.db")
+    engine = create_async_engine(f"sqlite+aiosqlite:///{path}")
+    maker = async_sessionmaker(engine, expire_on_commit=False)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    async with maker() as session:
+        user = await seed(session, args.issues, args.logs)
+
+    last_page = max(args.issues // args.page_size, 1)
+    pages = [1, max(last_page // 2, 1), last_page]
+
+    print(f"issues={args.issues} logs/issue={args.logs} page_size={args.page_size} pages={pages}")
+    for label, fetch in (("before", legacy_page), ("after", current_page)):
+        elapsed, peak = await measure(maker, user, fetch, pages, args.page_size, args.repeat)
+        print(f"  {label:<6} {elapsed:8.1f} ms/page  {peak:9.0f} KB peak/page")
+
+    await engine.dispose()
+    os.remove(path)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--issues", type=int, default=20000)
+    parser.add_argument("--logs", type=int, default=5, help="異常1件あたりの対応ログ数")
+    parser.add_argument("--page-size", type=int, default=50)
+    parser.add_argument("--repeat", type=int, default=3)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,56 @@
+"""日次勤怠集計（attendance_daily_metrics）の再作成スクリプト
+
+集計値の初期作成はマイグレーション 012 で行われる。このスクリプトは
+組織ごとに現在の検知ルール（深夜時間帯）で集計を計算し直し、続けて
+既存データに対する複数日ルール（週40時間・36協定・連続勤務）の異常を判定する。
+異常を自動で完了にした場合のログは組織の管理者（いなければ最初のユーザー）の名前で残す。
+
+Usage:
+    cd backend && source venv/bin/activate
+    PYTHONPATH=. python scripts/rebuild_attendance_metrics.py
+"""
+
+import asyncio
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine, async_sessionmaker
+
+from src.config import settings
+from src.models.store import Organization
+from src.models.user import User, UserRole
+from src.services.attendance_metrics import rebuild_daily_metrics
+from src.services.detection import get_detection_rules
+from src.services.window_rules import detect_window_issues_for_organization
+
+
+async def rebuild_attendance_metrics():
+    """全組織の日次集計を作り直す"""
+    engine = create_async_engine(settings.database_url, echo=False)
+    async_session = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+
+    async with async_session() as session:
+        organizations = (await session.execute(select(Organization.id, Organization.name))).all()
+        for org_id, name in organizations:
+            user_id = (await session.execute(
+                select(User.id)
+                .where(User.organization_id == org_id)
+                .order_by(User.role != UserRole.ADMIN.value, User.created_at)
+                .limit(1)
+            )).scalar()
+            if user_id is None:
+                print(f"  {name}: ユーザーがいないためスキップしました")
+                continue
+            rules = await get_detection_rules(session, org_id)
+            count = await rebuild_daily_metrics(
+                session, org_id, rules["night_start_hour"], rules["night_end_hour"],
+            )
+            issue_count = await detect_window_issues_for_organization(session, org_id, user_id)
+            await session.commit()
+            print(f"  {name}: {count}件（複数日ルールの異常 {issue_count}件）")
+
+    await engine.dispose()
+    print(f"{len(organizations)}組織の日次集計を作成しました")
+
+
+if __name__ == "__main__":
+    asyncio.run(rebuild_attendance_metrics())
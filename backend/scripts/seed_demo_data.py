@@ -20,6 +20,7 @@ from src.models.store import Organization, Store
 from src.models.employee import Employee
 from src.models.attendance import AttendanceRecord
 from src.models.issue import Issue, IssueType, IssueSeverity, IssueStatus
+from src.services.attendance_metrics import rebuild_daily_metrics
 
 # デモ従業員（飲食店らしい名前）
 DEMO_EMPLOYEES = [
@@ -206,6 +207,10 @@ async def seed_demo_data():
                     issue = Issue(
                         id=str(uuid.uuid4()),
                         attendance_record_id=record.id,
+                        organization_id=org.id,
+                        store_id=emp.store_id,
+                        employee_id=emp.id,
+                        date=d,
                         type=anomaly["issue_type"],
                         severity=anomaly["severity"],
                         status=IssueStatus.PENDING.value,
@@ -227,6 +232,11 @@ async def seed_demo_data():
 
                 record_count += 1
 
+        # 日次集計（デフォルトの深夜時間帯で計算）
+        await session.flush()
+        await rebuild_daily_metrics(
+            session, org.id, settings.default_night_start_hour, settings.default_night_end_hour,
+        )
         await session.commit()
 
         print("=" * 50)
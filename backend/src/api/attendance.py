@@ -1,136 +1,42 @@
 """勤怠データAPI"""
 
-import io
+import asyncio
+from dataclasses import asdict
 from typing import Annotated
 
-import pandas as pd
-import chardet
-from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, Form
+from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, Form, Response
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from src.core.database import get_db
 from src.core.auth import StoreManagerUser
-from src.models.employee import Employee
 from src.models.store import Store
-from src.models.attendance import AttendanceRecord
-from src.services.detection import detect_issues
+from src.services.csv_parser import (
+    missing_required_columns, open_csv_stream, spool_upload, count_data_rows,
+    CsvFileError, MAX_FILE_SIZE, MAX_ROW_COUNT,
+)
+from src.services.import_jobs import enqueue_import, get_job
+from src.schemas.attendance import ImportJobResponse
 
 
 router = APIRouter()
 
-MAX_FILE_SIZE = 5 * 1024 * 1024  # 5MB
-MAX_ROW_COUNT = 10000
 
-
-def detect_encoding(content: bytes) -> str:
-    """ファイルのエンコーディングを検出"""
-    result = chardet.detect(content)
-    return result["encoding"] or "utf-8"
-
-
-def parse_csv(content: bytes) -> pd.DataFrame:
-    """CSVをパース"""
-    encoding = detect_encoding(content)
-    try:
-        df = pd.read_csv(io.BytesIO(content), encoding=encoding)
-    except Exception:
-        # Shift-JISでリトライ
-        df = pd.read_csv(io.BytesIO(content), encoding="shift-jis")
-    return df
-
-
-def detect_csv_format(columns: list[str]) -> str:
-    """CSVフォーマットを自動判定"""
-    col_set = set(columns)
-    # ジョブカン: 「スタッフコード」「スタッフ名」が特徴
-    if "スタッフコード" in col_set or "スタッフ名" in col_set:
-        return "jobcan"
-    # KING OF TIME: 「従業員コード」+「勤務日」が特徴
-    if "従業員コード" in col_set and "勤務日" in col_set:
-        return "king_of_time"
-    # KING OF TIME 別パターン: 「社員コード」+「勤務日」
-    if "社員コード" in col_set and "勤務日" in col_set:
-        return "king_of_time"
-    # Airシフト: 「従業員番号」「従業員名」が特徴
-    if "従業員番号" in col_set or "従業員名" in col_set:
-        return "airshift"
-    # SmartHR: 「社員ID」「社員名」が特徴
-    if "社員ID" in col_set or "社員名" in col_set:
-        return "smarthr"
-    return "generic"
-
-
-def normalize_columns(df: pd.DataFrame) -> pd.DataFrame:
-    """カラム名を正規化（ジョブカン/KING OF TIME/Airシフト/SmartHR対応）"""
-    detected = detect_csv_format(list(df.columns))
-
-    column_mapping_jobcan = {
-        "スタッフコード": "employee_code",
-        "スタッフ名": "name",
-        "日付": "date",
-        "出勤時刻": "clock_in",
-        "退勤時刻": "clock_out",
-        "休憩時間": "break_minutes",
-        "勤務区分": "work_type",
-    }
-
-    column_mapping_king_of_time = {
-        "従業員コード": "employee_code",
-        "社員コード": "employee_code",
-        "従業員名": "name",
-        "社員名": "name",
-        "氏名": "name",
-        "勤務日": "date",
-        "出勤時刻": "clock_in",
-        "退勤時刻": "clock_out",
-        "休憩分": "break_minutes",
-        "休憩時間": "break_minutes",
-        "勤務形態": "work_type",
-        "勤務区分": "work_type",
-    }
-
-    column_mapping_airshift = {
-        "従業員番号": "employee_code",
-        "従業員名": "name",
-        "日付": "date",
-        "出勤": "clock_in",
-        "退勤": "clock_out",
-        "休憩": "break_minutes",
-    }
-
-    column_mapping_smarthr = {
-        "社員ID": "employee_code",
-        "社員名": "name",
-        "勤務日": "date",
-        "出勤": "clock_in",
-        "退勤": "clock_out",
-        "休憩": "break_minutes",
-    }
-
-    column_mapping_generic = {
-        "employee_id": "employee_code",
-        "employee_name": "name",
-    }
-
-    mapping = {
-        "jobcan": column_mapping_jobcan,
-        "king_of_time": column_mapping_king_of_time,
-        "airshift": column_mapping_airshift,
-        "smarthr": column_mapping_smarthr,
-        "generic": column_mapping_generic,
-    }
-
-    df = df.rename(columns=mapping.get(detected, column_mapping_generic))
-
-    # フォールバック: まだマッピングされていないカラムを汎用マッピングで再試行
-    if "employee_code" not in df.columns or "date" not in df.columns:
-        all_mappings = {}
-        for m in mapping.values():
-            all_mappings.update(m)
-        df = df.rename(columns=all_mappings)
-
-    return df
+async def _verify_store(db: AsyncSession, store_id: str, organization_id: str) -> None:
+    """store_id所有権検証"""
+    if not store_id:
+        return
+    result = await db.execute(
+        select(Store).where(
+            Store.id == store_id,
+            Store.organization_id == organization_id,
+        )
+    )
+    if result.scalar_one_or_none() is None:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="指定された店舗へのアクセス権限がありません",
+        )
 
 
 @router.post("/preview")
@@ -138,43 +44,40 @@ async def preview_upload(
     file: Annotated[UploadFile, File()],
     current_user: StoreManagerUser,
 ):
-    """CSVプレビュー"""
-    content = await file.read()
-
-    if len(content) > MAX_FILE_SIZE:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail=f"ファイルサイズが上限（{MAX_FILE_SIZE // 1024 // 1024}MB）を超えています",
-        )
+    """CSVプレビュー
 
+    全体はパースせず、ヘッダーと先頭行のみ読み込む。行数は改行数から数える。
+    """
     try:
-        df = parse_csv(content)
-        df = normalize_columns(df)
-    except Exception as e:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail=f"CSVの解析に失敗しました: {str(e)}",
-        )
+        path = await spool_upload(file, MAX_FILE_SIZE)
+    except CsvFileError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
 
-    if len(df) > MAX_ROW_COUNT:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail=f"行数が上限（{MAX_ROW_COUNT}行）を超えています（{len(df)}行）",
-        )
-
-    # 必須カラムチェック
-    required = ["employee_code", "date"]
-    missing = [c for c in required if c not in df.columns]
-    if missing:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail=f"必須カラムがありません: {', '.join(missing)}",
-        )
+    try:
+        try:
+            stream = await asyncio.to_thread(open_csv_stream, path, current_user.organization_id)
+            row_count = await asyncio.to_thread(count_data_rows, path)
+            if row_count > MAX_ROW_COUNT:
+                raise CsvFileError(f"行数が上限（{MAX_ROW_COUNT}行）を超えています（{row_count}行）")
+
+            # 必須カラムチェック
+            missing = missing_required_columns(stream.columns)
+            if missing:
+                raise CsvFileError(f"必須カラムがありません: {', '.join(missing)}")
+
+            df = await asyncio.to_thread(stream.head)
+        except CsvFileError as e:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    finally:
+        path.unlink(missing_ok=True)
 
     return {
-        "columns": list(df.columns),
-        "row_count": len(df),
-        "preview": df.head(10).to_dict(orient="records"),
+        "columns": stream.columns,
+        "row_count": row_count,
+        "encoding": stream.encoding,
+        "format": stream.csv_format,
+        # 空セル（NaN）はJSONにできないため null にする
+        "preview": df.astype(object).where(df.notna(), None).to_dict(orient="records"),
     }
 
 
@@ -184,112 +87,96 @@ async def upload_attendance(
     store_id: Annotated[str, Form()],
     db: Annotated[AsyncSession, Depends(get_db)],
     current_user: StoreManagerUser,
+    response: Response,
+    async_mode: Annotated[bool, Form()] = False,
 ):
-    """CSV取り込み＆異常検知"""
-    content = await file.read()
-
-    if len(content) > MAX_FILE_SIZE:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail=f"ファイルサイズが上限（{MAX_FILE_SIZE // 1024 // 1024}MB）を超えています",
-        )
+    """CSV取り込み＆異常検知
 
+    ファイルはディスクに退避し、チャンク単位で読み込みながら取り込む。
+    async_mode=true の場合はジョブを登録して即座に job_id を返す。
+    進捗は GET /attendance/jobs/{job_id} で取得する。
+    """
     try:
-        df = parse_csv(content)
-        df = normalize_columns(df)
-    except Exception as e:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail=f"CSVの解析に失敗しました: {str(e)}",
-        )
+        path = await spool_upload(file, MAX_FILE_SIZE)
+    except CsvFileError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
 
-    if len(df) > MAX_ROW_COUNT:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail=f"行数が上限（{MAX_ROW_COUNT}行）を超えています（{len(df)}行）",
-        )
+    try:
+        # store_id所有権検証
+        await _verify_store(db, store_id, current_user.organization_id)
 
-    # store_id所有権検証
-    if store_id:
-        result = await db.execute(
-            select(Store).where(
-                Store.id == store_id,
-                Store.organization_id == current_user.organization_id,
+        if async_mode:
+            job = await enqueue_import(
+                path,
+                filename=file.filename,
+                organization_id=current_user.organization_id,
+                store_id=store_id if store_id else current_user.store_id,
+                user_id=current_user.id,
             )
-        )
-        if result.scalar_one_or_none() is None:
+            path = None  # 以降の削除はワーカーが行う
+            response.status_code = status.HTTP_202_ACCEPTED
+            return {
+                "message": "取り込みを受け付けました",
+                "job_id": job.id,
+                "status": job.status,
+            }
+
+        try:
+            stream = await asyncio.to_thread(open_csv_stream, path, current_user.organization_id)
+        except CsvFileError as e:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+        # 必須カラムチェック
+        missing = missing_required_columns(stream.columns)
+        if missing:
             raise HTTPException(
-                status_code=status.HTTP_403_FORBIDDEN,
-                detail="指定された店舗へのアクセス権限がありません",
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"必須カラムがありません: {', '.join(missing)}",
             )
 
-    record_count = 0
-    skip_count = 0
-    issue_count = 0
-
-    for _, row in df.iterrows():
-        # 従業員取得または作成
-        employee_code = str(row.get("employee_code", ""))
-        if not employee_code:
-            continue
-
-        result = await db.execute(
-            select(Employee).where(
-                Employee.organization_id == current_user.organization_id,
-                Employee.employee_code == employee_code,
-            )
-        )
-        employee = result.scalar_one_or_none()
+        # 一括取り込み＆異常検知（チャンク単位）。pandas を含むため初回利用時に読み込む
+        from src.services.attendance_import import import_csv_stream
 
-        if employee is None:
-            employee = Employee(
+        try:
+            imported = await import_csv_stream(
+                db,
+                stream,
                 organization_id=current_user.organization_id,
                 store_id=store_id if store_id else current_user.store_id,
-                employee_code=employee_code,
-                name=str(row.get("name", employee_code)),
-            )
-            db.add(employee)
-            await db.flush()
-
-        # 重複チェック（同一従業員+同一日付）
-        record_date = pd.to_datetime(row.get("date")).date()
-        existing = await db.execute(
-            select(AttendanceRecord).where(
-                AttendanceRecord.employee_id == employee.id,
-                AttendanceRecord.date == record_date,
+                user_id=current_user.id,
             )
-        )
-        if existing.scalar_one_or_none() is not None:
-            skip_count += 1
-            continue
-
-        # 勤怠レコード作成
-        attendance = AttendanceRecord(
-            employee_id=employee.id,
-            date=record_date,
-            clock_in=pd.to_datetime(row.get("clock_in")).time() if pd.notna(row.get("clock_in")) else None,
-            clock_out=pd.to_datetime(row.get("clock_out")).time() if pd.notna(row.get("clock_out")) else None,
-            break_minutes=int(row.get("break_minutes")) if pd.notna(row.get("break_minutes")) else None,
-            work_type=str(row.get("work_type")) if pd.notna(row.get("work_type")) else None,
-        )
-        db.add(attendance)
-        await db.flush()
-        record_count += 1
-
-        # 異常検知
-        issues = await detect_issues(db, attendance, current_user.organization_id)
-        issue_count += len(issues)
+        except CsvFileError as e:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    finally:
+        if path is not None:
+            path.unlink(missing_ok=True)
 
     await db.commit()
 
-    message = f"取り込みが完了しました（{record_count}件追加"
-    if skip_count > 0:
-        message += f"、{skip_count}件は既存データのためスキップ"
+    message = f"取り込みが完了しました（{imported.record_count}件追加"
+    if imported.skip_count > 0:
+        message += f"、{imported.skip_count}件は既存データのためスキップ"
+    if imported.error_count > 0:
+        message += f"、{imported.error_count}件は読み取れない値があるため除外"
     message += "）"
 
     return {
         "message": message,
-        "record_count": record_count,
-        "skip_count": skip_count,
-        "issue_count": issue_count,
+        "record_count": imported.record_count,
+        "skip_count": imported.skip_count,
+        "issue_count": imported.issue_count,
+        "error_count": imported.error_count,
+        "errors": [asdict(e) for e in imported.errors],
     }
+
+
+@router.get("/jobs/{job_id}", response_model=ImportJobResponse)
+async def get_import_job(
+    job_id: str,
+    current_user: StoreManagerUser,
+):
+    """取り込みジョブの進捗取得"""
+    job = await get_job(job_id, current_user.organization_id)
+    if job is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="ジョブが見つかりません")
+    return ImportJobResponse.model_validate(job)
@@ -1,19 +1,21 @@
 """異常API"""
 
-from typing import Annotated
+from datetime import date
+from typing import Annotated, Literal
 from uuid import UUID
 
 from fastapi import APIRouter, Depends, HTTPException, status, Query
-from sqlalchemy import select, func
+from sqlalchemy import select, func, tuple_
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import joinedload
 
 from src.core.database import get_db
 from src.core.auth import CurrentUser, StoreManagerUser
-from src.models.user import UserRole
+from src.models.user import User, UserRole
 from src.models.issue import Issue, IssueLog, IssueStatus
 from src.models.attendance import AttendanceRecord
 from src.models.employee import Employee
+from src.models.store import Store
 from src.schemas.issue import (
     IssueResponse,
     IssueListResponse,
@@ -25,6 +27,9 @@ from src.schemas.issue import (
     AttendanceRecordResponse,
 )
 from src.services.reason_generator import generate_reason_text
+from src.services.issue_pagination import (
+    InvalidCursorError, encode_cursor, decode_cursor, get_cached_count, put_cached_count,
+)
 
 
 router = APIRouter()
@@ -76,69 +81,189 @@ def build_issue_response(issue: Issue) -> IssueResponse:
     )
 
 
+# 一覧で取得するカラム（ORMエンティティを生成せず、必要な値だけを取得する）
+LIST_COLUMNS = (
+    Issue.id,
+    Issue.attendance_record_id,
+    Issue.employee_id,
+    Issue.store_id,
+    Issue.date,
+    Issue.type,
+    Issue.severity,
+    Issue.status,
+    Issue.rule_description,
+    Issue.detected_at,
+    Employee.name.label("employee_name"),
+    Store.name.label("store_name"),
+)
+ATTENDANCE_COLUMNS = (
+    AttendanceRecord.clock_in,
+    AttendanceRecord.clock_out,
+    AttendanceRecord.break_minutes,
+    AttendanceRecord.work_type,
+)
+
+
+async def load_issue_logs(db: AsyncSession, issue_ids: list[str]) -> dict[str, list[IssueLogResponse]]:
+    """複数の異常の対応ログを1クエリでまとめて取得（issue_id → ログ一覧）"""
+    logs: dict[str, list[IssueLogResponse]] = {issue_id: [] for issue_id in issue_ids}
+    if not issue_ids:
+        return logs
+
+    result = await db.execute(
+        select(
+            IssueLog.id, IssueLog.issue_id, IssueLog.user_id, IssueLog.action,
+            IssueLog.memo, IssueLog.created_at, User.name.label("user_name"),
+        )
+        .outerjoin(User, User.id == IssueLog.user_id)
+        .where(IssueLog.issue_id.in_(issue_ids))
+        .order_by(IssueLog.created_at)
+    )
+    for row in result.all():
+        logs[row.issue_id].append(IssueLogResponse(
+            id=str(row.id),
+            user_id=str(row.user_id),
+            user_name=row.user_name or "Unknown",
+            action=row.action,
+            memo=row.memo,
+            created_at=row.created_at,
+        ))
+    return logs
+
+
+def build_issue_list_item(row, logs: list[IssueLogResponse] | None = None) -> IssueResponse:
+    """一覧クエリの行 -> IssueResponse 変換（勤怠カラムを含む行のみ attendance_record を設定）"""
+    attendance_response = None
+    if "clock_in" in row._fields:
+        attendance_response = AttendanceRecordResponse(
+            id=str(row.attendance_record_id),
+            date=str(row.date),
+            clock_in=str(row.clock_in) if row.clock_in else None,
+            clock_out=str(row.clock_out) if row.clock_out else None,
+            break_minutes=row.break_minutes,
+            work_type=row.work_type,
+        )
+
+    return IssueResponse(
+        id=str(row.id),
+        attendance_record_id=str(row.attendance_record_id),
+        employee_id=str(row.employee_id),
+        employee_name=row.employee_name,
+        store_id=str(row.store_id),
+        store_name=row.store_name or "",
+        date=str(row.date),
+        type=row.type,
+        severity=row.severity,
+        status=row.status,
+        rule_description=row.rule_description,
+        detected_at=row.detected_at,
+        attendance_record=attendance_response,
+        logs=logs or [],
+    )
+
+
 @router.get("", response_model=IssueListResponse)
 async def list_issues(
     db: Annotated[AsyncSession, Depends(get_db)],
     current_user: CurrentUser,
     page: int = 1,
     page_size: int = Query(default=20, le=100),
-    store_id: str | None = None,
-    employee_id: str | None = None,
+    store_id: UUID | None = None,
+    employee_id: UUID | None = None,
     type: str | None = None,
     severity: str | None = None,
     status: str | None = None,
-    date_from: str | None = None,
-    date_to: str | None = None,
+    date_from: date | None = None,
+    date_to: date | None = None,
+    cursor: str | None = None,
+    total_mode: Literal["exact", "cached", "none"] = "exact",
+    view: Literal["full", "summary"] = "full",
 ):
-    """異常一覧取得"""
+    """異常一覧取得
+
+    date_from / date_to は勤怠日での絞り込み（両端を含む）。
+    cursor を指定すると page の代わりにカーソル（前ページの next_cursor）以降を返す。
+    total_mode: exact=毎回数える / cached=一定時間キャッシュした件数 / none=数えない（total は null）
+    view=summary の場合は勤怠レコード・対応ログを含めない軽量な一覧を返す。
+    """
     offset = (page - 1) * page_size
 
-    # ベースクエリ
-    base_query = (
-        select(Issue)
-        .join(AttendanceRecord)
-        .join(Employee)
-        .where(Employee.organization_id == current_user.organization_id)
-    )
+    # 絞り込み条件（issues の非正規化カラムのみ）
+    conditions = [Issue.organization_id == current_user.organization_id]
 
     # 店舗管理者は自店舗のみ
     if current_user.role == UserRole.STORE_MANAGER and current_user.store_id:
-        base_query = base_query.where(Employee.store_id == current_user.store_id)
+        conditions.append(Issue.store_id == current_user.store_id)
 
     # フィルタ
     if store_id:
-        base_query = base_query.where(Employee.store_id == UUID(store_id))
+        conditions.append(Issue.store_id == str(store_id))
     if employee_id:
-        base_query = base_query.where(Employee.id == UUID(employee_id))
+        conditions.append(Issue.employee_id == str(employee_id))
     if type:
-        base_query = base_query.where(Issue.type == type)
+        conditions.append(Issue.type == type)
     if severity:
-        base_query = base_query.where(Issue.severity == severity)
+        conditions.append(Issue.severity == severity)
     if status:
-        base_query = base_query.where(Issue.status == status)
+        conditions.append(Issue.status == status)
+    if date_from:
+        conditions.append(Issue.date >= date_from)
+    if date_to:
+        conditions.append(Issue.date <= date_to)
 
     # 総件数
-    count_query = select(func.count()).select_from(base_query.subquery())
-    count_result = await db.execute(count_query)
-    total = count_result.scalar_one()
-
-    # データ取得
-    query = (
-        base_query
-        .options(
-            joinedload(Issue.attendance_record).joinedload(AttendanceRecord.employee).joinedload(Employee.store),
-            joinedload(Issue.logs).joinedload(IssueLog.user),
+    total = None
+    if total_mode != "none":
+        count_key = (
+            current_user.organization_id, current_user.role, current_user.store_id,
+            store_id, employee_id, type, severity, status, date_from, date_to,
         )
-        .order_by(Issue.detected_at.desc())
-        .offset(offset)
-        .limit(page_size)
+        if total_mode == "cached":
+            total = get_cached_count(count_key)
+        if total is None:
+            count_result = await db.execute(select(func.count(Issue.id)).where(*conditions))
+            total = count_result.scalar_one()
+            put_cached_count(count_key, total)
+
+    # データ取得（必要なカラムのみ。多対一の結合だけなので LIMIT がそのまま行数の上限になる）
+    columns = LIST_COLUMNS if view == "summary" else LIST_COLUMNS + ATTENDANCE_COLUMNS
+    query = (
+        select(*columns)
+        .join(Employee, Employee.id == Issue.employee_id)
+        .outerjoin(Store, Store.id == Issue.store_id)
+        .where(*conditions)
     )
+    if view != "summary":
+        query = query.join(AttendanceRecord, AttendanceRecord.id == Issue.attendance_record_id)
+
+    # (detected_at, id) の降順。カーソル指定時はその位置から範囲走査
+    query = query.order_by(Issue.detected_at.desc(), Issue.id.desc())
+    if cursor:
+        try:
+            cursor_detected_at, cursor_id = decode_cursor(cursor)
+        except InvalidCursorError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        query = query.where(tuple_(Issue.detected_at, Issue.id) < tuple_(cursor_detected_at, cursor_id))
+    else:
+        query = query.offset(offset)
+
+    query = query.limit(page_size + 1)  # 次ページの有無を判定するため1件多く取得
     result = await db.execute(query)
-    issues = result.scalars().unique().all()
+    rows = result.all()
 
-    items = [build_issue_response(issue) for issue in issues]
+    next_cursor = None
+    if len(rows) > page_size:
+        rows = rows[:page_size]
+        next_cursor = encode_cursor(rows[-1].detected_at, rows[-1].id)
 
-    return IssueListResponse(items=items, total=total, page=page, page_size=page_size)
+    if view == "summary":
+        items = [build_issue_list_item(row) for row in rows]
+    else:
+        # 対応ログはページ内の異常分だけ別クエリでまとめて取得
+        logs = await load_issue_logs(db, [row.id for row in rows])
+        items = [build_issue_list_item(row, logs[row.id]) for row in rows]
+
+    return IssueListResponse(items=items, total=total, page=page, page_size=page_size, next_cursor=next_cursor)
 
 
 @router.get("/{issue_id}", response_model=IssueResponse)
@@ -157,18 +282,17 @@ async def get_issue(
         .where(Issue.id == issue_id)
     )
     result = await db.execute(query)
-    issue = result.scalar_one_or_none()
+    issue = result.unique().scalar_one_or_none()
 
     if issue is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="異常が見つかりません")
 
     # 権限チェック
-    employee = issue.attendance_record.employee
-    if employee.organization_id != current_user.organization_id:
+    if issue.organization_id != current_user.organization_id:
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="アクセス権限がありません")
 
     if current_user.role == UserRole.STORE_MANAGER and current_user.store_id:
-        if employee.store_id != current_user.store_id:
+        if issue.store_id != current_user.store_id:
             raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="アクセス権限がありません")
 
     return build_issue_response(issue)
@@ -191,28 +315,27 @@ async def update_issue(
         .where(Issue.id == issue_id)
     )
     result = await db.execute(query)
-    issue = result.scalar_one_or_none()
+    issue = result.unique().scalar_one_or_none()
 
     if issue is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="異常が見つかりません")
 
     # 組織所有権チェック
-    employee = issue.attendance_record.employee
-    if employee.organization_id != current_user.organization_id:
+    if issue.organization_id != current_user.organization_id:
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="アクセス権限がありません")
     if current_user.role == UserRole.STORE_MANAGER and current_user.store_id:
-        if employee.store_id != current_user.store_id:
+        if issue.store_id != current_user.store_id:
             raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="アクセス権限がありません")
 
     # ステータス更新
-    old_status = issue.status
-    issue.status = IssueStatus(request.status)
+    old_status = issue.status if isinstance(issue.status, str) else issue.status.value
+    issue.status = IssueStatus(request.status).value
 
     # 対応ログ追加
     log = IssueLog(
         issue_id=issue.id,
         user_id=current_user.id,
-        action=f"status_change:{old_status.value}->{request.status}",
+        action=f"status_change:{old_status}->{request.status}",
         memo=None,
     )
     db.add(log)
@@ -231,24 +354,16 @@ async def add_issue_log(
     current_user: StoreManagerUser,
 ):
     """対応ログ追加"""
-    result = await db.execute(
-        select(Issue)
-        .options(
-            joinedload(Issue.attendance_record).joinedload(AttendanceRecord.employee),
-        )
-        .where(Issue.id == issue_id)
-    )
-    issue = result.scalar_one_or_none()
+    issue = await db.get(Issue, issue_id)
 
     if issue is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="異常が見つかりません")
 
     # 組織所有権チェック
-    employee = issue.attendance_record.employee
-    if employee.organization_id != current_user.organization_id:
+    if issue.organization_id != current_user.organization_id:
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="アクセス権限がありません")
     if current_user.role == UserRole.STORE_MANAGER and current_user.store_id:
-        if employee.store_id != current_user.store_id:
+        if issue.store_id != current_user.store_id:
             raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="アクセス権限がありません")
 
     log = IssueLog(
@@ -293,11 +408,10 @@ async def generate_reason(
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="異常が見つかりません")
 
     # 組織所有権チェック
-    employee = issue.attendance_record.employee
-    if employee.organization_id != current_user.organization_id:
+    if issue.organization_id != current_user.organization_id:
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="アクセス権限がありません")
     if current_user.role == UserRole.STORE_MANAGER and current_user.store_id:
-        if employee.store_id != current_user.store_id:
+        if issue.store_id != current_user.store_id:
             raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="アクセス権限がありません")
 
     # 理由文生成
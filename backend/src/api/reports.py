@@ -1,40 +1,48 @@
 """レポートAPI"""
 
+import asyncio
 import io
 import csv
-from datetime import datetime
-from typing import Annotated
-
-from fastapi import APIRouter, Depends
-from fastapi.responses import StreamingResponse
-from pydantic import BaseModel
-from sqlalchemy import select, func
+import logging
+import tempfile
+from collections.abc import AsyncIterator
+from dataclasses import asdict
+from datetime import date, datetime
+from typing import Annotated, BinaryIO, Literal
+
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, status
+from fastapi.responses import FileResponse, Response, StreamingResponse
+from pydantic import BaseModel, Field
+from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy.orm import joinedload
-
-from reportlab.lib.pagesizes import A4
-from reportlab.lib import colors
-from reportlab.lib.units import mm
-from reportlab.platypus import (
-    SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer,
-)
-from reportlab.lib.styles import ParagraphStyle
-from reportlab.pdfbase import pdfmetrics
-from reportlab.pdfbase.cidfonts import UnicodeCIDFont
 
-from src.core.database import get_db
-from src.core.auth import StoreManagerUser
-from src.models.user import UserRole
+from src.core.database import get_db, async_session_maker
+from src.config import settings
+from src.core.auth import AdminUser, CurrentUser, StoreManagerUser
+from src.models.user import User, UserRole
 from src.models.issue import Issue
-from src.models.attendance import AttendanceRecord
+from src.models.attendance import AttendanceDailyMetrics
 from src.models.employee import Employee
+from src.models.store import Store
+from src.services import render_pool, report_cache
+from src.services.pdf_report import PdfReportData, build_pdf
+from src.services.plan_limits import check_batch_report
+from src.services.report_queries import (
+    IssueSummary, report_data_version, summarize_issues, summarize_daily_metrics, summarize_night_minutes,
+)
+from src.services.zip_stream import ZipStream
+
 
+logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
-# 日本語フォント登録
-pdfmetrics.registerFont(UnicodeCIDFont("HeiseiKakuGo-W5"))
-JP_FONT = "HeiseiKakuGo-W5"
+CSV_STREAM_BATCH = 1000  # CSV詳細行をDBから読み出す単位
+
+REPORT_MEDIA_TYPES = {
+    "csv": "text/csv; charset=utf-8",
+    "pdf": "application/pdf",
+}
 
 # 異常種別のラベル
 ISSUE_TYPE_LABELS = {
@@ -44,6 +52,12 @@ ISSUE_TYPE_LABELS = {
     "overtime": "長時間労働",
     "night_work": "深夜勤務",
     "inconsistency": "不整合",
+    "weekly_overtime": "週40時間超",
+    "monthly_overtime": "月45時間超",
+    "annual_overtime": "年360時間超",
+    "overtime_100h": "月100時間以上",
+    "overtime_average_80h": "複数月平均80時間超",
+    "consecutive_workdays": "連続勤務",
 }
 
 # ステータスのラベル
@@ -69,6 +83,86 @@ class ReportRequest(BaseModel):
     mask_personal_info: bool = False
 
 
+class BatchReportRequest(BaseModel):
+    """複数店舗の一括レポート生成リクエスト"""
+    month: str = Field(pattern=r"^\d{4}-\d{2}$")
+    store_ids: list[str] | None = None  # 省略時は全店舗
+    format: str = "pdf"  # pdf or csv
+    mask_personal_info: bool = False
+
+
+class StoreCount(BaseModel):
+    """店舗別件数"""
+    store_id: str
+    store_name: str
+    count: int
+
+
+class SummaryRowResponse(BaseModel):
+    """店舗 × 種別 × ステータス × 重要度 の件数"""
+    store_id: str
+    store_name: str
+    type: str
+    status: str
+    severity: str
+    count: int
+
+
+class ReportSummaryResponse(BaseModel):
+    """異常件数の集計レスポンス"""
+    month: str | None
+    total: int
+    by_type: dict[str, int]
+    by_status: dict[str, int]
+    by_severity: dict[str, int]
+    by_store: list[StoreCount]
+    rows: list[SummaryRowResponse]
+
+
+class MonthlyMetricsRowResponse(BaseModel):
+    """店舗別・従業員別の勤怠集計"""
+    store_id: str
+    store_name: str
+    employee_id: str | None
+    employee_code: str | None
+    employee_name: str | None
+    days: int
+    worked_days: int
+    worked_minutes: int
+    break_minutes: int
+    night_minutes: int
+    overtime_minutes: int
+
+
+class MonthlyMetricsResponse(BaseModel):
+    """月次勤怠集計レスポンス"""
+    month: str
+    group_by: str
+    rows: list[MonthlyMetricsRowResponse]
+
+
+class MonthlyNightRowResponse(BaseModel):
+    """月別・店舗別（従業員別）の深夜勤務分数"""
+    month: str
+    store_id: str
+    store_name: str
+    employee_id: str | None
+    employee_code: str | None
+    employee_name: str | None
+    night_days: int
+    night_minutes: int
+
+
+class NightMinutesResponse(BaseModel):
+    """月別深夜勤務分数レスポンス"""
+    from_month: str
+    to_month: str
+    group_by: str
+    night_start_hour: int
+    night_end_hour: int
+    rows: list[MonthlyNightRowResponse]
+
+
 def mask_name(name: str) -> str:
     """名前をマスクする"""
     if len(name) <= 1:
@@ -76,9 +170,138 @@ def mask_name(name: str) -> str:
     return name[0] + "*" * (len(name) - 1)
 
 
-def _get_str(val: object) -> str:
-    """Enum or str を str に変換"""
-    return val if isinstance(val, str) else val.value
+def _month_range(month: str) -> tuple[date, date]:
+    """YYYY-MM → [月初, 翌月初)"""
+    year, month_num = map(int, month.split("-"))
+    start_date = date(year, month_num, 1)
+    if month_num == 12:
+        end_date = date(year + 1, 1, 1)
+    else:
+        end_date = date(year, month_num + 1, 1)
+    return start_date, end_date
+
+
+def _scope_store_id(current_user: User, store_id: str | None) -> str | None:
+    """対象店舗（店舗管理者は自店舗のみ。None は組織全体）"""
+    if current_user.role == UserRole.STORE_MANAGER and current_user.store_id:
+        return current_user.store_id
+    return store_id
+
+
+def _report_conditions(current_user: User, month: str | None, store_id: str | None, model=Issue) -> list:
+    """レポート対象の絞り込み条件（month 省略時は全期間）
+
+    model は organization_id / store_id / date を持つ非正規化テーブル（Issue / AttendanceDailyMetrics）。
+    """
+    conditions = [model.organization_id == current_user.organization_id]
+    if month:
+        start_date, end_date = _month_range(month)
+        conditions += [model.date >= start_date, model.date < end_date]
+
+    scope_store_id = _scope_store_id(current_user, store_id)
+    if scope_store_id:
+        conditions.append(model.store_id == scope_store_id)
+    return conditions
+
+
+def _report_ext(report_format: str) -> str:
+    """ファイルの拡張子（csv 以外の指定は pdf として扱う）"""
+    return "csv" if report_format == "csv" else "pdf"
+
+
+def _report_cache_key(current_user: User, request: ReportRequest, ext: str, version: str) -> str:
+    """レポートキャッシュのキー（ETag を兼ねる）"""
+    return report_cache.make_key(
+        current_user.organization_id,
+        _scope_store_id(current_user, request.store_id) or "*",
+        request.month,
+        ext,
+        request.mask_personal_info,
+        version,
+    )
+
+
+def _etag_matches(if_none_match: str | None, etag: str) -> bool:
+    """If-None-Match に etag が含まれるか"""
+    if not if_none_match:
+        return False
+    candidates = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+    return "*" in candidates or etag in candidates
+
+
+@router.get("/summary", response_model=ReportSummaryResponse)
+async def get_report_summary(
+    db: Annotated[AsyncSession, Depends(get_db)],
+    current_user: CurrentUser,
+    month: str | None = Query(default=None, pattern=r"^\d{4}-\d{2}$"),
+    store_id: str | None = None,
+):
+    """異常件数の集計（ダッシュボード用。個々の異常は読み込まない）"""
+    summary = await summarize_issues(db, _report_conditions(current_user, month, store_id))
+    return ReportSummaryResponse(
+        month=month,
+        total=summary.total,
+        by_type=summary.by_type(),
+        by_status=summary.by_status(),
+        by_severity=summary.by_severity(),
+        by_store=[
+            StoreCount(store_id=sid, store_name=name, count=count)
+            for sid, name, count in summary.by_store()
+        ],
+        rows=[asdict(row) for row in summary.rows],
+    )
+
+
+@router.get("/metrics", response_model=MonthlyMetricsResponse)
+async def get_monthly_metrics(
+    db: Annotated[AsyncSession, Depends(get_db)],
+    current_user: CurrentUser,
+    month: str = Query(pattern=r"^\d{4}-\d{2}$"),
+    store_id: str | None = None,
+    group_by: Literal["store", "employee"] = "employee",
+):
+    """月次の勤怠集計（実労働・休憩・深夜・時間外の分数。日次集計テーブルを合算する）"""
+    conditions = _report_conditions(current_user, month, store_id, model=AttendanceDailyMetrics)
+    rows = await summarize_daily_metrics(db, conditions, by_employee=group_by == "employee")
+    return MonthlyMetricsResponse(month=month, group_by=group_by, rows=[asdict(row) for row in rows])
+
+
+@router.get("/night-minutes", response_model=NightMinutesResponse)
+async def get_night_minutes(
+    db: Annotated[AsyncSession, Depends(get_db)],
+    current_user: CurrentUser,
+    from_month: str = Query(pattern=r"^\d{4}-\d{2}$"),
+    to_month: str | None = Query(default=None, pattern=r"^\d{4}-\d{2}$"),
+    store_id: str | None = None,
+    group_by: Literal["store", "employee"] = "employee",
+):
+    """月別の深夜勤務分数（深夜割増の計算用。日次集計テーブルの深夜分数を月ごとに合算する）
+
+    to_month 省略時は from_month の1か月分。深夜帯は現在の検知ルールの設定で、
+    日次集計は設定変更時に作り直されている。
+    """
+    # 判定処理は pandas を含むため初回利用時に読み込む
+    from src.services.detection import get_detection_rules
+
+    to_month = to_month or from_month
+    if to_month < from_month:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="終了月は開始月以降を指定してください")
+
+    conditions = _report_conditions(current_user, None, store_id, model=AttendanceDailyMetrics)
+    conditions += [
+        AttendanceDailyMetrics.date >= _month_range(from_month)[0],
+        AttendanceDailyMetrics.date < _month_range(to_month)[1],
+    ]
+    rows = await summarize_night_minutes(db, conditions, by_employee=group_by == "employee")
+    rules = await get_detection_rules(db, current_user.organization_id)
+    return NightMinutesResponse(
+        from_month=from_month,
+        to_month=to_month,
+        group_by=group_by,
+        night_start_hour=rules["night_start_hour"],
+        night_end_hour=rules["night_end_hour"],
+        rows=[asdict(row) for row in rows],
+    )
 
 
 @router.post("")
@@ -86,56 +309,70 @@ async def generate_report(
     request: ReportRequest,
     db: Annotated[AsyncSession, Depends(get_db)],
     current_user: StoreManagerUser,
+    if_none_match: Annotated[str | None, Header()] = None,
 ):
-    """レポート生成"""
-    # 対象月の範囲を計算
-    year, month = map(int, request.month.split("-"))
-    start_date = datetime(year, month, 1).date()
-    if month == 12:
-        end_date = datetime(year + 1, 1, 1).date()
-    else:
-        end_date = datetime(year, month + 1, 1).date()
-
-    # ベースクエリ
-    base_query = (
-        select(Issue)
-        .join(AttendanceRecord)
-        .join(Employee)
-        .where(Employee.organization_id == current_user.organization_id)
-        .where(AttendanceRecord.date >= start_date)
-        .where(AttendanceRecord.date < end_date)
-    )
-
-    # 店舗管理者は自店舗のみ
-    if current_user.role == UserRole.STORE_MANAGER and current_user.store_id:
-        base_query = base_query.where(Employee.store_id == current_user.store_id)
-    elif request.store_id:
-        base_query = base_query.where(Employee.store_id == request.store_id)
-
-    # データ取得
-    query = (
-        base_query
-        .options(
-            joinedload(Issue.attendance_record)
-            .joinedload(AttendanceRecord.employee)
-            .joinedload(Employee.store),
+    """レポート生成
+
+    同じ条件・同じデータのレポートは生成済みファイルを返す。
+    ETag は条件とデータバージョンから決まり、If-None-Match が一致すれば 304 を返す。
+    """
+    conditions = _report_conditions(current_user, request.month, request.store_id)
+    ext = _report_ext(request.format)
+    key = _report_cache_key(current_user, request, ext, await report_data_version(db, conditions))
+    etag = f'"{key}"'
+    headers = {
+        "Content-Disposition": f"attachment; filename=report-{request.month}.{ext}",
+        "ETag": etag,
+        "Cache-Control": "private, no-cache",
+    }
+    if _etag_matches(if_none_match, etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
+
+    cached = report_cache.get(key, ext)
+    if cached is not None:
+        return FileResponse(cached, media_type=REPORT_MEDIA_TYPES[ext], headers=headers)
+
+    summary = await summarize_issues(db, conditions)
+    if ext == "csv":
+        # 詳細行はレスポンス送信中に逐次読み出す
+        return _generate_csv(request, conditions, summary, key, headers)
+
+    return await _generate_pdf(request, db, conditions, summary, key, headers)
+
+
+def _detail_query(conditions: list):
+    """詳細一覧の取得クエリ（表示に使うカラムのみ。CSV/PDF共通）"""
+    return (
+        select(
+            Issue.date, Store.name, Employee.employee_code, Employee.name,
+            Issue.type, Issue.severity, Issue.rule_description, Issue.status,
         )
-        .order_by(AttendanceRecord.date, Employee.employee_code)
+        .join(Employee, Employee.id == Issue.employee_id)
+        .outerjoin(Store, Store.id == Issue.store_id)
+        .where(*conditions)
+        .order_by(Issue.date, Employee.employee_code, Issue.detected_at)
     )
-    result = await db.execute(query)
-    issues = result.scalars().unique().all()
-
-    if request.format == "csv":
-        return _generate_csv(request, issues)
-    else:
-        return _generate_pdf(request, issues)
 
 
-def _generate_csv(request: ReportRequest, issues: list) -> StreamingResponse:
-    """CSV生成"""
+async def _csv_chunks(
+    request: ReportRequest,
+    conditions: list,
+    summary: IssueSummary,
+) -> AsyncIterator[bytes]:
+    """CSVを分割してエンコード済みで返す（BOMは先頭チャンクのみ）
+
+    詳細行は専用セッションのサーバーサイドカーソルから CSV_STREAM_BATCH 行ずつ読み出すため、
+    対象期間・店舗数が増えてもメモリ使用量は一定に保たれる。
+    """
     output = io.StringIO()
     writer = csv.writer(output)
 
+    def flush() -> str:
+        data = output.getvalue()
+        output.seek(0)
+        output.truncate(0)
+        return data
+
     writer.writerow([f"勤怠異常レポート - {request.month}"])
     writer.writerow([f"生成日時: {datetime.now().strftime('%Y-%m-%d %H:%M')}"])
     writer.writerow([])
@@ -143,197 +380,225 @@ def _generate_csv(request: ReportRequest, issues: list) -> StreamingResponse:
     # サマリー
     writer.writerow(["【サマリー】"])
     writer.writerow(["異常種別", "件数"])
-    type_counts: dict[str, int] = {}
-    for issue in issues:
-        t = _get_str(issue.type)
-        type_counts[t] = type_counts.get(t, 0) + 1
-    for t, count in sorted(type_counts.items()):
+    for t, count in summary.by_type().items():
         writer.writerow([ISSUE_TYPE_LABELS.get(t, t), count])
-    writer.writerow(["合計", len(issues)])
+    writer.writerow(["合計", summary.total])
     writer.writerow([])
 
     # ステータス別
     writer.writerow(["ステータス", "件数"])
-    status_counts: dict[str, int] = {}
-    for issue in issues:
-        s = _get_str(issue.status)
-        status_counts[s] = status_counts.get(s, 0) + 1
-    for s, count in sorted(status_counts.items()):
+    for s, count in summary.by_status().items():
         writer.writerow([STATUS_LABELS.get(s, s), count])
     writer.writerow([])
 
     # 詳細一覧
     writer.writerow(["【詳細一覧】"])
     writer.writerow(["日付", "店舗", "従業員コード", "従業員名", "異常種別", "重要度", "詳細", "ステータス"])
-    for issue in issues:
-        attendance = issue.attendance_record
-        employee = attendance.employee
-        store = employee.store
-        emp_name = mask_name(employee.name) if request.mask_personal_info else employee.name
-
-        writer.writerow([
-            str(attendance.date),
-            store.name if store else "",
-            employee.employee_code,
-            emp_name,
-            ISSUE_TYPE_LABELS.get(_get_str(issue.type), _get_str(issue.type)),
-            SEVERITY_LABELS.get(_get_str(issue.severity), _get_str(issue.severity)),
-            issue.rule_description,
-            STATUS_LABELS.get(_get_str(issue.status), _get_str(issue.status)),
-        ])
-
-    content = output.getvalue()
+    yield flush().encode("utf-8-sig")
+
+    query = _detail_query(conditions).execution_options(yield_per=CSV_STREAM_BATCH)
+    async with async_session_maker() as session:
+        result = await session.stream(query)
+        async for rows in result.partitions():
+            for issue_date, store_name, employee_code, employee_name, t, severity, description, s in rows:
+                writer.writerow([
+                    str(issue_date),
+                    store_name or "",
+                    employee_code,
+                    mask_name(employee_name) if request.mask_personal_info else employee_name,
+                    ISSUE_TYPE_LABELS.get(t, t),
+                    SEVERITY_LABELS.get(severity, severity),
+                    description,
+                    STATUS_LABELS.get(s, s),
+                ])
+            yield flush().encode("utf-8")
+
+
+def _generate_csv(
+    request: ReportRequest,
+    conditions: list,
+    summary: IssueSummary,
+    cache_key: str,
+    headers: dict[str, str],
+) -> StreamingResponse:
+    """CSV生成（ストリーミング。送信しながらキャッシュに保存する）"""
     return StreamingResponse(
-        iter([content.encode("utf-8-sig")]),
-        media_type="text/csv; charset=utf-8",
-        headers={"Content-Disposition": f"attachment; filename=report-{request.month}.csv"},
+        report_cache.tee(_csv_chunks(request, conditions, summary), cache_key, "csv"),
+        media_type=REPORT_MEDIA_TYPES["csv"],
+        headers=headers,
     )
 
 
-def _generate_pdf(request: ReportRequest, issues: list) -> StreamingResponse:
-    """PDF生成（reportlab）"""
-    buf = io.BytesIO()
-    doc = SimpleDocTemplate(
-        buf,
-        pagesize=A4,
-        leftMargin=15 * mm,
-        rightMargin=15 * mm,
-        topMargin=20 * mm,
-        bottomMargin=15 * mm,
+async def _render_pdf(
+    request: ReportRequest,
+    db: AsyncSession,
+    conditions: list,
+    summary: IssueSummary,
+) -> bytes:
+    """PDFを描画（描画はワーカープールで実行し、イベントループを塞がない）"""
+    result = await db.execute(_detail_query(conditions))
+    rows = [
+        [
+            str(issue_date),
+            store_name or "",
+            mask_name(employee_name) if request.mask_personal_info else employee_name,
+            ISSUE_TYPE_LABELS.get(t, t),
+            SEVERITY_LABELS.get(severity, severity),
+            STATUS_LABELS.get(s, s),
+        ]
+        for issue_date, store_name, _, employee_name, t, severity, _, s in result.all()
+    ]
+    data = PdfReportData(
+        month=request.month,
+        generated_at=datetime.now().strftime("%Y-%m-%d %H:%M"),
+        masked=request.mask_personal_info,
+        type_counts=[(ISSUE_TYPE_LABELS.get(t, t), count) for t, count in summary.by_type().items()],
+        status_counts=[(STATUS_LABELS.get(s, s), count) for s, count in summary.by_status().items()],
+        total=summary.total,
+        rows=rows,
     )
 
-    # スタイル定義
-    style_title = ParagraphStyle(
-        "Title", fontName=JP_FONT, fontSize=16, leading=22, spaceAfter=6,
-    )
-    style_subtitle = ParagraphStyle(
-        "Subtitle", fontName=JP_FONT, fontSize=10, leading=14, textColor=colors.grey,
-    )
-    style_heading = ParagraphStyle(
-        "Heading", fontName=JP_FONT, fontSize=12, leading=16, spaceBefore=12, spaceAfter=6,
-    )
-    style_body = ParagraphStyle(
-        "Body", fontName=JP_FONT, fontSize=9, leading=12,
-    )
-    style_disclaimer = ParagraphStyle(
-        "Disclaimer", fontName=JP_FONT, fontSize=7, leading=10, textColor=colors.grey,
-    )
+    return await render_pool.run(build_pdf, data)
 
-    elements: list = []
-
-    # タイトル
-    mask_label = "（個人情報マスク済）" if request.mask_personal_info else ""
-    elements.append(Paragraph(f"勤怠異常レポート - {request.month}{mask_label}", style_title))
-    elements.append(Paragraph(
-        f"生成日時: {datetime.now().strftime('%Y-%m-%d %H:%M')}　|　勤怠先生",
-        style_subtitle,
-    ))
-    elements.append(Spacer(1, 10 * mm))
-
-    # 集計
-    type_counts: dict[str, int] = {}
-    status_counts: dict[str, int] = {}
-    for issue in issues:
-        t = _get_str(issue.type)
-        s = _get_str(issue.status)
-        type_counts[t] = type_counts.get(t, 0) + 1
-        status_counts[s] = status_counts.get(s, 0) + 1
-
-    # サマリーテーブル（種別×ステータス 並べて表示）
-    elements.append(Paragraph("サマリー", style_heading))
-
-    summary_data = [["異常種別", "件数", "", "ステータス", "件数"]]
-    type_items = sorted(type_counts.items())
-    status_items = sorted(status_counts.items())
-    max_rows = max(len(type_items), len(status_items))
-    for i in range(max_rows):
-        row = []
-        if i < len(type_items):
-            row += [ISSUE_TYPE_LABELS.get(type_items[i][0], type_items[i][0]), str(type_items[i][1])]
-        else:
-            row += ["", ""]
-        row.append("")
-        if i < len(status_items):
-            row += [STATUS_LABELS.get(status_items[i][0], status_items[i][0]), str(status_items[i][1])]
-        else:
-            row += ["", ""]
-        summary_data.append(row)
-    summary_data.append(["合計", str(len(issues)), "", "", ""])
-
-    summary_table = Table(summary_data, colWidths=[55 * mm, 20 * mm, 10 * mm, 40 * mm, 20 * mm])
-    summary_table.setStyle(TableStyle([
-        ("FONTNAME", (0, 0), (-1, -1), JP_FONT),
-        ("FONTSIZE", (0, 0), (-1, -1), 9),
-        ("BACKGROUND", (0, 0), (1, 0), colors.HexColor("#1976d2")),
-        ("BACKGROUND", (3, 0), (4, 0), colors.HexColor("#1976d2")),
-        ("TEXTCOLOR", (0, 0), (1, 0), colors.white),
-        ("TEXTCOLOR", (3, 0), (4, 0), colors.white),
-        ("ALIGN", (1, 0), (1, -1), "RIGHT"),
-        ("ALIGN", (4, 0), (4, -1), "RIGHT"),
-        ("GRID", (0, 0), (1, -1), 0.5, colors.lightgrey),
-        ("GRID", (3, 0), (4, -1), 0.5, colors.lightgrey),
-        ("ROWBACKGROUNDS", (0, 1), (1, -1), [colors.white, colors.HexColor("#f5f5f5")]),
-        ("ROWBACKGROUNDS", (3, 1), (4, -1), [colors.white, colors.HexColor("#f5f5f5")]),
-        ("BOTTOMPADDING", (0, 0), (-1, -1), 4),
-        ("TOPPADDING", (0, 0), (-1, -1), 4),
-    ]))
-    elements.append(summary_table)
-    elements.append(Spacer(1, 8 * mm))
 
-    # 詳細一覧
-    elements.append(Paragraph("異常一覧", style_heading))
+async def _generate_pdf(
+    request: ReportRequest,
+    db: AsyncSession,
+    conditions: list,
+    summary: IssueSummary,
+    cache_key: str,
+    headers: dict[str, str],
+) -> Response:
+    """PDF生成（生成後にキャッシュへ保存する）"""
+    try:
+        pdf = await _render_pdf(request, db, conditions, summary)
+    except render_pool.RenderQueueFullError as e:
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail=str(e))
+
+    report_cache.put(cache_key, "pdf", pdf)
+    return Response(content=pdf, media_type=REPORT_MEDIA_TYPES["pdf"], headers=headers)
+
+
+# ========================================
+# 複数店舗の一括レポート
+# ========================================
+
+@router.post("/batch")
+async def generate_batch_report(
+    request: BatchReportRequest,
+    db: Annotated[AsyncSession, Depends(get_db)],
+    current_user: AdminUser,
+):
+    """複数店舗のレポートを一括生成しZIPで返す（Proプラン・管理者のみ）
 
-    if not issues:
-        elements.append(Paragraph("該当する異常データはありません。", style_body))
-    else:
-        detail_data = [["日付", "店舗", "従業員", "異常種別", "重要度", "ステータス"]]
-        for issue in issues:
-            attendance = issue.attendance_record
-            employee = attendance.employee
-            store = employee.store
-            emp_name = mask_name(employee.name) if request.mask_personal_info else employee.name
-
-            detail_data.append([
-                str(attendance.date),
-                store.name if store else "",
-                emp_name,
-                ISSUE_TYPE_LABELS.get(_get_str(issue.type), _get_str(issue.type)),
-                SEVERITY_LABELS.get(_get_str(issue.severity), _get_str(issue.severity)),
-                STATUS_LABELS.get(_get_str(issue.status), _get_str(issue.status)),
-            ])
-
-        detail_table = Table(
-            detail_data,
-            colWidths=[25 * mm, 28 * mm, 30 * mm, 35 * mm, 18 * mm, 22 * mm],
-            repeatRows=1,
-        )
-        detail_table.setStyle(TableStyle([
-            ("FONTNAME", (0, 0), (-1, -1), JP_FONT),
-            ("FONTSIZE", (0, 0), (-1, -1), 8),
-            ("BACKGROUND", (0, 0), (-1, 0), colors.HexColor("#1976d2")),
-            ("TEXTCOLOR", (0, 0), (-1, 0), colors.white),
-            ("ALIGN", (4, 0), (4, -1), "CENTER"),
-            ("ALIGN", (5, 0), (5, -1), "CENTER"),
-            ("GRID", (0, 0), (-1, -1), 0.5, colors.lightgrey),
-            ("ROWBACKGROUNDS", (0, 1), (-1, -1), [colors.white, colors.HexColor("#f5f5f5")]),
-            ("BOTTOMPADDING", (0, 0), (-1, -1), 3),
-            ("TOPPADDING", (0, 0), (-1, -1), 3),
-        ]))
-        elements.append(detail_table)
-
-    # 免責注記
-    elements.append(Spacer(1, 10 * mm))
-    elements.append(Paragraph(
-        "※ 本レポートは勤怠データに基づく異常の疑いを機械的に検知した結果であり、"
-        "法令違反の確定判断を行うものではありません。最終判断は社会保険労務士等の専門家にご確認ください。",
-        style_disclaimer,
-    ))
-
-    doc.build(elements)
-    buf.seek(0)
+    店舗ごとのレポートは並行して生成し、店舗コード順にZIPへ書き出す。
+    生成に失敗した店舗は manifest.csv に記録し、残りの店舗の出力は続ける。
+    """
+    allowed, message = await check_batch_report(db, current_user.organization_id)
+    if not allowed:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail=message)
+
+    query = (
+        select(Store.id, Store.code, Store.name)
+        .where(Store.organization_id == current_user.organization_id)
+        .order_by(Store.code)
+    )
+    if request.store_ids is not None:
+        query = query.where(Store.id.in_(request.store_ids))
+    stores = (await db.execute(query)).all()
+
+    found = {store_id for store_id, _, _ in stores}
+    missing_ids = [sid for sid in dict.fromkeys(request.store_ids or []) if sid not in found]
 
     return StreamingResponse(
-        buf,
-        media_type="application/pdf",
-        headers={"Content-Disposition": f"attachment; filename=report-{request.month}.pdf"},
+        _batch_zip_chunks(request, current_user, stores, missing_ids),
+        media_type="application/zip",
+        headers={"Content-Disposition": f"attachment; filename=reports-{request.month}.zip"},
     )
+
+
+async def _report_file(db: AsyncSession, current_user: User, request: ReportRequest) -> BinaryIO:
+    """レポートを読み出し用のファイルとして用意（キャッシュ済みならそれを開く）"""
+    conditions = _report_conditions(current_user, request.month, request.store_id)
+    ext = _report_ext(request.format)
+    key = _report_cache_key(current_user, request, ext, await report_data_version(db, conditions))
+    cached = report_cache.get(key, ext)
+    if cached is not None:
+        return open(cached, "rb")
+
+    summary = await summarize_issues(db, conditions)
+    out = tempfile.TemporaryFile()
+    try:
+        if ext == "csv":
+            async for chunk in report_cache.tee(_csv_chunks(request, conditions, summary), key, ext):
+                out.write(chunk)
+        else:
+            pdf = await _render_pdf(request, db, conditions, summary)
+            report_cache.put(key, ext, pdf)
+            out.write(pdf)
+        out.seek(0)
+    except BaseException:
+        out.close()
+        raise
+    return out
+
+
+async def _batch_zip_chunks(
+    request: BatchReportRequest,
+    current_user: User,
+    stores: list,
+    missing_ids: list[str],
+) -> AsyncIterator[bytes]:
+    """店舗ごとのレポートをZIPにして分割して返す
+
+    生成は RENDER_WORKERS 件ずつ並行して進め、ZIPへは店舗コード順に追加する。
+    生成済みのファイルはディスクに置くため、ZIP全体をメモリに持たない。
+    """
+    ext = _report_ext(request.format)
+    limit = asyncio.Semaphore(settings.render_workers)
+
+    async def produce(store_id: str) -> BinaryIO:
+        async with limit:
+            async with async_session_maker() as session:
+                return await _report_file(session, current_user, ReportRequest(
+                    store_id=store_id,
+                    month=request.month,
+                    format=ext,
+                    mask_personal_info=request.mask_personal_info,
+                ))
+
+    tasks = [asyncio.create_task(produce(store_id)) for store_id, _, _ in stores]
+    archive = ZipStream()
+    manifest = io.StringIO()
+    writer = csv.writer(manifest)
+    writer.writerow(["店舗コード", "店舗名", "ファイル名", "結果", "メッセージ"])
+
+    try:
+        for (store_id, code, name), task in zip(stores, tasks):
+            filename = f"report-{request.month}-{code}.{ext}"
+            try:
+                fp = await task
+            except render_pool.RenderQueueFullError as e:
+                writer.writerow([code, name, "", "失敗", str(e)])
+                continue
+            except Exception:
+                logger.warning("Failed to generate report for store %s", store_id, exc_info=True)
+                writer.writerow([code, name, "", "失敗", "レポートの生成に失敗しました"])
+                continue
+            with fp:
+                # PDFは圧縮済みのため格納のみ
+                for chunk in archive.add_file(filename, fp, compress=ext == "csv"):
+                    yield chunk
+            writer.writerow([code, name, filename, "成功", ""])
+
+        for store_id in missing_ids:
+            writer.writerow(["", "", "", "失敗", f"店舗が見つかりません（{store_id}）"])
+        yield archive.add_bytes("manifest.csv", manifest.getvalue().encode("utf-8-sig"))
+        yield archive.close()
+    finally:
+        # 途中で切断された場合は残りの生成を止め、開いたファイルを閉じる
+        for task in tasks:
+            if not task.done():
+                task.cancel()
+            elif not task.cancelled() and task.exception() is None:
+                task.result().close()
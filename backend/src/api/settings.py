@@ -1,24 +1,33 @@
 """設定API"""
 
+from datetime import date
 from typing import Annotated
 
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy import select, delete
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from src.core.database import get_db
 from src.core.auth import CurrentUser, AdminUser
-from src.models.settings import DetectionRule, ReasonTemplate, VocabularyDict
+from src.models.settings import DetectionRule, DetectionRuleOverride, ReasonTemplate, VocabularyDict
+from src.models.store import Store
 from src.schemas.settings import (
-    DetectionRuleResponse, DetectionRuleUpdate,
+    DetectionRuleResponse, DetectionRuleUpdateRequest, RedetectionJobResponse,
+    RuleSimulationRequest, RuleSimulationResponse, RuleSimulationRow, RuleSimulationTotal,
+    RuleOverrideItem, RuleOverrideListResponse, RuleOverrideUpdateRequest,
     TemplateItem, TemplateListResponse, TemplateUpdateRequest,
     DictEntry, DictListResponse, DictUpdateRequest,
 )
+from src.services import rule_cache, redetection
+from src.services.rule_simulation import load_history, count_issues, compare_counts
+from src.services.rule_overrides import OVERRIDE_PARAMS, load_rule_overrides
 from src.config import settings as app_settings
 
 
 router = APIRouter()
 
+RULE_FIELDS = ("break_minutes_6h", "break_minutes_8h", "daily_work_hours_alert", "night_start_hour", "night_end_hour")
+
 # デフォルトテンプレート
 DEFAULT_TEMPLATES = [
     {
@@ -92,16 +101,25 @@ async def get_rules(
 
 @router.put("/rules", response_model=DetectionRuleResponse)
 async def update_rules(
-    request: DetectionRuleUpdate,
+    request: DetectionRuleUpdateRequest,
     db: Annotated[AsyncSession, Depends(get_db)],
     current_user: AdminUser,
 ):
-    """検知ルール更新（管理者のみ）"""
+    """検知ルール更新（管理者のみ）
+
+    redetect_from を指定した場合、閾値が変わったルールについて既存の勤怠を
+    再検知するジョブを登録し、redetect_job_id を返す（進捗は GET /rules/redetect/{job_id}）。
+    深夜時間帯が変わった場合は、日次集計の作り直しも同じジョブでバックグラウンド実行する。
+    """
     result = await db.execute(
         select(DetectionRule)
         .where(DetectionRule.organization_id == current_user.organization_id)
     )
     rule = result.scalar_one_or_none()
+    old_rules = {
+        name: getattr(rule, name) if rule else getattr(app_settings, f"default_{name}")
+        for name in RULE_FIELDS
+    }
 
     if rule is None:
         rule = DetectionRule(
@@ -128,13 +146,182 @@ async def update_rules(
     await db.commit()
     await db.refresh(rule)
 
-    return DetectionRuleResponse(
-        break_minutes_6h=rule.break_minutes_6h,
-        break_minutes_8h=rule.break_minutes_8h,
-        daily_work_hours_alert=rule.daily_work_hours_alert,
-        night_start_hour=rule.night_start_hour,
-        night_end_hour=rule.night_end_hour,
+    # 検知ルールキャッシュを無効化（他ワーカーは updated_at の変化で検出）
+    rule_cache.invalidate(current_user.organization_id)
+
+    new_rules = {name: getattr(rule, name) for name in RULE_FIELDS}
+
+    # 日次集計のうち深夜時間は深夜帯の設定に依存するため作り直す
+    rebuild_metrics = (new_rules["night_start_hour"], new_rules["night_end_hour"]) != (
+        old_rules["night_start_hour"], old_rules["night_end_hour"]
     )
+    # 閾値が変わったルールだけを既存の勤怠に対して再検知
+    issue_types = redetection.changed_issue_types(old_rules, new_rules) if request.redetect_from else []
+
+    job_id = None
+    if rebuild_metrics or issue_types:
+        job = await redetection.enqueue_redetection(
+            organization_id=current_user.organization_id,
+            user_id=current_user.id,
+            rules=new_rules,
+            issue_types=issue_types,
+            date_from=request.redetect_from if issue_types else None,
+            date_to=(request.redetect_to or date.today()) if issue_types else None,
+            rebuild_metrics=rebuild_metrics,
+        )
+        job_id = job.id
+
+    return DetectionRuleResponse(**new_rules, redetect_job_id=job_id)
+
+
+@router.get("/rules/redetect/{job_id}", response_model=RedetectionJobResponse)
+async def get_redetection_job(
+    job_id: str,
+    current_user: AdminUser,
+):
+    """再検知ジョブの進捗取得（管理者のみ）"""
+    job = await redetection.get_job(job_id, current_user.organization_id)
+    if job is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="ジョブが見つかりません")
+    return RedetectionJobResponse.model_validate(job)
+
+
+@router.post("/rules/simulate", response_model=RuleSimulationResponse)
+async def simulate_rules(
+    request: RuleSimulationRequest,
+    db: Annotated[AsyncSession, Depends(get_db)],
+    current_user: AdminUser,
+):
+    """検知ルール変更のシミュレーション（管理者のみ）
+
+    過去 months か月分の勤怠を現在のルールと候補のルールで判定し直し、
+    異常種別×店舗×月の件数を比較する。既存の異常・設定は変更しない。
+    複数日ルール（週40時間・36協定など）は閾値が変わらないため対象外。
+    店舗別・勤務区分別の上書きは現在・候補のどちらにもそのまま適用する。
+    """
+    # 判定処理は pandas を含むため初回利用時に読み込む
+    from src.services.detection import get_detection_rules
+
+    current_rules = await get_detection_rules(db, current_user.organization_id)
+    candidate_rules = {
+        **current_rules,
+        **request.model_dump(include=set(current_rules), exclude_none=True),
+    }
+
+    today = date.today()
+    month_index = today.year * 12 + today.month - 1 - (request.months - 1)
+    period_from = date(month_index // 12, month_index % 12 + 1, 1)
+    history = await load_history(db, current_user.organization_id, period_from, today, request.store_id)
+
+    overrides = await load_rule_overrides(db, current_user.organization_id)
+    rows = compare_counts(
+        count_issues(history, current_rules, overrides),
+        count_issues(history, candidate_rules, overrides),
+    )
+    totals: dict[str, list[int]] = {}
+    for row in rows:
+        total = totals.setdefault(row.type, [0, 0])
+        total[0] += row.current_count
+        total[1] += row.candidate_count
+
+    store_names = dict((await db.execute(
+        select(Store.id, Store.name).where(Store.organization_id == current_user.organization_id)
+    )).all())
+
+    return RuleSimulationResponse(
+        period_from=period_from,
+        period_to=today,
+        record_count=len(history),
+        current_rules=DetectionRuleResponse(**current_rules),
+        candidate_rules=DetectionRuleResponse(**candidate_rules),
+        totals=[
+            RuleSimulationTotal(type=issue_type, current_count=current, candidate_count=candidate)
+            for issue_type, (current, candidate) in totals.items()
+        ],
+        rows=[
+            RuleSimulationRow(
+                type=row.type,
+                store_id=row.store_id,
+                store_name=store_names.get(row.store_id, ""),
+                month=row.month,
+                current_count=row.current_count,
+                candidate_count=row.candidate_count,
+            )
+            for row in rows
+        ],
+    )
+
+
+def _override_item(o: DetectionRuleOverride) -> RuleOverrideItem:
+    return RuleOverrideItem(
+        id=str(o.id),
+        store_id=o.store_id,
+        work_type=o.work_type,
+        **{name: getattr(o, name) for name in OVERRIDE_PARAMS},
+    )
+
+
+@router.get("/rule-overrides", response_model=RuleOverrideListResponse)
+async def get_rule_overrides(
+    db: Annotated[AsyncSession, Depends(get_db)],
+    current_user: AdminUser,
+):
+    """店舗別・勤務区分別の検知ルール上書き取得"""
+    overrides = await load_rule_overrides(db, current_user.organization_id)
+    overrides.sort(key=lambda o: (o.store_id or "", o.work_type or ""))
+    return RuleOverrideListResponse(overrides=[_override_item(o) for o in overrides])
+
+
+@router.put("/rule-overrides", response_model=RuleOverrideListResponse)
+async def update_rule_overrides(
+    request: RuleOverrideUpdateRequest,
+    db: Annotated[AsyncSession, Depends(get_db)],
+    current_user: AdminUser,
+):
+    """店舗別・勤務区分別の検知ルール上書き更新（全置換、管理者のみ）
+
+    組織 → 店舗 → 勤務区分 → 店舗×勤務区分 の順に重ねて適用する。
+    変更後の取り込みから反映され、既存の勤怠は再検知しない。
+    """
+    keys = [(item.store_id, item.work_type) for item in request.overrides]
+    if len(set(keys)) != len(keys):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="同じ店舗・勤務区分の組み合わせが重複しています",
+        )
+
+    store_ids = {item.store_id for item in request.overrides if item.store_id}
+    if store_ids:
+        known = set((await db.execute(
+            select(Store.id).where(
+                Store.organization_id == current_user.organization_id,
+                Store.id.in_(store_ids),
+            )
+        )).scalars().all())
+        if store_ids - known:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="店舗が見つかりません")
+
+    # 既存を削除
+    await db.execute(
+        delete(DetectionRuleOverride)
+        .where(DetectionRuleOverride.organization_id == current_user.organization_id)
+    )
+
+    # 新規作成
+    new_overrides = []
+    for item in request.overrides:
+        o = DetectionRuleOverride(
+            organization_id=current_user.organization_id,
+            store_id=item.store_id,
+            work_type=item.work_type,
+            **item.model_dump(include=set(OVERRIDE_PARAMS)),
+        )
+        db.add(o)
+        new_overrides.append(o)
+
+    await db.flush()
+
+    return RuleOverrideListResponse(overrides=[_override_item(o) for o in new_overrides])
 
 
 @router.get("/templates", response_model=TemplateListResponse)
@@ -4,12 +4,13 @@ from typing import Annotated
 from uuid import UUID
 
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy import select
+from sqlalchemy import select, delete
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from src.core.database import get_db
 from src.core.auth import AdminUser
 from src.models.store import Store
+from src.models.settings import DetectionRuleOverride
 from src.schemas.store import StoreResponse, StoreCreate, StoreUpdate, StoreListResponse
 from src.services.plan_limits import check_client_limit
 
@@ -162,6 +163,8 @@ async def delete_store(
     if store is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="店舗が見つかりません")
 
+    # 店舗別の検知ルール上書きは店舗とともに削除
+    await db.execute(delete(DetectionRuleOverride).where(DetectionRuleOverride.store_id == store.id))
     await db.delete(store)
     await db.commit()
 
@@ -46,6 +46,23 @@ class Settings(BaseSettings):
     default_night_start_hour: int = 22
     default_night_end_hour: int = 5
 
+    # バックグラウンド取り込み
+    import_worker_count: int = 2
+    import_spool_dir: str = ""  # 空の場合はOSの一時ディレクトリ配下
+    import_jobs_persist: bool = False  # True: ジョブ進捗を import_jobs テーブルにも保存（PostgreSQL のみ）
+
+    # 検知ルール変更時の再検知
+    redetect_batch_employees: int = 200  # 1トランザクションで処理する従業員数
+
+    # PDFレポート描画
+    render_workers: int = 2  # 同時に描画するレポート数の上限
+    render_use_processes: bool = True  # False: プロセスではなくスレッドで描画
+    render_max_queue: int = 20  # 描画待ちがこれを超えると 503 を返す
+
+    # 生成済みレポートのキャッシュ
+    report_cache_dir: str = ""  # 空の場合はOSの一時ディレクトリ配下
+    report_cache_max_mb: int = 256  # 合計サイズの上限（0 でキャッシュしない）
+
     class Config:
         env_file = ".env.local"
         env_file_encoding = "utf-8"
@@ -67,6 +84,13 @@ def get_settings() -> Settings:
                 "JWT_SECRET_KEY がデフォルト値のまま起動しています。"
                 "環境変数 JWT_SECRET_KEY を設定してください。"
             )
+    if s.import_jobs_persist and s.database_url.startswith("sqlite"):
+        # SQLite は取り込み全体を1つの書き込みトランザクションで行う間、別セッションからの
+        # 進捗の保存がロック待ちで失敗し、ポーリングに古い進捗が返るため使えない
+        raise RuntimeError(
+            "IMPORT_JOBS_PERSIST は PostgreSQL でのみ使用できます。"
+            "SQLite では IMPORT_JOBS_PERSIST=false にしてください。"
+        )
     return s
 
 
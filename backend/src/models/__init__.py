@@ -3,9 +3,11 @@
 from src.models.user import User
 from src.models.store import Store, Organization
 from src.models.employee import Employee
-from src.models.attendance import AttendanceRecord
+from src.models.attendance import AttendanceRecord, AttendanceDailyMetrics
 from src.models.issue import Issue, IssueLog, CorrectionReason
-from src.models.settings import DetectionRule, ReasonTemplate, VocabularyDict
+from src.models.settings import DetectionRule, DetectionRuleOverride, ReasonTemplate, VocabularyDict
+from src.models.import_job import ImportJob
+from src.models.redetection_job import RedetectionJob
 
 __all__ = [
     "User",
@@ -13,10 +15,14 @@ __all__ = [
     "Organization",
     "Employee",
     "AttendanceRecord",
+    "AttendanceDailyMetrics",
     "Issue",
     "IssueLog",
     "CorrectionReason",
     "DetectionRule",
+    "DetectionRuleOverride",
     "ReasonTemplate",
     "VocabularyDict",
+    "ImportJob",
+    "RedetectionJob",
 ]
@@ -24,7 +24,47 @@ class AttendanceRecord(Base):
     break_minutes: Mapped[int | None] = mapped_column(Integer, nullable=True)
     work_type: Mapped[str | None] = mapped_column(String(20), nullable=True)
     imported_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=lambda: datetime.now(timezone.utc))
+    # 最終更新（ルールシミュレーションの勤怠キャッシュの判定に使う）。
+    # 同じ秒の更新も区別できるよう、SQL の now() ではなくアプリ側の時刻で更新する
+    updated_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), nullable=False,
+        default=lambda: datetime.now(timezone.utc), onupdate=lambda: datetime.now(timezone.utc),
+    )
 
     # リレーション
     employee = relationship("Employee", back_populates="attendance_records")
     issues = relationship("Issue", back_populates="attendance_record", cascade="all, delete-orphan")
+    daily_metrics = relationship(
+        "AttendanceDailyMetrics", back_populates="attendance_record", cascade="all, delete-orphan", uselist=False,
+    )
+
+
+class AttendanceDailyMetrics(Base):
+    """日次勤怠集計テーブル
+
+    勤怠レコード1件ごとの実労働・休憩・深夜・時間外の分数。取り込み時に計算して保存し、
+    深夜時間帯の設定変更時に組織単位で再計算する。月次集計・複数日ルールは
+    打刻から再計算せずにこの値を合算する。
+    organization_id / store_id / employee_id / date は集計用の非正規化カラム。
+    打刻漏れのレコードは worked / night / overtime が NULL。
+    """
+    __tablename__ = "attendance_daily_metrics"
+    __table_args__ = (
+        Index("ix_daily_metrics_org_store_date", "organization_id", "store_id", "date"),
+        Index("ix_daily_metrics_org_date", "organization_id", "date"),
+        Index("ix_daily_metrics_employee_date", "employee_id", "date"),
+    )
+
+    attendance_record_id: Mapped[str] = mapped_column(String(36), ForeignKey("attendance_records.id"), primary_key=True)
+    organization_id: Mapped[str] = mapped_column(String(36), ForeignKey("organizations.id"), nullable=False)
+    store_id: Mapped[str] = mapped_column(String(36), ForeignKey("stores.id"), nullable=False)
+    employee_id: Mapped[str] = mapped_column(String(36), ForeignKey("employees.id"), nullable=False)
+    date: Mapped[date] = mapped_column(Date, nullable=False)
+    worked_minutes: Mapped[int | None] = mapped_column(Integer, nullable=True)  # 拘束時間 − 休憩
+    break_minutes: Mapped[int | None] = mapped_column(Integer, nullable=True)
+    night_minutes: Mapped[int | None] = mapped_column(Integer, nullable=True)
+    overtime_minutes: Mapped[int | None] = mapped_column(Integer, nullable=True)  # 法定労働時間（8時間）超
+    computed_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=lambda: datetime.now(timezone.utc))
+
+    # リレーション
+    attendance_record = relationship("AttendanceRecord", back_populates="daily_metrics")
@@ -1,10 +1,10 @@
 """異常・是正モデル"""
 
 import uuid
-from datetime import datetime, timezone
+from datetime import datetime, date, timezone
 from enum import Enum
 
-from sqlalchemy import Index, String, Text, DateTime, ForeignKey
+from sqlalchemy import Index, String, Text, Date, DateTime, ForeignKey, text
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from src.core.database import Base
@@ -18,6 +18,12 @@ class IssueType(str, Enum):
     OVERTIME = "overtime"
     NIGHT_WORK = "night_work"
     INCONSISTENCY = "inconsistency"
+    WEEKLY_OVERTIME = "weekly_overtime"
+    MONTHLY_OVERTIME = "monthly_overtime"
+    ANNUAL_OVERTIME = "annual_overtime"
+    OVERTIME_100H = "overtime_100h"
+    OVERTIME_AVERAGE_80H = "overtime_average_80h"
+    CONSECUTIVE_WORKDAYS = "consecutive_workdays"
 
 
 class IssueSeverity(str, Enum):
@@ -68,21 +74,39 @@ class PreventionType(str, Enum):
 
 
 class Issue(Base):
-    """異常テーブル"""
+    """異常テーブル
+
+    organization_id / store_id / employee_id / date は勤怠レコード・従業員からの
+    非正規化カラム。一覧・レポートを結合なしで絞り込むために登録時に設定する。
+    """
     __tablename__ = "issues"
     __table_args__ = (
         Index("ix_issues_attendance", "attendance_record_id"),
         Index("ix_issues_status", "status"),
         Index("ix_issues_severity", "severity"),
+        Index("ix_issues_org_detected", "organization_id", text("detected_at DESC"), text("id DESC")),
+        Index("ix_issues_org_status_detected", "organization_id", "status", text("detected_at DESC"), text("id DESC")),
+        Index("ix_issues_org_store_date", "organization_id", "store_id", "date"),
+        Index("ix_issues_org_date", "organization_id", "date"),
+        Index("ix_issues_employee_date", "employee_id", "date"),
     )
 
     id: Mapped[str] = mapped_column(String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
     attendance_record_id: Mapped[str] = mapped_column(String(36), ForeignKey("attendance_records.id"), nullable=False)
+    organization_id: Mapped[str] = mapped_column(String(36), ForeignKey("organizations.id"), nullable=False)
+    store_id: Mapped[str] = mapped_column(String(36), ForeignKey("stores.id"), nullable=False)
+    employee_id: Mapped[str] = mapped_column(String(36), ForeignKey("employees.id"), nullable=False)
+    date: Mapped[date] = mapped_column(Date, nullable=False)  # 勤怠日
     type: Mapped[str] = mapped_column(String(30), nullable=False)
     severity: Mapped[str] = mapped_column(String(10), nullable=False)
     status: Mapped[str] = mapped_column(String(20), nullable=False, default=IssueStatus.PENDING.value)
     rule_description: Mapped[str] = mapped_column(Text, nullable=False)
     detected_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=lambda: datetime.now(timezone.utc))
+    # ステータス・文言の最終更新（一括 UPDATE では onupdate が効かない場合があるため明示的に設定する）
+    updated_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), nullable=False,
+        default=lambda: datetime.now(timezone.utc), onupdate=lambda: datetime.now(timezone.utc),
+    )
 
     # リレーション
     attendance_record = relationship("AttendanceRecord", back_populates="issues")
@@ -0,0 +1,41 @@
+"""再検知ジョブモデル"""
+
+import uuid
+from datetime import date, datetime, timezone
+
+from sqlalchemy import Index, String, Text, Date, DateTime, Integer, Boolean, JSON, ForeignKey
+from sqlalchemy.orm import Mapped, mapped_column
+
+from src.core.database import Base
+from src.models.import_job import ImportJobStatus
+
+
+class RedetectionJob(Base):
+    """再検知ジョブテーブル（検知ルール変更時の再検知・日次集計の作り直しの進捗）"""
+    __tablename__ = "redetection_jobs"
+    __table_args__ = (
+        Index("ix_redetection_jobs_org_created", "organization_id", "created_at"),
+    )
+
+    id: Mapped[str] = mapped_column(String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
+    organization_id: Mapped[str] = mapped_column(String(36), ForeignKey("organizations.id"), nullable=False)
+    user_id: Mapped[str] = mapped_column(String(36), ForeignKey("users.id"), nullable=False)
+    rules: Mapped[dict] = mapped_column(JSON, nullable=False)  # 判定に使う閾値
+    issue_types: Mapped[list] = mapped_column(JSON, nullable=False, default=list)
+    date_from: Mapped[date | None] = mapped_column(Date, nullable=True)
+    date_to: Mapped[date | None] = mapped_column(Date, nullable=True)
+    rebuild_metrics: Mapped[bool] = mapped_column(Boolean, nullable=False, default=False)
+    status: Mapped[str] = mapped_column(String(20), nullable=False, default=ImportJobStatus.QUEUED.value)
+    employees_total: Mapped[int | None] = mapped_column(Integer, nullable=True)
+    employees_processed: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    record_count: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    metrics_count: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    created_count: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    updated_count: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    closed_count: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    reopened_count: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    kept_count: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    error: Mapped[str | None] = mapped_column(Text, nullable=True)
+    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=lambda: datetime.now(timezone.utc))
+    started_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True), nullable=True)
+    finished_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True), nullable=True)
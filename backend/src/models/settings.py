@@ -3,7 +3,7 @@
 import uuid
 from datetime import datetime
 
-from sqlalchemy import String, Integer, Text, DateTime, ForeignKey
+from sqlalchemy import Index, String, Integer, Text, DateTime, ForeignKey
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from src.core.database import Base
@@ -27,6 +27,29 @@ class DetectionRule(Base):
     organization = relationship("Organization", back_populates="detection_rules")
 
 
+class DetectionRuleOverride(Base):
+    """検知ルールの上書き設定テーブル（店舗別・勤務区分別）
+
+    store_id / work_type の一方または両方を指定し、NULL でない閾値だけを上書きする。
+    組織 → 店舗 → 勤務区分 → 店舗×勤務区分 の順に重ねて適用する。
+    深夜時間帯は法定の割増対象のため上書きできない。
+    """
+    __tablename__ = "detection_rule_overrides"
+    __table_args__ = (
+        Index("ix_rule_overrides_org", "organization_id"),
+    )
+
+    id: Mapped[str] = mapped_column(String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
+    organization_id: Mapped[str] = mapped_column(String(36), ForeignKey("organizations.id"), nullable=False)
+    store_id: Mapped[str | None] = mapped_column(String(36), ForeignKey("stores.id"), nullable=True)
+    work_type: Mapped[str | None] = mapped_column(String(20), nullable=True)  # AttendanceRecord.work_type と同じ値
+    break_minutes_6h: Mapped[int | None] = mapped_column(Integer, nullable=True)
+    break_minutes_8h: Mapped[int | None] = mapped_column(Integer, nullable=True)
+    daily_work_hours_alert: Mapped[int | None] = mapped_column(Integer, nullable=True)
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
+    updated_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+
 class ReasonTemplate(Base):
     """理由文テンプレートテーブル"""
     __tablename__ = "reason_templates"
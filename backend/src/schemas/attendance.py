@@ -0,0 +1,33 @@
+"""勤怠データスキーマ"""
+
+from datetime import datetime
+
+from pydantic import BaseModel, ConfigDict
+
+
+class RowErrorResponse(BaseModel):
+    """取り込めなかった行"""
+    line: int
+    column: str
+    value: str
+    message: str
+
+
+class ImportJobResponse(BaseModel):
+    """取り込みジョブの進捗"""
+    model_config = ConfigDict(from_attributes=True)
+
+    id: str
+    status: str  # queued / running / completed / failed
+    filename: str | None
+    rows_total: int | None
+    rows_processed: int
+    record_count: int
+    skip_count: int
+    issue_count: int
+    error_count: int
+    row_errors: list[RowErrorResponse]
+    error: str | None
+    created_at: datetime
+    started_at: datetime | None
+    finished_at: datetime | None
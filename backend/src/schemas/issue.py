@@ -56,9 +56,10 @@ class IssueResponse(CamelCaseModel):
 class IssueListResponse(CamelCaseModel):
     """異常一覧レスポンス"""
     items: list[IssueResponse]
-    total: int
+    total: int | None  # total_mode=none の場合は null
     page: int
     page_size: int
+    next_cursor: str | None = None
 
 
 class IssueUpdateRequest(BaseModel):
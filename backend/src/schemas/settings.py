@@ -1,6 +1,8 @@
 """設定スキーマ"""
 
-from pydantic import BaseModel, ConfigDict, field_validator
+from datetime import date, datetime
+
+from pydantic import BaseModel, ConfigDict, Field, field_validator, model_validator
 
 
 class DetectionRuleResponse(BaseModel):
@@ -12,6 +14,7 @@ class DetectionRuleResponse(BaseModel):
     daily_work_hours_alert: int
     night_start_hour: int
     night_end_hour: int
+    redetect_job_id: str | None = None  # 更新時に登録した再検知・日次集計の作り直しジョブ
 
 
 class DetectionRuleUpdate(BaseModel):
@@ -44,6 +47,122 @@ class DetectionRuleUpdate(BaseModel):
         return v
 
 
+class DetectionRuleUpdateRequest(DetectionRuleUpdate):
+    """検知ルール更新リクエスト
+
+    redetect_from を指定すると、閾値が変わったルールについて
+    redetect_from〜redetect_to（省略時は当日）の勤怠を再検知するジョブを登録する。
+    """
+    redetect_from: date | None = None
+    redetect_to: date | None = None
+
+    @model_validator(mode="after")
+    def validate_redetect_range(self) -> "DetectionRuleUpdateRequest":
+        if self.redetect_to is not None and self.redetect_from is None:
+            raise ValueError("redetect_to を指定する場合は redetect_from も指定してください")
+        if self.redetect_from and self.redetect_to and self.redetect_from > self.redetect_to:
+            raise ValueError("再検知の開始日は終了日以前を指定してください")
+        return self
+
+
+class RedetectionJobResponse(BaseModel):
+    """再検知ジョブの進捗"""
+    model_config = ConfigDict(from_attributes=True)
+
+    id: str
+    status: str  # queued / running / completed / failed
+    issue_types: list[str]
+    date_from: date | None
+    date_to: date | None
+    rebuild_metrics: bool
+    employees_total: int | None
+    employees_processed: int
+    record_count: int
+    metrics_count: int
+    created_count: int
+    updated_count: int
+    closed_count: int
+    reopened_count: int
+    kept_count: int
+    error: str | None
+    created_at: datetime
+    started_at: datetime | None
+    finished_at: datetime | None
+
+
+class RuleSimulationRequest(DetectionRuleUpdate):
+    """検知ルール変更のシミュレーション（未指定の項目は現在の値）"""
+    months: int = Field(default=12, ge=1, le=24)  # 当月を含む過去の月数
+    store_id: str | None = None
+
+
+class RuleSimulationRow(BaseModel):
+    """異常種別×店舗×月の件数"""
+    type: str
+    store_id: str
+    store_name: str
+    month: str  # YYYY-MM
+    current_count: int
+    candidate_count: int
+
+
+class RuleSimulationTotal(BaseModel):
+    """異常種別ごとの件数"""
+    type: str
+    current_count: int
+    candidate_count: int
+
+
+class RuleSimulationResponse(BaseModel):
+    """検知ルール変更のシミュレーション結果"""
+    period_from: date
+    period_to: date
+    record_count: int
+    current_rules: DetectionRuleResponse
+    candidate_rules: DetectionRuleResponse
+    totals: list[RuleSimulationTotal]
+    rows: list[RuleSimulationRow]
+
+
+# 店舗別・勤務区分別の上書き
+class RuleOverrideItem(BaseModel):
+    """検知ルールの上書き1件（未指定の閾値は組織の設定を使う）"""
+    model_config = ConfigDict(from_attributes=True)
+
+    id: str | None = None
+    store_id: str | None = None  # 未指定なら全店舗
+    work_type: str | None = Field(default=None, max_length=20)  # 未指定なら全勤務区分
+    break_minutes_6h: int | None = None
+    break_minutes_8h: int | None = None
+    daily_work_hours_alert: int | None = None
+
+    @field_validator("break_minutes_6h", "break_minutes_8h")
+    @classmethod
+    def validate_break_minutes(cls, v: int | None) -> int | None:
+        return DetectionRuleUpdate.validate_break_minutes(v)
+
+    @field_validator("daily_work_hours_alert")
+    @classmethod
+    def validate_work_hours(cls, v: int | None) -> int | None:
+        return DetectionRuleUpdate.validate_work_hours(v)
+
+    @model_validator(mode="after")
+    def validate_target(self) -> "RuleOverrideItem":
+        if self.store_id is None and self.work_type is None:
+            raise ValueError("店舗または勤務区分のいずれかを指定してください")
+        return self
+
+
+class RuleOverrideListResponse(BaseModel):
+    """検知ルールの上書き一覧"""
+    overrides: list[RuleOverrideItem]
+
+
+class RuleOverrideUpdateRequest(BaseModel):
+    """検知ルールの上書き更新"""
+    overrides: list[RuleOverrideItem]
+
+
 # テンプレート
 class TemplateItem(BaseModel):
     """テンプレート1件"""
@@ -0,0 +1,158 @@
+"""勤怠CSVの型変換（列単位）
+
+正規化済みカラムの DataFrame を、行ごとの pd.to_datetime を使わずに
+列ごとまとめて型付きの列へ変換する。変換できないセルは行単位のエラーとして
+記録し、その行は取り込み対象から除外する。
+"""
+
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+
+SECONDS_PER_DAY = 24 * 60 * 60
+MAX_CLOCK_HOUR = 47  # 翌日表記（25:30 など）を許容する上限
+MAX_REPORTED_ERRORS = 100  # 応答に含める行エラーの上限（件数は全件数える）
+
+# フォーマットごとの日付形式（先頭から順に試し、残りは汎用パースで補う）
+DATE_FORMATS: dict[str, tuple[str, ...]] = {
+    "jobcan": ("%Y/%m/%d", "%Y-%m-%d"),
+    "king_of_time": ("%Y/%m/%d", "%Y%m%d"),
+    "airshift": ("%Y/%m/%d", "%Y-%m-%d"),
+    "smarthr": ("%Y-%m-%d", "%Y/%m/%d"),
+    "generic": ("%Y-%m-%d", "%Y/%m/%d"),
+}
+
+# エラー表示用のカラム名
+COLUMN_LABELS = {
+    "date": "日付",
+    "clock_in": "出勤時刻",
+    "clock_out": "退勤時刻",
+    "break_minutes": "休憩時間",
+}
+
+# 末尾の曜日表記「(月)」「（月）」
+_WEEKDAY_SUFFIX = r"\s*[（(][月火水木金土日][)）]\s*$"
+# 「09:00」「9:00:30」「2026/01/05 09:00」など（日付部分は無視）
+_CLOCK_PATTERN = r"^\s*(?:\d{4}[-/]\d{1,2}[-/]\d{1,2}[ T])?(\d{1,2}):(\d{2})(?::(\d{2})(?:\.\d+)?)?\s*$"
+_HOURS_MINUTES_PATTERN = r"^\s*(\d{1,3}):(\d{2})\s*$"
+
+
+@dataclass
+class RowError:
+    """変換できなかったセル（line はヘッダーを1行目とするCSV上の行番号）"""
+    line: int
+    column: str
+    value: str
+    message: str
+
+
+def _text(values: pd.Series) -> pd.Series:
+    """空セルを欠損値とした文字列列に変換"""
+    text = values.astype("string").str.strip()
+    return text.mask(text == "")
+
+
+def parse_dates(values: pd.Series, csv_format: str = "generic") -> pd.Series:
+    """日付列を datetime64 に変換（変換できないセルは NaT）"""
+    text = _text(values).str.replace(_WEEKDAY_SUFFIX, "", regex=True)
+    parsed = pd.Series(pd.NaT, index=values.index, dtype="datetime64[ns]")
+    for fmt in DATE_FORMATS.get(csv_format, DATE_FORMATS["generic"]):
+        pending = parsed.isna() & text.notna()
+        if not pending.any():
+            return parsed
+        parsed[pending] = pd.to_datetime(text[pending], format=fmt, errors="coerce")
+
+    # 想定外の形式の残りだけ汎用パース（セル単位のため遅いが件数は少ない）
+    pending = parsed.isna() & text.notna()
+    if pending.any():
+        parsed[pending] = pd.to_datetime(text[pending], format="mixed", errors="coerce")
+    return parsed
+
+
+def parse_clock_seconds(values: pd.Series) -> pd.Series:
+    """時刻列を0時からの秒数（Int32、欠損は NA）に変換
+
+    24時以降の翌日表記は日付をまたいだ時刻として扱う（25:30 → 1:30）。
+    変換できないセルも NA になるため、元の値と突き合わせてエラーを判定する。
+    """
+    parts = _text(values).str.extract(_CLOCK_PATTERN).astype("float64")
+    hours, minutes, seconds = parts[0], parts[1], parts[2].fillna(0)
+    valid = (hours <= MAX_CLOCK_HOUR) & (minutes < 60) & (seconds < 60)
+    total = (hours * 3600 + minutes * 60 + seconds) % SECONDS_PER_DAY
+    return total.where(valid).astype("Int32")
+
+
+def parse_break_minutes(values: pd.Series) -> pd.Series:
+    """休憩時間列を分（Int32、欠損は NA）に変換（「60」「60.0」「1:00」に対応）"""
+    text = _text(values)
+    minutes = pd.to_numeric(text, errors="coerce")
+    hm = text.str.extract(_HOURS_MINUTES_PATTERN).astype("float64")
+    from_hm = hm[0] * 60 + hm[1]
+    minutes = minutes.fillna(from_hm.where(hm[1] < 60))
+    return np.trunc(minutes.where(minutes >= 0)).astype("Int32")
+
+
+def coerce_attendance_frame(
+    df: pd.DataFrame,
+    csv_format: str = "generic",
+    first_line: int = 2,
+) -> tuple[pd.DataFrame, list[RowError], int]:
+    """正規化済みDataFrameを取り込み用の型付きDataFrameに変換
+
+    返り値は (型付きDataFrame, 行エラー（上限件数まで）, エラー件数)。
+    型付きDataFrameのカラム:
+        line, employee_code, name, date(datetime64), clock_in / clock_out（0時からの秒数, Int32）,
+        break_minutes(Int32), work_type
+    従業員コードが空の行は従来どおりエラーにせず除外する。
+    first_line は df の先頭行のCSV上の行番号。
+    """
+    n = len(df)
+    empty = pd.Series([pd.NA] * n, index=df.index, dtype="string")
+
+    def column(name: str) -> pd.Series:
+        return df[name] if name in df.columns else empty
+
+    employee_code = _text(column("employee_code"))
+    frame = pd.DataFrame({
+        "line": np.arange(first_line, first_line + n),
+        "employee_code": employee_code,
+        "name": _text(column("name")).fillna(employee_code),
+        "date": parse_dates(column("date"), csv_format),
+        "clock_in": parse_clock_seconds(column("clock_in")),
+        "clock_out": parse_clock_seconds(column("clock_out")),
+        "break_minutes": parse_break_minutes(column("break_minutes")),
+        "work_type": _text(column("work_type")),
+    }, index=df.index)
+
+    has_code = employee_code.notna()
+    checks = [
+        ("date", frame["date"].isna(), "日付を読み取れません"),
+        ("clock_in", frame["clock_in"].isna() & _text(column("clock_in")).notna(), "時刻を読み取れません"),
+        ("clock_out", frame["clock_out"].isna() & _text(column("clock_out")).notna(), "時刻を読み取れません"),
+        ("break_minutes", frame["break_minutes"].isna() & _text(column("break_minutes")).notna(), "休憩時間を読み取れません"),
+    ]
+
+    # 行番号順の先頭 MAX_REPORTED_ERRORS 件を返すため、全カラムの候補を集めてから並べて切り詰める
+    # （各カラムの候補は先頭 MAX_REPORTED_ERRORS 行で足りる）
+    invalid = pd.Series(False, index=df.index)
+    errors: list[RowError] = []
+    for name, failed, message in checks:
+        failed = failed & has_code
+        invalid |= failed
+        if not failed.any():
+            continue
+        lines = frame["line"][failed].head(MAX_REPORTED_ERRORS)
+        values = column(name)[failed].head(MAX_REPORTED_ERRORS)
+        for line, value in zip(lines, values):
+            errors.append(RowError(
+                line=int(line),
+                column=COLUMN_LABELS[name],
+                value="" if pd.isna(value) else str(value),
+                message=message,
+            ))
+    errors.sort(key=lambda e: e.line)  # 同じ行のエラーはカラム順のまま
+    error_count = int(invalid.sum())
+
+    return frame[has_code & ~invalid].reset_index(drop=True), errors[:MAX_REPORTED_ERRORS], error_count
@@ -0,0 +1,299 @@
+"""勤怠データ一括取り込みサービス
+
+行ごとに SELECT/flush を繰り返す代わりに、従業員の解決・重複チェック・
+レコード/異常の登録をそれぞれ一括クエリで行う。型変換も列単位で行う。
+"""
+
+import asyncio
+import uuid
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass, field
+from datetime import date, time
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import select, insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.models.employee import Employee
+from src.models.attendance import AttendanceRecord, AttendanceDailyMetrics
+from src.models.issue import Issue
+from src.services.detection import get_detection_rules, detect_issues_bulk
+from src.services.csv_parser import CsvStream
+from src.services.attendance_coercion import RowError, MAX_REPORTED_ERRORS, coerce_attendance_frame
+from src.services.attendance_metrics import compute_daily_metrics, build_metric_rows
+from src.services.window_rules import detect_window_issues
+from src.services.rule_overrides import get_rule_table
+
+
+# IN句に渡すパラメータ数の上限（SQLiteの変数上限対策）
+IN_CLAUSE_CHUNK = 500
+
+
+@dataclass
+class ImportResult:
+    """取り込み結果"""
+    record_count: int = 0
+    skip_count: int = 0
+    issue_count: int = 0
+    error_count: int = 0  # 型変換できず取り込まなかった行数
+    errors: list[RowError] = field(default_factory=list)  # 先頭 MAX_REPORTED_ERRORS 件まで
+    # 複数日ルールの再判定対象（登録したレコードの従業員と日付範囲）
+    affected_employee_ids: set[str] = field(default_factory=set)
+    affected_from: date | None = None
+    affected_to: date | None = None
+
+    def add(self, other: "ImportResult") -> None:
+        """チャンクごとの結果を累計に加える"""
+        self.record_count += other.record_count
+        self.skip_count += other.skip_count
+        self.issue_count += other.issue_count
+        self.error_count += other.error_count
+        self.errors.extend(other.errors[:MAX_REPORTED_ERRORS - len(self.errors)])
+        self.affected_employee_ids |= other.affected_employee_ids
+        if other.affected_from is not None:
+            self.affected_from = min(filter(None, (self.affected_from, other.affected_from)))
+            self.affected_to = max(filter(None, (self.affected_to, other.affected_to)))
+
+
+def _chunks(items: list, size: int = IN_CLAUSE_CHUNK):
+    """リストを size 件ずつに分割"""
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
+async def _resolve_employees(
+    db: AsyncSession,
+    organization_id: str,
+    store_id: str | None,
+    names: dict[str, str],
+) -> tuple[dict[str, str], dict[str, str], set[str]]:
+    """従業員コード → 従業員ID を一括解決し、未登録の従業員をまとめて作成
+
+    names は 従業員コード → 氏名（ファイル内で最初に現れた行）。
+    (コード→IDの辞書, ID→所属店舗IDの辞書, 今回新規作成した従業員IDの集合) を返す。
+    """
+    codes = list(names)
+
+    employee_ids: dict[str, str] = {}
+    employee_stores: dict[str, str] = {}
+    for chunk in _chunks(codes):
+        result = await db.execute(
+            select(Employee.id, Employee.employee_code, Employee.store_id).where(
+                Employee.organization_id == organization_id,
+                Employee.employee_code.in_(chunk),
+            )
+        )
+        for emp_id, code, emp_store_id in result.all():
+            employee_ids.setdefault(code, emp_id)
+            employee_stores[emp_id] = emp_store_id
+
+    new_employees = [
+        {
+            "id": str(uuid.uuid4()),
+            "organization_id": organization_id,
+            "store_id": store_id,
+            "employee_code": code,
+            "name": names[code],
+        }
+        for code in codes
+        if code not in employee_ids
+    ]
+    if new_employees:
+        await db.execute(insert(Employee), new_employees)
+        for emp in new_employees:
+            employee_ids[emp["employee_code"]] = emp["id"]
+            employee_stores[emp["id"]] = emp["store_id"]
+
+    return employee_ids, employee_stores, {emp["id"] for emp in new_employees}
+
+
+async def _existing_record_keys(
+    db: AsyncSession,
+    employee_ids: list[str],
+    date_min: date,
+    date_max: date,
+) -> set[tuple[str, date]]:
+    """期間内の既存の (従業員ID, 日付) の組を一括取得"""
+    keys: set[tuple[str, date]] = set()
+    if not employee_ids:
+        return keys
+
+    for chunk in _chunks(employee_ids):
+        result = await db.execute(
+            select(AttendanceRecord.employee_id, AttendanceRecord.date).where(
+                AttendanceRecord.employee_id.in_(chunk),
+                AttendanceRecord.date >= date_min,
+                AttendanceRecord.date <= date_max,
+            )
+        )
+        keys.update((emp_id, d) for emp_id, d in result.all())
+    return keys
+
+
+def _to_times(seconds: pd.Series) -> list[time | None]:
+    """0時からの秒数を time に変換（値の種類は高々86400通りのため一意な値だけ変換）"""
+    lookup = {
+        int(s): time(int(s) // 3600, int(s) % 3600 // 60, int(s) % 60)
+        for s in seconds.dropna().unique()
+    }
+    return [None if pd.isna(s) else lookup[int(s)] for s in seconds]
+
+
+def _to_float(values: pd.Series) -> np.ndarray:
+    """Int32（NA含む）を検知エンジン用の float 配列に変換"""
+    return values.to_numpy(dtype=np.float64, na_value=np.nan)
+
+
+async def import_attendance(
+    db: AsyncSession,
+    df: pd.DataFrame,
+    organization_id: str,
+    store_id: str | None,
+    csv_format: str = "generic",
+    first_line: int = 2,
+) -> ImportResult:
+    """正規化済みDataFrameを一括取り込みし、異常検知まで行う
+
+    既存データ（同一従業員+同一日付）はスキップする。ファイル内で同じ組が
+    重複している場合は先頭行のみ取り込み、以降はスキップとして数える。
+    日付・時刻・休憩時間を読み取れない行は取り込まず、行エラーとして返す。
+    """
+    frame, errors, error_count = coerce_attendance_frame(df, csv_format, first_line)
+    result = ImportResult(error_count=error_count, errors=errors)
+    if frame.empty:
+        return result
+
+    first_names = frame.drop_duplicates("employee_code")
+    names = dict(zip(first_names["employee_code"], first_names["name"]))
+    employee_ids, employee_stores, created_ids = await _resolve_employees(db, organization_id, store_id, names)
+
+    frame["employee_id"] = frame["employee_code"].map(employee_ids)
+    frame["date"] = frame["date"].dt.date
+
+    # 新規作成した従業員には既存レコードがないため検索対象から除外
+    lookup_ids = [emp_id for emp_id in set(employee_ids.values()) if emp_id not in created_ids]
+    existing = await _existing_record_keys(db, lookup_ids, frame["date"].min(), frame["date"].max())
+
+    keys = pd.MultiIndex.from_arrays([frame["employee_id"], frame["date"]])
+    skipped = keys.isin(list(existing)) if existing else np.zeros(len(frame), dtype=bool)
+    skipped |= keys.duplicated()
+    result.skip_count = int(skipped.sum())
+    frame = frame[~skipped].reset_index(drop=True)
+    if frame.empty:
+        return result
+
+    rules = await get_detection_rules(db, organization_id)
+    rule_table = await get_rule_table(db, organization_id, rules)
+
+    record_ids = np.array([str(uuid.uuid4()) for _ in range(len(frame))], dtype=object)
+    records = pd.DataFrame({
+        "id": record_ids,
+        "employee_id": frame["employee_id"],
+        "date": frame["date"],
+        "clock_in": _to_times(frame["clock_in"]),
+        "clock_out": _to_times(frame["clock_out"]),
+        "break_minutes": frame["break_minutes"].astype(object).where(frame["break_minutes"].notna(), None),
+        "work_type": frame["work_type"].astype(object).where(frame["work_type"].notna(), None),
+    }).to_dict(orient="records")
+
+    clock_in = _to_float(frame["clock_in"])
+    clock_out = _to_float(frame["clock_out"])
+    break_minutes = _to_float(frame["break_minutes"])
+
+    # 異常検知（全レコードをまとめて判定、店舗別・勤務区分別の閾値は行ごとに適用）
+    employee_id_values = frame["employee_id"].to_numpy(dtype=object)
+    row_params = rule_table.gather(
+        [employee_stores[employee_id] for employee_id in employee_id_values],
+        frame["work_type"].to_numpy(dtype=object),
+    )
+    found = detect_issues_bulk(clock_in, clock_out, break_minutes, rules, row_params)
+    rows = found["row"].to_numpy(dtype=np.int64)
+    issue_employee_ids = employee_id_values[rows]
+    issues = [
+        {
+            "attendance_record_id": record_id,
+            "organization_id": organization_id,
+            "store_id": employee_stores[employee_id],
+            "employee_id": employee_id,
+            "date": record_date,
+            "type": issue_type,
+            "severity": severity,
+            "rule_description": description,
+        }
+        for record_id, employee_id, record_date, issue_type, severity, description in zip(
+            record_ids[rows],
+            issue_employee_ids,
+            frame["date"].to_numpy(dtype=object)[rows],
+            found["type"],
+            found["severity"],
+            found["rule_description"],
+        )
+    ]
+
+    # 日次集計
+    metrics = build_metric_rows(
+        record_ids,
+        organization_id,
+        frame["employee_id"].map(employee_stores),
+        employee_id_values,
+        frame["date"],
+        compute_daily_metrics(
+            clock_in, clock_out, break_minutes, rules["night_start_hour"], rules["night_end_hour"],
+        ),
+    )
+
+    await db.execute(insert(AttendanceRecord), records)
+    await db.execute(insert(AttendanceDailyMetrics), metrics)
+    if issues:
+        await db.execute(insert(Issue), issues)
+
+    result.record_count = len(records)
+    result.issue_count = len(issues)
+    result.affected_employee_ids = set(employee_id_values)
+    result.affected_from = frame["date"].min()
+    result.affected_to = frame["date"].max()
+    return result
+
+
+async def import_csv_stream(
+    db: AsyncSession,
+    stream: CsvStream,
+    organization_id: str,
+    store_id: str | None,
+    user_id: str,
+    on_batch: Callable[[int, ImportResult], Awaitable[None]] | None = None,
+) -> ImportResult:
+    """退避済みCSVをチャンク単位で読み込みながら取り込む
+
+    チャンクのパースはスレッドで行い、イベントループを塞がない。全チャンクは
+    呼び出し側の同一トランザクションで登録されるため、チャンクをまたぐ重複も
+    既存データとしてスキップされる。on_batch には (処理済み行数, 累計結果) を渡す。
+    全チャンクの登録後、登録した従業員・期間について複数日ルールを判定する
+    （user_id は取り込みを行ったユーザーで、複数日ルールの異常の自動完了ログに記録する）。
+    """
+    total = ImportResult()
+    rows_processed = 0
+    batches = stream.batches()
+    try:
+        while (df := await asyncio.to_thread(next, batches, None)) is not None:
+            result = await import_attendance(
+                db, df, organization_id, store_id,
+                csv_format=stream.csv_format,
+                first_line=rows_processed + 2,  # ヘッダーが1行目
+            )
+            rows_processed += len(df)
+            total.add(result)
+            if on_batch is not None:
+                await on_batch(rows_processed, total)
+    finally:
+        batches.close()
+
+    if total.affected_employee_ids:
+        total.issue_count += await detect_window_issues(
+            db, organization_id, sorted(total.affected_employee_ids), total.affected_from, total.affected_to,
+            user_id,
+        )
+        if on_batch is not None:
+            await on_batch(rows_processed, total)
+    return total
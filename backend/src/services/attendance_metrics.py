@@ -0,0 +1,156 @@
+"""日次勤怠集計（attendance_daily_metrics）の計算・更新
+
+勤怠レコードごとの実労働・休憩・深夜・時間外の分数を配列演算でまとめて計算する。
+取り込み時は新規レコード分だけ登録し、深夜時間帯の設定が変わったときは
+再検知ワーカーが従業員のまとまりごとに作り直す（深夜以外の値は設定に依存しない）。
+"""
+
+from datetime import datetime, timezone
+from typing import TYPE_CHECKING
+
+from sqlalchemy import select, insert, delete
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.models.attendance import AttendanceRecord, AttendanceDailyMetrics
+from src.models.employee import Employee
+
+if TYPE_CHECKING:
+    import numpy as np
+
+# 法定労働時間（1日）。これを超えた実労働を時間外として数える
+LEGAL_DAILY_MINUTES = 8 * 60
+
+# 再計算時に一度に読み込む従業員数
+REBUILD_EMPLOYEE_CHUNK = 200
+
+METRIC_COLUMNS = ("worked_minutes", "break_minutes", "night_minutes", "overtime_minutes")
+
+
+def compute_daily_metrics(
+    clock_in: "np.ndarray",
+    clock_out: "np.ndarray",
+    break_minutes: "np.ndarray",
+    night_start_hour: int,
+    night_end_hour: int,
+) -> dict[str, "np.ndarray"]:
+    """日次の分数を計算（入力は detect_issues_bulk と同じ表現）
+
+    clock_in / clock_out は深夜0時起点の秒数、break_minutes は分数（いずれも欠損は NaN）。
+    退勤が出勤より前なら翌日退勤とみなす。深夜時間は intervals.night_minutes による
+    勤務区間と深夜帯の重なりで、休憩の時間帯は打刻にないため差し引かない。
+    値は float 配列で、計算できない要素は NaN。
+    """
+    import numpy as np
+    from src.services.intervals import shift_intervals, night_minutes
+
+    start, end = shift_intervals(clock_in, clock_out)
+    brk = np.asarray(break_minutes, dtype=np.float64)
+
+    span_minutes = np.floor((end - start) / 60)
+    worked = np.maximum(span_minutes - np.nan_to_num(brk, nan=0.0), 0)
+    overtime = np.maximum(worked - LEGAL_DAILY_MINUTES, 0)
+    night = night_minutes(clock_in, clock_out, night_start_hour, night_end_hour)
+
+    return {
+        "worked_minutes": worked,
+        "break_minutes": brk,
+        "night_minutes": night,
+        "overtime_minutes": overtime,
+    }
+
+
+def build_metric_rows(
+    record_ids,
+    organization_id: str,
+    store_ids,
+    employee_ids,
+    dates,
+    metrics: dict[str, "np.ndarray"],
+) -> list[dict]:
+    """compute_daily_metrics の結果を登録用の行に変換（NaN は NULL）"""
+    computed_at = datetime.now(timezone.utc)
+    columns = [
+        [None if v != v else int(v) for v in metrics[name].tolist()]
+        for name in METRIC_COLUMNS
+    ]
+    return [
+        {
+            "attendance_record_id": record_id,
+            "organization_id": organization_id,
+            "store_id": store_id,
+            "employee_id": employee_id,
+            "date": record_date,
+            **dict(zip(METRIC_COLUMNS, values)),
+            "computed_at": computed_at,
+        }
+        for record_id, store_id, employee_id, record_date, *values in zip(
+            record_ids, store_ids, employee_ids, dates, *columns
+        )
+    ]
+
+
+async def rebuild_employee_metrics(
+    db: AsyncSession,
+    organization_id: str,
+    employee_ids: list[str],
+    night_start_hour: int,
+    night_end_hour: int,
+) -> int:
+    """従業員のまとまり1つ分の日次集計を作り直し、作成した行数を返す（コミットは呼び出し側）"""
+    from src.services.detection import time_to_seconds
+
+    await db.execute(
+        delete(AttendanceDailyMetrics).where(AttendanceDailyMetrics.employee_id.in_(employee_ids))
+    )
+    rows = (await db.execute(
+        select(
+            AttendanceRecord.id,
+            AttendanceRecord.employee_id,
+            Employee.store_id,
+            AttendanceRecord.date,
+            AttendanceRecord.clock_in,
+            AttendanceRecord.clock_out,
+            AttendanceRecord.break_minutes,
+        )
+        .join(Employee, Employee.id == AttendanceRecord.employee_id)
+        .where(AttendanceRecord.employee_id.in_(employee_ids))
+    )).all()
+    if not rows:
+        return 0
+
+    record_ids, record_employees, store_ids, dates, clock_in, clock_out, breaks = zip(*rows)
+    metrics = compute_daily_metrics(
+        time_to_seconds(clock_in),
+        time_to_seconds(clock_out),
+        [float("nan") if b is None else b for b in breaks],
+        night_start_hour,
+        night_end_hour,
+    )
+    await db.execute(
+        insert(AttendanceDailyMetrics),
+        build_metric_rows(record_ids, organization_id, store_ids, record_employees, dates, metrics),
+    )
+    return len(rows)
+
+
+async def rebuild_daily_metrics(
+    db: AsyncSession,
+    organization_id: str,
+    night_start_hour: int,
+    night_end_hour: int,
+) -> int:
+    """組織の日次集計を作り直す（既存データの初期作成用スクリプトから呼ぶ）
+
+    従業員 REBUILD_EMPLOYEE_CHUNK 人ずつ勤怠を読み込んで計算する。コミットは呼び出し側。
+    作成した行数を返す。
+    """
+    employees = (await db.execute(
+        select(Employee.id).where(Employee.organization_id == organization_id).order_by(Employee.id)
+    )).scalars().all()
+
+    total = 0
+    for i in range(0, len(employees), REBUILD_EMPLOYEE_CHUNK):
+        total += await rebuild_employee_metrics(
+            db, organization_id, employees[i:i + REBUILD_EMPLOYEE_CHUNK], night_start_hour, night_end_hour,
+        )
+    return total
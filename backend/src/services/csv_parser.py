@@ -0,0 +1,457 @@
+"""CSV解析サービス（エンコーディング判定・フォーマット判定・カラム正規化）"""
+
+import codecs
+import hashlib
+import io
+import mmap
+import os
+import re
+import tempfile
+from collections import OrderedDict
+from collections.abc import Iterator
+from dataclasses import dataclass, field
+from pathlib import Path
+from threading import Lock
+from typing import TYPE_CHECKING
+
+from fastapi import UploadFile
+
+from src.config import settings
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+# pandas / chardet は読み込みに時間がかかるため、起動時ではなく初回利用時に import する
+
+
+# 取り込みはディスクに退避してチャンク単位で読むため、メモリ使用量はファイルサイズに依存しない
+MAX_FILE_SIZE = 50 * 1024 * 1024  # 50MB
+MAX_ROW_COUNT = 100000
+PREVIEW_ROWS = 10
+
+SPOOL_CHUNK_SIZE = 1024 * 1024
+CSV_BATCH_ROWS = 5000
+ENCODING_SAMPLE_SIZE = 64 * 1024
+CHARDET_SAMPLE_SIZE = 16 * 1024
+HEADER_SIGNATURE_SIZE = 4096
+FORMAT_CACHE_MAX_ENTRIES = 1024
+
+# 文字列として読むカラム（チャンクごとの型推論で従業員コードが "1001" / "1001.0" にぶれないように）
+TEXT_COLUMNS = ("employee_code", "name", "work_type")
+
+# 正規化後に必須のカラム
+REQUIRED_COLUMNS = ["employee_code", "date"]
+
+
+class CsvFileError(Exception):
+    """CSVファイル起因のエラー（メッセージをそのまま利用者に返す）"""
+
+
+# ========================================
+# エンコーディング判定（先頭サンプルのみ）
+# ========================================
+
+_NON_ASCII = re.compile(rb"[\x80-\xff]")
+
+
+def _decodes(sample: bytes, encoding: str) -> bool:
+    """sample が encoding で厳密にデコードできるか（末尾の途切れた文字は許容）"""
+    decoder = codecs.getincrementaldecoder(encoding)(errors="strict")
+    try:
+        decoder.decode(sample, final=False)
+    except UnicodeDecodeError:
+        return False
+    return True
+
+
+def _detect_sample_encoding(sample: bytes) -> str:
+    """非ASCII文字から始まるサンプルのエンコーディングを判定
+
+    UTF-8 → cp932 の順に厳密デコードを試し、どちらでもなければ
+    chardet を上限付きのサンプルにだけ適用する。
+    """
+    if _decodes(sample, "utf-8"):
+        return "utf-8"
+    if _decodes(sample, "cp932"):
+        return "cp932"
+    import chardet
+
+    result = chardet.detect(sample[:CHARDET_SAMPLE_SIZE])
+    return result["encoding"] or "utf-8"
+
+
+def _bom_encoding(prefix: bytes) -> str | None:
+    """BOMからエンコーディングを判定"""
+    if prefix.startswith(codecs.BOM_UTF8):
+        return "utf-8-sig"
+    if prefix.startswith((codecs.BOM_UTF16_LE, codecs.BOM_UTF16_BE)):
+        return "utf-16"
+    return None
+
+
+def detect_encoding(content: bytes) -> str:
+    """ファイルのエンコーディングを検出"""
+    bom = _bom_encoding(content[:4])
+    if bom:
+        return bom
+
+    # ASCIIのみの区間は判定材料にならないため、最初の非ASCIIバイトから判定する
+    match = _NON_ASCII.search(content)
+    if match is None:
+        return "utf-8"
+    return _detect_sample_encoding(content[match.start():match.start() + ENCODING_SAMPLE_SIZE])
+
+
+def detect_file_encoding(path: Path) -> str:
+    """ファイル全体を読み込まずにエンコーディングを検出"""
+    with open(path, "rb") as f:
+        prefix = f.read(ENCODING_SAMPLE_SIZE)
+        bom = _bom_encoding(prefix)
+        if bom:
+            return bom
+
+        offset = 0
+        block = prefix
+        while block:
+            match = _NON_ASCII.search(block)
+            if match is not None:
+                f.seek(offset + match.start())
+                return _detect_sample_encoding(f.read(ENCODING_SAMPLE_SIZE))
+            offset += len(block)
+            block = f.read(SPOOL_CHUNK_SIZE)
+    return "utf-8"
+
+
+def parse_csv(content: bytes) -> "pd.DataFrame":
+    """CSVをパース"""
+    import pandas as pd
+
+    encoding = detect_encoding(content)
+    try:
+        df = pd.read_csv(io.BytesIO(content), encoding=encoding)
+    except UnicodeDecodeError:
+        if encoding == "cp932":
+            raise
+        # Shift-JIS（cp932）でリトライ
+        df = pd.read_csv(io.BytesIO(content), encoding="cp932")
+    return df
+
+
+# ========================================
+# 判定結果キャッシュ（組織 × ヘッダー署名）
+# ========================================
+
+@dataclass(frozen=True)
+class DetectedFormat:
+    """エンコーディング・フォーマットの判定結果
+
+    ヘッダーがASCIIのみの場合、ヘッダーからは本文の文字コードが決まらないため
+    encoding は None とし、エンコーディング判定は毎回行う。
+    """
+    encoding: str | None
+    csv_format: str
+
+
+_format_cache: "OrderedDict[tuple[str, str], DetectedFormat]" = OrderedDict()
+_format_cache_lock = Lock()
+
+
+def _header_line(prefix: bytes) -> bytes:
+    """先頭の生バイト列からヘッダー行を切り出す"""
+    end = prefix.find(b"\n", 0, HEADER_SIGNATURE_SIZE)
+    return prefix[:end if end >= 0 else HEADER_SIGNATURE_SIZE].rstrip(b"\r")
+
+
+def header_signature(prefix: bytes) -> str:
+    """ヘッダー行（生バイト列）のハッシュ"""
+    return hashlib.sha1(_header_line(prefix)).hexdigest()
+
+
+def _get_cached_format(key: tuple[str, str]) -> DetectedFormat | None:
+    with _format_cache_lock:
+        detected = _format_cache.get(key)
+        if detected is not None:
+            _format_cache.move_to_end(key)
+        return detected
+
+
+def _put_cached_format(key: tuple[str, str], detected: DetectedFormat) -> None:
+    with _format_cache_lock:
+        _format_cache[key] = detected
+        _format_cache.move_to_end(key)
+        while len(_format_cache) > FORMAT_CACHE_MAX_ENTRIES:
+            _format_cache.popitem(last=False)
+
+
+def _drop_cached_format(key: tuple[str, str]) -> None:
+    with _format_cache_lock:
+        _format_cache.pop(key, None)
+
+
+def detect_csv_format(columns: list[str]) -> str:
+    """CSVフォーマットを自動判定"""
+    col_set = set(columns)
+    # ジョブカン: 「スタッフコード」「スタッフ名」が特徴
+    if "スタッフコード" in col_set or "スタッフ名" in col_set:
+        return "jobcan"
+    # KING OF TIME: 「従業員コード」+「勤務日」が特徴
+    if "従業員コード" in col_set and "勤務日" in col_set:
+        return "king_of_time"
+    # KING OF TIME 別パターン: 「社員コード」+「勤務日」
+    if "社員コード" in col_set and "勤務日" in col_set:
+        return "king_of_time"
+    # Airシフト: 「従業員番号」「従業員名」が特徴
+    if "従業員番号" in col_set or "従業員名" in col_set:
+        return "airshift"
+    # SmartHR: 「社員ID」「社員名」が特徴
+    if "社員ID" in col_set or "社員名" in col_set:
+        return "smarthr"
+    return "generic"
+
+
+def build_column_mapping(columns: list[str], detected: str | None = None) -> dict[str, str]:
+    """元カラム名 → 正規化カラム名 の対応を作成（ジョブカン/KING OF TIME/Airシフト/SmartHR対応）
+
+    ヘッダーだけから決まるため、チャンク読み込みでも1回だけ計算すればよい。
+    detected（判定済みフォーマット）を渡すとフォーマット判定を省略する。
+    """
+    if detected is None:
+        detected = detect_csv_format(list(columns))
+
+    column_mapping_jobcan = {
+        "スタッフコード": "employee_code",
+        "スタッフ名": "name",
+        "日付": "date",
+        "出勤時刻": "clock_in",
+        "退勤時刻": "clock_out",
+        "休憩時間": "break_minutes",
+        "勤務区分": "work_type",
+    }
+
+    column_mapping_king_of_time = {
+        "従業員コード": "employee_code",
+        "社員コード": "employee_code",
+        "従業員名": "name",
+        "社員名": "name",
+        "氏名": "name",
+        "勤務日": "date",
+        "出勤時刻": "clock_in",
+        "退勤時刻": "clock_out",
+        "休憩分": "break_minutes",
+        "休憩時間": "break_minutes",
+        "勤務形態": "work_type",
+        "勤務区分": "work_type",
+    }
+
+    column_mapping_airshift = {
+        "従業員番号": "employee_code",
+        "従業員名": "name",
+        "日付": "date",
+        "出勤": "clock_in",
+        "退勤": "clock_out",
+        "休憩": "break_minutes",
+    }
+
+    column_mapping_smarthr = {
+        "社員ID": "employee_code",
+        "社員名": "name",
+        "勤務日": "date",
+        "出勤": "clock_in",
+        "退勤": "clock_out",
+        "休憩": "break_minutes",
+    }
+
+    column_mapping_generic = {
+        "employee_id": "employee_code",
+        "employee_name": "name",
+    }
+
+    mapping = {
+        "jobcan": column_mapping_jobcan,
+        "king_of_time": column_mapping_king_of_time,
+        "airshift": column_mapping_airshift,
+        "smarthr": column_mapping_smarthr,
+        "generic": column_mapping_generic,
+    }
+
+    primary = mapping.get(detected, column_mapping_generic)
+    renamed = {col: primary.get(col, col) for col in columns}
+
+    # フォールバック: まだマッピングされていないカラムを汎用マッピングで再試行
+    if "employee_code" not in renamed.values() or "date" not in renamed.values():
+        all_mappings = {}
+        for m in mapping.values():
+            all_mappings.update(m)
+        renamed = {col: all_mappings.get(name, name) for col, name in renamed.items()}
+
+    return {col: name for col, name in renamed.items() if col != name}
+
+
+def normalize_columns(df: "pd.DataFrame") -> "pd.DataFrame":
+    """カラム名を正規化"""
+    return df.rename(columns=build_column_mapping(list(df.columns)))
+
+
+def missing_required_columns(columns) -> list[str]:
+    """正規化後のカラムに不足している必須カラム"""
+    return [c for c in REQUIRED_COLUMNS if c not in columns]
+
+
+# ========================================
+# ストリーミング読み込み
+# ========================================
+
+def spool_dir() -> Path:
+    """アップロードファイルの退避先"""
+    path = Path(settings.import_spool_dir or os.path.join(tempfile.gettempdir(), "kintai-imports"))
+    path.mkdir(parents=True, exist_ok=True)
+    return path
+
+
+async def spool_upload(file: UploadFile, max_size: int = MAX_FILE_SIZE) -> Path:
+    """UploadFile を固定サイズのチャンクでディスクに書き出す（上限超過時は CsvFileError）"""
+    fd, name = tempfile.mkstemp(suffix=".csv", dir=spool_dir())
+    path = Path(name)
+    size = 0
+    try:
+        with os.fdopen(fd, "wb") as out:
+            while chunk := await file.read(SPOOL_CHUNK_SIZE):
+                size += len(chunk)
+                if size > max_size:
+                    raise CsvFileError(f"ファイルサイズが上限（{max_size // 1024 // 1024}MB）を超えています")
+                out.write(chunk)
+    except BaseException:
+        path.unlink(missing_ok=True)
+        raise
+    return path
+
+
+@dataclass
+class CsvStream:
+    """退避済みCSVのチャンク読み込み（ヘッダー解析・カラム正規化は1回のみ）"""
+    path: Path
+    encoding: str
+    csv_format: str
+    raw_columns: list[str]
+    rename: dict[str, str] = field(default_factory=dict)
+
+    @property
+    def columns(self) -> list[str]:
+        """正規化後のカラム名"""
+        return [self.rename.get(c, c) for c in self.raw_columns]
+
+    @property
+    def _dtype(self) -> dict[str, type]:
+        """文字列として読む元カラム"""
+        return {raw: str for raw, name in zip(self.raw_columns, self.columns) if name in TEXT_COLUMNS}
+
+    def head(self, rows: int = PREVIEW_ROWS) -> "pd.DataFrame":
+        """先頭 rows 行のみ読み込んだ正規化済みDataFrame（プレビュー用）"""
+        import pandas as pd
+
+        try:
+            df = pd.read_csv(self.path, encoding=self.encoding, dtype=self._dtype, nrows=rows)
+        except Exception as e:
+            raise CsvFileError(f"CSVの解析に失敗しました: {str(e)}")
+        return df.rename(columns=self.rename)
+
+    def batches(self, batch_rows: int = CSV_BATCH_ROWS, max_rows: int = MAX_ROW_COUNT) -> Iterator["pd.DataFrame"]:
+        """正規化済みのDataFrameを batch_rows 行ずつ返す"""
+        import pandas as pd
+
+        row_count = 0
+        try:
+            with pd.read_csv(self.path, encoding=self.encoding, dtype=self._dtype, chunksize=batch_rows) as reader:
+                for chunk in reader:
+                    row_count += len(chunk)
+                    if row_count > max_rows:
+                        raise CsvFileError(f"行数が上限（{max_rows}行）を超えています")
+                    yield chunk.rename(columns=self.rename)
+        except (CsvFileError, GeneratorExit):
+            raise
+        except Exception as e:
+            raise CsvFileError(f"CSVの解析に失敗しました: {str(e)}")
+
+
+def count_data_rows(path: Path) -> int:
+    """改行数からデータ行数（ヘッダーを除く）を数える
+
+    パースせずにメモリマップ上の改行だけを数えるため、ファイルサイズに対して
+    十分高速。クォート内の改行や空行も1行と数えるため概算値として扱う。
+    """
+    with open(path, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return 0
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            lines = 0
+            for start in range(0, len(mm), SPOOL_CHUNK_SIZE):
+                lines += mm[start:start + SPOOL_CHUNK_SIZE].count(b"\n")
+            if mm[-1:] != b"\n":
+                lines += 1  # 末尾に改行がない最終行
+    return max(lines - 1, 0)
+
+
+def _read_header(path: Path, encoding: str) -> list[str] | None:
+    """ヘッダー行のみ読み込む（デコードできなければ None）"""
+    import pandas as pd
+
+    try:
+        header = pd.read_csv(path, encoding=encoding, nrows=0)
+    except (UnicodeDecodeError, LookupError):
+        return None
+    except Exception as e:
+        raise CsvFileError(f"CSVの解析に失敗しました: {str(e)}")
+    return [str(c) for c in header.columns]
+
+
+def open_csv_stream(path: Path, organization_id: str | None = None) -> CsvStream:
+    """エンコーディング・フォーマット・カラム対応をヘッダーから決める
+
+    organization_id を渡すと (組織, ヘッダー署名) 単位で判定結果を再利用し、
+    同じベンダーの定期アップロードでは判定処理を丸ごと省略する。
+    """
+    cache_key = None
+    header_is_ascii = True
+    if organization_id is not None:
+        with open(path, "rb") as f:
+            prefix = f.read(HEADER_SIGNATURE_SIZE)
+        cache_key = (str(organization_id), header_signature(prefix))
+        header_is_ascii = _NON_ASCII.search(_header_line(prefix)) is None
+
+        cached = _get_cached_format(cache_key)
+        if cached is not None:
+            encoding = cached.encoding or detect_file_encoding(path)
+            raw_columns = _read_header(path, encoding)
+            if raw_columns is not None:
+                return CsvStream(
+                    path=path,
+                    encoding=encoding,
+                    csv_format=cached.csv_format,
+                    raw_columns=raw_columns,
+                    rename=build_column_mapping(raw_columns, cached.csv_format),
+                )
+            _drop_cached_format(cache_key)
+
+    encoding = detect_file_encoding(path)
+    raw_columns = _read_header(path, encoding)
+    if raw_columns is None and encoding != "cp932":
+        # Shift-JIS（cp932）でリトライ
+        encoding = "cp932"
+        raw_columns = _read_header(path, encoding)
+    if raw_columns is None:
+        raise CsvFileError("CSVの解析に失敗しました: 文字コードを判定できません")
+
+    csv_format = detect_csv_format(raw_columns)
+    if cache_key is not None:
+        _put_cached_format(cache_key, DetectedFormat(
+            encoding=None if header_is_ascii else encoding,
+            csv_format=csv_format,
+        ))
+
+    return CsvStream(
+        path=path,
+        encoding=encoding,
+        csv_format=csv_format,
+        raw_columns=raw_columns,
+        rename=build_column_mapping(raw_columns, csv_format),
+    )
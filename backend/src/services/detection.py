@@ -3,22 +3,21 @@
 from datetime import date, datetime, time, timedelta
 from uuid import UUID
 
+import numpy as np
+import pandas as pd
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from src.models.attendance import AttendanceRecord
-from src.models.issue import Issue, IssueType, IssueSeverity
+from src.models.issue import IssueType, IssueSeverity
 from src.models.settings import DetectionRule
+from src.services import rule_cache
+from src.services.intervals import night_minutes
+from src.services.rule_registry import compile_rules
 from src.config import settings as app_settings
 
 
-async def get_detection_rules(db: AsyncSession, organization_id: UUID) -> dict:
-    """検知ルールを取得"""
-    result = await db.execute(
-        select(DetectionRule).where(DetectionRule.organization_id == organization_id)
-    )
-    rule = result.scalar_one_or_none()
-
+def _rules_from_row(rule: DetectionRule | None) -> dict:
+    """DetectionRule（未設定時は None）→ ルール辞書"""
     if rule:
         return {
             "break_minutes_6h": rule.break_minutes_6h,
@@ -37,6 +36,31 @@ async def get_detection_rules(db: AsyncSession, organization_id: UUID) -> dict:
         }
 
 
+async def get_detection_rules(db: AsyncSession, organization_id: UUID) -> dict:
+    """検知ルールを取得（組織単位でキャッシュ）"""
+    entry = rule_cache.get_entry(organization_id)
+    if entry is not None:
+        if rule_cache.is_fresh(entry):
+            return dict(entry.rules)
+
+        # TTL切れ: バージョンのみ照会し、他ワーカーで更新されていなければ再利用
+        version = await db.scalar(
+            select(DetectionRule.updated_at).where(DetectionRule.organization_id == organization_id)
+        )
+        if version == entry.version:
+            rule_cache.touch(organization_id)
+            return dict(entry.rules)
+
+    result = await db.execute(
+        select(DetectionRule).where(DetectionRule.organization_id == organization_id)
+    )
+    rule = result.scalar_one_or_none()
+
+    rules = _rules_from_row(rule)
+    rule_cache.put(organization_id, rules, rule.updated_at if rule else None)
+    return dict(rules)
+
+
 _REF_DATE = date(2000, 1, 1)
 
 
@@ -56,142 +80,68 @@ def calc_work_hours(clock_in: time | None, clock_out: time | None) -> float | No
     return diff.total_seconds() / 3600
 
 
-def _time_to_minutes(t: time) -> int:
-    """time → 深夜0時起点の分数"""
-    return t.hour * 60 + t.minute
+def calc_night_minutes(clock_in: time | None, clock_out: time | None, night_start: int, night_end: int) -> int | None:
+    """深夜帯の勤務分数（日跨ぎ対応、打刻欠損は None）"""
+    if clock_in is None or clock_out is None:
+        return None
+    return int(night_minutes(*time_to_seconds([clock_in, clock_out]), night_start, night_end))
 
 
 def is_night_work(clock_in: time | None, clock_out: time | None, night_start: int, night_end: int) -> bool:
     """深夜勤務を含むか判定（深夜帯をまたぐシフトにも対応）"""
-    if clock_in is None or clock_out is None:
-        return False
-
-    in_m = _time_to_minutes(clock_in)
-    out_m = _time_to_minutes(clock_out)
-    ns = night_start * 60   # 例: 22*60=1320
-    ne = night_end * 60     # 例: 5*60=300
-
-    # 日跨ぎシフトの場合、退勤を +24h で表現
-    if out_m <= in_m:
-        out_m += 24 * 60
-
-    # 深夜帯も同様（22:00-5:00 → 1320-1740）
-    if ne <= ns:
-        ne += 24 * 60
-
-    # シフト [in_m, out_m] と 深夜帯 [ns, ne] の重なり判定
-    if in_m < ne and out_m > ns:
-        return True
-
-    # 深夜帯が翌日にもかかる場合: [ns-1440, ne-1440] もチェック
-    if ns >= 24 * 60:
-        if in_m < (ne - 24 * 60) and out_m > (ns - 24 * 60):
-            return True
-
-    return False
-
-
-async def detect_issues(
-    db: AsyncSession,
-    attendance: AttendanceRecord,
-    organization_id: UUID,
-) -> list[Issue]:
-    """異常を検知してIssueを作成"""
-    rules = await get_detection_rules(db, organization_id)
-    issues: list[Issue] = []
-
-    clock_in = attendance.clock_in
-    clock_out = attendance.clock_out
-    break_minutes = attendance.break_minutes or 0
-    work_hours = calc_work_hours(clock_in, clock_out)
-
-    # R001: 出勤打刻漏れ
-    if clock_in is None and clock_out is not None:
-        issue = Issue(
-            attendance_record_id=attendance.id,
-            type=IssueType.MISSING_CLOCK_IN,
-            severity=IssueSeverity.HIGH,
-            rule_description="出勤打刻がありません（退勤打刻のみ）",
-        )
-        db.add(issue)
-        issues.append(issue)
-
-    # R002: 退勤打刻漏れ
-    if clock_in is not None and clock_out is None:
-        issue = Issue(
-            attendance_record_id=attendance.id,
-            type=IssueType.MISSING_CLOCK_OUT,
-            severity=IssueSeverity.HIGH,
-            rule_description="退勤打刻がありません（出勤打刻のみ）",
-        )
-        db.add(issue)
-        issues.append(issue)
-
-    # R003, R004: 休憩不足
-    if work_hours is not None:
-        if work_hours > 8 and break_minutes < rules["break_minutes_8h"]:
-            issue = Issue(
-                attendance_record_id=attendance.id,
-                type=IssueType.INSUFFICIENT_BREAK,
-                severity=IssueSeverity.HIGH,
-                rule_description=f"8時間超勤務で休憩が{rules['break_minutes_8h']}分未満です（実績: {break_minutes}分）",
-            )
-            db.add(issue)
-            issues.append(issue)
-        elif work_hours > 6 and break_minutes < rules["break_minutes_6h"]:
-            issue = Issue(
-                attendance_record_id=attendance.id,
-                type=IssueType.INSUFFICIENT_BREAK,
-                severity=IssueSeverity.HIGH,
-                rule_description=f"6時間超勤務で休憩が{rules['break_minutes_6h']}分未満です（実績: {break_minutes}分）",
-            )
-            db.add(issue)
-            issues.append(issue)
-
-    # R005: 長時間労働
-    if work_hours is not None and work_hours > rules["daily_work_hours_alert"]:
-        issue = Issue(
-            attendance_record_id=attendance.id,
-            type=IssueType.OVERTIME,
-            severity=IssueSeverity.MEDIUM,
-            rule_description=f"日次勤務時間が{rules['daily_work_hours_alert']}時間を超えています（実績: {work_hours:.1f}時間）",
-        )
-        db.add(issue)
-        issues.append(issue)
-
-    # R006: 深夜勤務
-    if is_night_work(clock_in, clock_out, rules["night_start_hour"], rules["night_end_hour"]):
-        issue = Issue(
-            attendance_record_id=attendance.id,
-            type=IssueType.NIGHT_WORK,
-            severity=IssueSeverity.LOW,
-            rule_description=f"深夜帯（{rules['night_start_hour']}時〜{rules['night_end_hour']}時）の勤務があります",
-        )
-        db.add(issue)
-        issues.append(issue)
-
-    # R007, R008: 不整合
-    if clock_in is not None and clock_out is not None:
-        dt_in = datetime.combine(_REF_DATE, clock_in)
-        dt_out = datetime.combine(_REF_DATE, clock_out)
-        if dt_out < dt_in and (dt_out.hour > 6):  # 日跨ぎでない場合
-            issue = Issue(
-                attendance_record_id=attendance.id,
-                type=IssueType.INCONSISTENCY,
-                severity=IssueSeverity.HIGH,
-                rule_description="退勤時刻が出勤時刻より前です",
-            )
-            db.add(issue)
-            issues.append(issue)
-
-    if work_hours is not None and break_minutes > work_hours * 60:
-        issue = Issue(
-            attendance_record_id=attendance.id,
-            type=IssueType.INCONSISTENCY,
-            severity=IssueSeverity.HIGH,
-            rule_description="休憩時間が勤務時間を超えています",
-        )
-        db.add(issue)
-        issues.append(issue)
+    return bool(calc_night_minutes(clock_in, clock_out, night_start, night_end))
+
+
+def evaluate_record(
+    clock_in: time | None,
+    clock_out: time | None,
+    break_minutes: int | None,
+    rules: dict,
+) -> list[tuple[IssueType, IssueSeverity, str]]:
+    """1レコード分のルール判定（DBアクセスなし）
+
+    (異常種別, 重要度, ルール説明) のリストを R001〜R008 の順で返す。
+    判定内容は rule_registry.RULES の定義による。
+    """
+    return compile_rules(rules).evaluate_record(clock_in, clock_out, break_minutes)
+
+
+# ========================================
+# 一括判定（列指向・ベクトル化）
+# ========================================
+
+ISSUE_FRAME_COLUMNS = ["row", "type", "severity", "rule_description"]
+
+
+def time_to_seconds(values) -> np.ndarray:
+    """time | None の並び → 深夜0時起点の秒数配列（欠損は NaN）"""
+    return np.array(
+        [np.nan if t is None else t.hour * 3600 + t.minute * 60 + t.second for t in values],
+        dtype=np.float64,
+    )
+
 
-    return issues
+def detect_issues_bulk(
+    clock_in: np.ndarray,
+    clock_out: np.ndarray,
+    break_minutes: np.ndarray,
+    rules: dict,
+    row_params: dict[str, np.ndarray] | None = None,
+) -> pd.DataFrame:
+    """複数レコードのルール判定を配列演算でまとめて行う
+
+    clock_in / clock_out は深夜0時起点の秒数（欠損は NaN）、break_minutes は
+    分数（欠損は NaN）。evaluate_record と同じ判定・同じ文言で、
+    row（入力の位置）, type, severity, rule_description の DataFrame を
+    行順→ルール順（R001〜R008）に並べて返す。
+    row_params は店舗別・勤務区分別の行ごとの閾値（RuleTable.gather の結果）。
+    """
+    matches = compile_rules(rules).evaluate(clock_in, clock_out, break_minutes, row_params)
+    if len(matches.rows) == 0:
+        return pd.DataFrame(columns=ISSUE_FRAME_COLUMNS)
+    return pd.DataFrame({
+        "row": matches.rows,
+        "type": matches.types,
+        "severity": matches.severities,
+        "rule_description": matches.descriptions,
+    })
@@ -0,0 +1,224 @@
+"""バックグラウンド取り込みジョブ（プロセス内 asyncio ワーカープール）
+
+大きなCSVはリクエスト内で処理せず、ファイルを一時保存してジョブを登録し、
+ワーカーが分割して取り込む。進捗はメモリ上に保持し、設定により
+import_jobs テーブルにも保存する（複数ワーカー構成でのポーリング用）。
+"""
+
+import asyncio
+import logging
+import time
+import uuid
+from dataclasses import dataclass, field, asdict
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+from src.config import settings
+from src.core.database import async_session_maker
+from src.models.import_job import ImportJob, ImportJobStatus
+from src.services.csv_parser import CsvFileError, open_csv_stream, missing_required_columns, count_data_rows
+
+if TYPE_CHECKING:
+    from src.services.attendance_import import ImportResult
+
+logger = logging.getLogger(__name__)
+
+JOB_RETENTION_SECONDS = 60 * 60  # 完了ジョブをメモリに残す時間
+
+
+@dataclass
+class ImportJobState:
+    """ジョブの進捗（メモリ上の表現）"""
+    organization_id: str
+    user_id: str
+    store_id: str | None
+    filename: str | None
+    id: str = field(default_factory=lambda: str(uuid.uuid4()))
+    status: str = ImportJobStatus.QUEUED.value
+    rows_total: int | None = None
+    rows_processed: int = 0
+    record_count: int = 0
+    skip_count: int = 0
+    issue_count: int = 0
+    error_count: int = 0
+    row_errors: list[dict] = field(default_factory=list)
+    error: str | None = None
+    created_at: datetime = field(default_factory=lambda: datetime.now(timezone.utc))
+    started_at: datetime | None = None
+    finished_at: datetime | None = None
+
+
+_jobs: dict[str, ImportJobState] = {}
+_paths: dict[str, Path] = {}  # job_id -> 退避済みファイル
+_finished_at: dict[str, float] = {}  # job_id -> 完了時刻（monotonic）
+_queue: asyncio.Queue | None = None
+_workers: list[asyncio.Task] = []
+
+
+def _cleanup() -> None:
+    """保持期間を過ぎた完了ジョブをメモリから削除"""
+    now = time.monotonic()
+    expired = [job_id for job_id, ts in _finished_at.items() if now - ts > JOB_RETENTION_SECONDS]
+    for job_id in expired:
+        _finished_at.pop(job_id, None)
+        _jobs.pop(job_id, None)
+
+
+async def _persist(job: ImportJobState) -> None:
+    """ジョブ進捗をDBに保存（import_jobs_persist 有効時のみ）
+
+    取り込み本体のトランザクションとは別のセッションで書き込むため、取り込み中も
+    書き込めるデータベース（PostgreSQL）が前提。SQLite では設定時に起動エラーにしている。
+    """
+    if not settings.import_jobs_persist:
+        return
+    try:
+        async with async_session_maker() as session:
+            await session.merge(ImportJob(**asdict(job)))
+            await session.commit()
+    except Exception:
+        logger.warning("Failed to persist import job %s", job.id, exc_info=True)
+
+
+def start_workers(count: int | None = None) -> None:
+    """ワーカーを起動（起動済みの場合は何もしない）"""
+    global _queue
+    if _workers:
+        return
+    _queue = asyncio.Queue()
+    for _ in range(count or settings.import_worker_count):
+        _workers.append(asyncio.create_task(_worker()))
+
+
+async def stop_workers() -> None:
+    """ワーカーを停止"""
+    global _queue
+    for task in _workers:
+        task.cancel()
+    await asyncio.gather(*_workers, return_exceptions=True)
+    _workers.clear()
+    _queue = None
+
+
+async def enqueue_import(
+    path: Path,
+    filename: str | None,
+    organization_id: str,
+    store_id: str | None,
+    user_id: str,
+) -> ImportJobState:
+    """退避済みファイルの取り込みジョブを登録（ファイルは完了後にワーカーが削除）"""
+    _cleanup()
+    job = ImportJobState(
+        organization_id=organization_id,
+        user_id=user_id,
+        store_id=store_id,
+        filename=filename,
+    )
+    _jobs[job.id] = job
+    _paths[job.id] = path
+    await _persist(job)
+
+    start_workers()
+    await _queue.put(job.id)
+    return job
+
+
+async def get_job(job_id: str, organization_id: str) -> ImportJobState | None:
+    """ジョブを取得（他組織のジョブは None）"""
+    job = _jobs.get(job_id)
+    if job is None and settings.import_jobs_persist:
+        async with async_session_maker() as session:
+            row = await session.get(ImportJob, job_id)
+        if row is not None:
+            job = ImportJobState(
+                **{name: getattr(row, name) for name in ImportJobState.__dataclass_fields__}
+            )
+    if job is None or str(job.organization_id) != str(organization_id):
+        return None
+    return job
+
+
+async def _worker() -> None:
+    """キューからジョブを取り出して順に実行"""
+    while True:
+        job_id = await _queue.get()
+        try:
+            job = _jobs.get(job_id)
+            if job is not None:
+                await _run_import(job)
+        finally:
+            _queue.task_done()
+
+
+def _mark_failed(job: ImportJobState, message: str) -> None:
+    """失敗として記録（ロールバック済みのため取り込み件数は0に戻す）"""
+    job.status = ImportJobStatus.FAILED.value
+    job.error = message
+    job.record_count = 0
+    job.skip_count = 0
+    job.issue_count = 0
+    job.error_count = 0
+    job.row_errors = []
+
+
+async def _run_import(job: ImportJobState) -> None:
+    """取り込みジョブ本体（全チャンクを1トランザクションで取り込む）"""
+    path = _paths.pop(job.id)
+    job.status = ImportJobStatus.RUNNING.value
+    job.started_at = datetime.now(timezone.utc)
+    await _persist(job)
+
+    # pandas を使う取り込み処理は初回のジョブ実行時に読み込む
+    from src.services.attendance_import import import_csv_stream
+
+    async def on_batch(rows_processed: int, total: "ImportResult") -> None:
+        job.rows_processed = rows_processed
+        job.record_count = total.record_count
+        job.skip_count = total.skip_count
+        job.issue_count = total.issue_count
+        job.error_count = total.error_count
+        job.row_errors = [asdict(e) for e in total.errors]
+        await _persist(job)
+
+    try:
+        stream = await asyncio.to_thread(open_csv_stream, path, job.organization_id)
+        missing = missing_required_columns(stream.columns)
+        if missing:
+            raise CsvFileError(f"必須カラムがありません: {', '.join(missing)}")
+
+        # 進捗表示用の概算行数（完了時に実際の処理行数で置き換える）
+        job.rows_total = await asyncio.to_thread(count_data_rows, path)
+        await _persist(job)
+
+        async with async_session_maker() as db:
+            try:
+                await import_csv_stream(
+                    db,
+                    stream,
+                    organization_id=job.organization_id,
+                    store_id=job.store_id,
+                    user_id=job.user_id,
+                    on_batch=on_batch,
+                )
+                await db.commit()
+            except Exception:
+                await db.rollback()
+                raise
+
+        job.rows_total = job.rows_processed
+        job.status = ImportJobStatus.COMPLETED.value
+    except CsvFileError as e:
+        _mark_failed(job, str(e))
+    except Exception:
+        logger.error("Import job %s failed", job.id, exc_info=True)
+        _mark_failed(job, "取り込み中にエラーが発生しました。ファイル内容をご確認のうえ再度お試しください。")
+    finally:
+        job.finished_at = datetime.now(timezone.utc)
+        _finished_at[job.id] = time.monotonic()
+        await _persist(job)
+        try:
+            path.unlink(missing_ok=True)
+        except OSError:
+            logger.warning("Failed to remove spooled file %s", path)
@@ -0,0 +1,59 @@
+"""勤務区間と時間帯の重なり（配列演算）
+
+勤務区間は出勤・退勤の打刻（深夜0時起点の秒数）から [出勤, 退勤) として作り、
+退勤が出勤より前なら翌日退勤として +24時間する。したがって区間は
+出勤 ∈ [0, 24時間)、長さ 24時間未満。
+
+深夜帯のような時間帯は毎日繰り返す区間 [開始, 終了) で、終了が開始以前なら
+翌日にまたがるものとして +24時間する（22時〜5時 → [22時, 29時)）。
+勤務区間と重なりうるのは前日・当日・翌日の3回分なので、その重なりの合計を求める。
+時間帯の時刻はスカラーでも行ごとの配列でもよい。
+"""
+
+from collections.abc import Iterable
+
+import numpy as np
+
+DAY_SECONDS = 24 * 3600
+
+# 勤務区間と重なりうる時間帯の日（前日・当日・翌日）
+_DAY_OFFSETS = (-DAY_SECONDS, 0, DAY_SECONDS)
+
+
+def shift_intervals(clock_in, clock_out) -> tuple[np.ndarray, np.ndarray]:
+    """打刻 → 勤務区間の (開始, 終了) 秒数配列（打刻欠損の行は NaN）"""
+    start = np.asarray(clock_in, dtype=np.float64)
+    end = np.asarray(clock_out, dtype=np.float64)
+    return start, np.where(end < start, end + DAY_SECONDS, end)
+
+
+def band_interval(start_hour, end_hour) -> tuple[np.ndarray, np.ndarray]:
+    """時間帯の時刻 → (開始, 終了) 秒数（終了が開始以前なら翌日の時刻）"""
+    band_start = np.asarray(start_hour, dtype=np.float64) * 3600
+    band_end = np.asarray(end_hour, dtype=np.float64) * 3600
+    return band_start, np.where(band_end <= band_start, band_end + DAY_SECONDS, band_end)
+
+
+def overlap_seconds(start, end, band_start, band_end) -> np.ndarray:
+    """勤務区間と毎日繰り返す時間帯の重なり秒数（勤務区間が NaN の行は NaN）"""
+    total = np.zeros(np.broadcast(start, end, band_start, band_end).shape)
+    for offset in _DAY_OFFSETS:
+        total += np.clip(np.minimum(end, band_end + offset) - np.maximum(start, band_start + offset), 0, None)
+    return total
+
+
+def bands_overlap_minutes(clock_in, clock_out, bands: Iterable[tuple]) -> np.ndarray:
+    """打刻と複数の時間帯 (開始時, 終了時) の重なり分数（端数切り捨て、打刻欠損は NaN）
+
+    時間帯どうしは重ならないものとする。
+    """
+    start, end = shift_intervals(clock_in, clock_out)
+    seconds = np.zeros(start.shape)
+    for start_hour, end_hour in bands:
+        seconds += overlap_seconds(start, end, *band_interval(start_hour, end_hour))
+    return np.floor(seconds / 60)
+
+
+def night_minutes(clock_in, clock_out, night_start_hour, night_end_hour) -> np.ndarray:
+    """深夜帯の勤務分数（端数切り捨て、打刻欠損は NaN）"""
+    return bands_overlap_minutes(clock_in, clock_out, [(night_start_hour, night_end_hour)])
@@ -0,0 +1,62 @@
+"""異常一覧のページング補助（カーソル・件数キャッシュ）
+
+カーソルは最後に返した行の (detected_at, id) を不透明な文字列にしたもの。
+OFFSET と違い、ページの深さに関係なくインデックスの範囲走査で次ページを取得できる。
+総件数は毎回数えず、TTL付きのインメモリキャッシュで代用することもできる。
+"""
+
+import base64
+import time
+from collections import OrderedDict
+from datetime import datetime
+from threading import Lock
+
+COUNT_CACHE_TTL_SECONDS = 30
+COUNT_CACHE_MAX_ENTRIES = 1024
+
+
+class InvalidCursorError(ValueError):
+    """カーソル文字列が不正"""
+
+
+def encode_cursor(detected_at: datetime, issue_id: str) -> str:
+    """(detected_at, id) をカーソル文字列に変換"""
+    raw = f"{detected_at.isoformat()}|{issue_id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple[datetime, str]:
+    """カーソル文字列を (detected_at, id) に戻す"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        detected_at, issue_id = raw.split("|", 1)
+        return datetime.fromisoformat(detected_at), issue_id
+    except (ValueError, UnicodeDecodeError) as e:
+        raise InvalidCursorError("カーソルが不正です") from e
+
+
+_counts: "OrderedDict[tuple, tuple[int, float]]" = OrderedDict()  # key -> (件数, 取得時刻)
+_lock = Lock()
+
+
+def get_cached_count(key: tuple) -> int | None:
+    """TTL内の件数を取得"""
+    with _lock:
+        entry = _counts.get(key)
+        if entry is None:
+            return None
+        count, checked_at = entry
+        if time.monotonic() - checked_at >= COUNT_CACHE_TTL_SECONDS:
+            del _counts[key]
+            return None
+        _counts.move_to_end(key)
+        return count
+
+
+def put_cached_count(key: tuple, count: int) -> None:
+    """件数を登録（上限超過時は最も古いものを削除）"""
+    with _lock:
+        _counts[key] = (count, time.monotonic())
+        _counts.move_to_end(key)
+        while len(_counts) > COUNT_CACHE_MAX_ENTRIES:
+            _counts.popitem(last=False)
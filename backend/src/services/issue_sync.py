@@ -0,0 +1,123 @@
+"""再判定結果と既存の異常の差分反映（再検知・複数日ルール共通）
+
+  - 新たに該当したもの: 異常を作成（呼び出し側）
+  - 該当し続けるもの: 文言が変わっていれば更新してログを残す（完了済みは変更しない）
+  - 該当しなくなった未完了の異常: 対応ログ・理由文がなければ完了にしてログを残す
+    （対応ログ・理由文があるものは担当者の判断に任せるため変更しない）
+  - 自動で完了にした異常が再び該当した場合: 未対応に戻す
+
+異常は削除しない。自動処理が残したログは memo で見分け、担当者の対応とはみなさない。
+"""
+
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Hashable
+
+from sqlalchemy import insert, update, exists, or_
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.models.issue import Issue, IssueLog, CorrectionReason, IssueStatus
+
+DESCRIPTION_UPDATE_ACTION = "description_update"
+
+
+@dataclass(frozen=True)
+class AutoMemos:
+    """自動処理がログに残す文言（変更の理由ごと）"""
+    close: str
+    reopen: str
+    update: str
+
+
+RULE_CHANGE_MEMOS = AutoMemos(
+    close="検知ルールの変更により該当しなくなったため、自動で完了にしました",
+    reopen="検知ルールの変更により再び該当したため、未対応に戻しました",
+    update="検知ルールの変更により文言を更新しました",
+)
+DATA_CHANGE_MEMOS = AutoMemos(
+    close="勤怠データの更新により該当しなくなったため、自動で完了にしました",
+    reopen="勤怠データの更新により再び該当したため、未対応に戻しました",
+    update="勤怠データの更新により文言を更新しました",
+)
+_ALL_MEMOS = (RULE_CHANGE_MEMOS, DATA_CHANGE_MEMOS)
+AUTO_MEMOS = tuple(memo for memos in _ALL_MEMOS for memo in (memos.close, memos.reopen, memos.update))
+AUTO_CLOSE_MEMOS = tuple(memos.close for memos in _ALL_MEMOS)
+
+
+def handled_clause():
+    """自動処理以外の対応ログ・理由文があるか（SELECT 句に使う）"""
+    return (
+        exists().where(
+            IssueLog.issue_id == Issue.id,
+            or_(IssueLog.memo.is_(None), IssueLog.memo.notin_(AUTO_MEMOS)),
+        )
+        | exists().where(CorrectionReason.issue_id == Issue.id)
+    )
+
+
+def auto_closed_clause():
+    """自動で完了にしたことがあるか（SELECT 句に使う）"""
+    return exists().where(IssueLog.issue_id == Issue.id, IssueLog.memo.in_(AUTO_CLOSE_MEMOS))
+
+
+@dataclass
+class IssueDiff:
+    """既存の異常に対する変更"""
+    matched: set = field(default_factory=set)  # 既存の異常がある判定結果のキー
+    to_update: list[dict] = field(default_factory=list)  # {"id", "rule_description"}
+    to_close: list[tuple[str, str]] = field(default_factory=list)  # (異常ID, 変更前ステータス)
+    to_reopen: list[str] = field(default_factory=list)
+    kept: int = 0  # 該当しなくなったが対応ログ・理由文があるため残した件数
+
+
+def diff_issues(existing, desired: dict[Hashable, str]) -> IssueDiff:
+    """既存の異常と判定結果（キー → 文言）を突き合わせる
+
+    existing は (キー, 異常ID, ステータス, 文言, handled_clause, auto_closed_clause) の並び。
+    """
+    diff = IssueDiff()
+    for key, issue_id, status, description, is_handled, is_auto_closed in existing:
+        completed = status == IssueStatus.COMPLETED.value
+        if key in desired:
+            diff.matched.add(key)
+            reopen = completed and is_auto_closed and not is_handled
+            if reopen:
+                diff.to_reopen.append(issue_id)
+            if (reopen or not completed) and description != desired[key]:
+                diff.to_update.append({"id": issue_id, "rule_description": desired[key]})
+        elif not completed:
+            if is_handled:
+                diff.kept += 1
+            else:
+                diff.to_close.append((issue_id, status))
+    return diff
+
+
+async def apply_issue_diff(db: AsyncSession, diff: IssueDiff, user_id: str, memos: AutoMemos) -> None:
+    """文言の更新・自動完了・再オープンを反映し、それぞれログを残す"""
+    now = datetime.now(timezone.utc)
+    completed, pending = IssueStatus.COMPLETED.value, IssueStatus.PENDING.value
+    status_changes = [
+        (issue_id, old_status, completed, memos.close) for issue_id, old_status in diff.to_close
+    ] + [
+        (issue_id, completed, pending, memos.reopen) for issue_id in diff.to_reopen
+    ]
+
+    # 主キー指定の一括更新
+    if diff.to_update:
+        await db.execute(update(Issue), [{**item, "updated_at": now} for item in diff.to_update])
+    if status_changes:
+        await db.execute(update(Issue), [
+            {"id": issue_id, "status": new_status, "updated_at": now}
+            for issue_id, _, new_status, _ in status_changes
+        ])
+
+    logs = [
+        {"issue_id": item["id"], "user_id": user_id, "action": DESCRIPTION_UPDATE_ACTION, "memo": memos.update}
+        for item in diff.to_update
+    ] + [
+        {"issue_id": issue_id, "user_id": user_id, "action": f"status_change:{old_status}->{new_status}", "memo": memo}
+        for issue_id, old_status, new_status, memo in status_changes
+    ]
+    if logs:
+        await db.execute(insert(IssueLog), logs)
@@ -0,0 +1,165 @@
+"""PDFレポート生成（reportlab）
+
+DBやリクエストに依存しない純粋な処理。ラベル変換済みの行データだけを受け取るため、
+別プロセスのワーカーでもそのまま実行できる。
+reportlab の読み込みとフォント登録は起動時間短縮のため初回の生成時に行う。
+"""
+
+import io
+from dataclasses import dataclass, field
+from functools import lru_cache
+
+JP_FONT = "HeiseiKakuGo-W5"
+
+
+@lru_cache(maxsize=None)
+def _register_fonts() -> None:
+    """日本語フォント登録（プロセスごとに1回）"""
+    from reportlab.pdfbase import pdfmetrics
+    from reportlab.pdfbase.cidfonts import UnicodeCIDFont
+
+    pdfmetrics.registerFont(UnicodeCIDFont(JP_FONT))
+
+
+@dataclass
+class PdfReportData:
+    """PDFレポートの内容（表示用の文字列に変換済み）"""
+    month: str
+    generated_at: str
+    masked: bool
+    type_counts: list[tuple[str, int]]    # (種別ラベル, 件数)
+    status_counts: list[tuple[str, int]]  # (ステータスラベル, 件数)
+    total: int
+    # [日付, 店舗, 従業員, 種別, 重要度, ステータス]
+    rows: list[list[str]] = field(default_factory=list)
+
+
+def build_pdf(data: PdfReportData) -> bytes:
+    """PDFを生成してバイト列で返す"""
+    from reportlab.lib.pagesizes import A4
+    from reportlab.lib import colors
+    from reportlab.lib.units import mm
+    from reportlab.platypus import (
+        SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer,
+    )
+    from reportlab.lib.styles import ParagraphStyle
+
+    _register_fonts()
+
+    buf = io.BytesIO()
+    doc = SimpleDocTemplate(
+        buf,
+        pagesize=A4,
+        leftMargin=15 * mm,
+        rightMargin=15 * mm,
+        topMargin=20 * mm,
+        bottomMargin=15 * mm,
+    )
+
+    # スタイル定義
+    style_title = ParagraphStyle(
+        "Title", fontName=JP_FONT, fontSize=16, leading=22, spaceAfter=6,
+    )
+    style_subtitle = ParagraphStyle(
+        "Subtitle", fontName=JP_FONT, fontSize=10, leading=14, textColor=colors.grey,
+    )
+    style_heading = ParagraphStyle(
+        "Heading", fontName=JP_FONT, fontSize=12, leading=16, spaceBefore=12, spaceAfter=6,
+    )
+    style_body = ParagraphStyle(
+        "Body", fontName=JP_FONT, fontSize=9, leading=12,
+    )
+    style_disclaimer = ParagraphStyle(
+        "Disclaimer", fontName=JP_FONT, fontSize=7, leading=10, textColor=colors.grey,
+    )
+
+    elements: list = []
+
+    # タイトル
+    mask_label = "（個人情報マスク済）" if data.masked else ""
+    elements.append(Paragraph(f"勤怠異常レポート - {data.month}{mask_label}", style_title))
+    elements.append(Paragraph(
+        f"生成日時: {data.generated_at}　|　勤怠先生",
+        style_subtitle,
+    ))
+    elements.append(Spacer(1, 10 * mm))
+
+    # サマリーテーブル（種別×ステータス 並べて表示）
+    elements.append(Paragraph("サマリー", style_heading))
+
+    summary_data = [["異常種別", "件数", "", "ステータス", "件数"]]
+    type_items = data.type_counts
+    status_items = data.status_counts
+    max_rows = max(len(type_items), len(status_items))
+    for i in range(max_rows):
+        row = []
+        if i < len(type_items):
+            row += [type_items[i][0], str(type_items[i][1])]
+        else:
+            row += ["", ""]
+        row.append("")
+        if i < len(status_items):
+            row += [status_items[i][0], str(status_items[i][1])]
+        else:
+            row += ["", ""]
+        summary_data.append(row)
+    summary_data.append(["合計", str(data.total), "", "", ""])
+
+    summary_table = Table(summary_data, colWidths=[55 * mm, 20 * mm, 10 * mm, 40 * mm, 20 * mm])
+    summary_table.setStyle(TableStyle([
+        ("FONTNAME", (0, 0), (-1, -1), JP_FONT),
+        ("FONTSIZE", (0, 0), (-1, -1), 9),
+        ("BACKGROUND", (0, 0), (1, 0), colors.HexColor("#1976d2")),
+        ("BACKGROUND", (3, 0), (4, 0), colors.HexColor("#1976d2")),
+        ("TEXTCOLOR", (0, 0), (1, 0), colors.white),
+        ("TEXTCOLOR", (3, 0), (4, 0), colors.white),
+        ("ALIGN", (1, 0), (1, -1), "RIGHT"),
+        ("ALIGN", (4, 0), (4, -1), "RIGHT"),
+        ("GRID", (0, 0), (1, -1), 0.5, colors.lightgrey),
+        ("GRID", (3, 0), (4, -1), 0.5, colors.lightgrey),
+        ("ROWBACKGROUNDS", (0, 1), (1, -1), [colors.white, colors.HexColor("#f5f5f5")]),
+        ("ROWBACKGROUNDS", (3, 1), (4, -1), [colors.white, colors.HexColor("#f5f5f5")]),
+        ("BOTTOMPADDING", (0, 0), (-1, -1), 4),
+        ("TOPPADDING", (0, 0), (-1, -1), 4),
+    ]))
+    elements.append(summary_table)
+    elements.append(Spacer(1, 8 * mm))
+
+    # 詳細一覧
+    elements.append(Paragraph("異常一覧", style_heading))
+
+    if not data.rows:
+        elements.append(Paragraph("該当する異常データはありません。", style_body))
+    else:
+        detail_data = [["日付", "店舗", "従業員", "異常種別", "重要度", "ステータス"]]
+        detail_data.extend(data.rows)
+
+        detail_table = Table(
+            detail_data,
+            colWidths=[25 * mm, 28 * mm, 30 * mm, 35 * mm, 18 * mm, 22 * mm],
+            repeatRows=1,
+        )
+        detail_table.setStyle(TableStyle([
+            ("FONTNAME", (0, 0), (-1, -1), JP_FONT),
+            ("FONTSIZE", (0, 0), (-1, -1), 8),
+            ("BACKGROUND", (0, 0), (-1, 0), colors.HexColor("#1976d2")),
+            ("TEXTCOLOR", (0, 0), (-1, 0), colors.white),
+            ("ALIGN", (4, 0), (4, -1), "CENTER"),
+            ("ALIGN", (5, 0), (5, -1), "CENTER"),
+            ("GRID", (0, 0), (-1, -1), 0.5, colors.lightgrey),
+            ("ROWBACKGROUNDS", (0, 1), (-1, -1), [colors.white, colors.HexColor("#f5f5f5")]),
+            ("BOTTOMPADDING", (0, 0), (-1, -1), 3),
+            ("TOPPADDING", (0, 0), (-1, -1), 3),
+        ]))
+        elements.append(detail_table)
+
+    # 免責注記
+    elements.append(Spacer(1, 10 * mm))
+    elements.append(Paragraph(
+        "※ 本レポートは勤怠データに基づく異常の疑いを機械的に検知した結果であり、"
+        "法令違反の確定判断を行うものではありません。最終判断は社会保険労務士等の専門家にご確認ください。",
+        style_disclaimer,
+    ))
+
+    doc.build(elements)
+    return buf.getvalue()
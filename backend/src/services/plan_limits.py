@@ -6,9 +6,9 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from src.models.store import Organization, Store, PlanType
 
 PLAN_LIMITS = {
-    PlanType.FREE.value: {"clients": 3, "reason_gen_monthly": 3},
-    PlanType.STANDARD.value: {"clients": 10, "reason_gen_monthly": 99999},
-    PlanType.PRO.value: {"clients": 9999, "reason_gen_monthly": 99999},
+    PlanType.FREE.value: {"clients": 3, "reason_gen_monthly": 3, "batch_report": False},
+    PlanType.STANDARD.value: {"clients": 10, "reason_gen_monthly": 99999, "batch_report": False},
+    PlanType.PRO.value: {"clients": 9999, "reason_gen_monthly": 99999, "batch_report": True},
 }
 
 
@@ -36,6 +36,18 @@ async def check_client_limit(db: AsyncSession, organization_id: str) -> tuple[bo
     return True, ""
 
 
+async def check_batch_report(db: AsyncSession, organization_id: str) -> tuple[bool, str]:
+    """複数店舗一括レポートが使えるか。(利用可能か, メッセージ) を返す"""
+    org = await db.get(Organization, organization_id)
+    if not org:
+        return False, "組織が見つかりません"
+
+    if not PLAN_LIMITS.get(org.plan, PLAN_LIMITS[PlanType.FREE.value])["batch_report"]:
+        return False, "複数店舗の一括レポートは Pro プランでご利用いただけます。"
+
+    return True, ""
+
+
 async def get_client_count(db: AsyncSession, organization_id: str) -> int:
     """現在の顧問先数を取得"""
     result = await db.execute(
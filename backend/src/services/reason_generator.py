@@ -42,6 +42,12 @@ ISSUE_TYPE_LABELS = {
     "overtime": "長時間労働",
     "night_work": "深夜勤務",
     "inconsistency": "データ不整合",
+    "weekly_overtime": "週40時間超",
+    "monthly_overtime": "月45時間超",
+    "annual_overtime": "年360時間超",
+    "overtime_100h": "月100時間以上",
+    "overtime_average_80h": "複数月平均80時間超",
+    "consecutive_workdays": "連続勤務",
 }
 
 
@@ -0,0 +1,315 @@
+"""検知ルール変更時の再検知ジョブ（プロセス内 asyncio ワーカー）
+
+閾値が変わったルールに対応する異常種別だけを、指定期間の勤怠について
+新しいルールで判定し直し、既存の異常との差分を反映する（反映方法は issue_sync を参照）。
+深夜時間帯が変わった場合は、同じジョブで日次集計（attendance_daily_metrics）も作り直す。
+
+従業員 REDETECT_BATCH_EMPLOYEES 人ずつ別トランザクションで処理するため、
+大量の勤怠があってもリクエストやロックが長時間に及ばない。
+進捗はメモリ上に保持し、redetection_jobs テーブルにも保存する
+（再起動後や複数ワーカー構成でも進捗を参照できるように。保存は従業員のまとまりごと）。
+"""
+
+import asyncio
+import logging
+import time
+import uuid
+from dataclasses import dataclass, field, asdict
+from datetime import date, datetime, timezone
+
+from sqlalchemy import select, insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.config import settings
+from src.core.database import async_session_maker
+from src.models.attendance import AttendanceRecord
+from src.models.employee import Employee
+from src.models.import_job import ImportJobStatus
+from src.models.redetection_job import RedetectionJob
+from src.models.issue import Issue, IssueType
+from src.services.issue_sync import (
+    RULE_CHANGE_MEMOS, handled_clause, auto_closed_clause, diff_issues, apply_issue_diff,
+)
+from src.services.attendance_metrics import rebuild_employee_metrics
+from src.services.rule_overrides import get_rule_table
+
+logger = logging.getLogger(__name__)
+
+JOB_RETENTION_SECONDS = 60 * 60  # 完了ジョブをメモリに残す時間
+
+# 閾値の設定項目 → その値で判定結果が変わる異常種別
+RULE_ISSUE_TYPES = {
+    "break_minutes_6h": IssueType.INSUFFICIENT_BREAK.value,
+    "break_minutes_8h": IssueType.INSUFFICIENT_BREAK.value,
+    "daily_work_hours_alert": IssueType.OVERTIME.value,
+    "night_start_hour": IssueType.NIGHT_WORK.value,
+    "night_end_hour": IssueType.NIGHT_WORK.value,
+}
+
+
+def changed_issue_types(old_rules: dict, new_rules: dict) -> list[str]:
+    """閾値の変更で判定結果が変わりうる異常種別"""
+    return sorted({
+        issue_type for name, issue_type in RULE_ISSUE_TYPES.items()
+        if old_rules.get(name) != new_rules.get(name)
+    })
+
+
+@dataclass
+class RedetectionJobState:
+    """ジョブの進捗（メモリ上の表現）"""
+    organization_id: str
+    user_id: str
+    rules: dict
+    issue_types: list[str]  # 再検知する異常種別（空なら日次集計の作り直しのみ）
+    date_from: date | None
+    date_to: date | None
+    rebuild_metrics: bool = False  # 日次集計を新しい深夜時間帯で作り直すか
+    id: str = field(default_factory=lambda: str(uuid.uuid4()))
+    status: str = ImportJobStatus.QUEUED.value
+    employees_total: int | None = None
+    employees_processed: int = 0
+    record_count: int = 0
+    metrics_count: int = 0  # 作り直した日次集計の行数
+    created_count: int = 0
+    updated_count: int = 0
+    closed_count: int = 0
+    reopened_count: int = 0
+    kept_count: int = 0  # 該当しなくなったが対応ログ・理由文があるため残した件数
+    error: str | None = None
+    created_at: datetime = field(default_factory=lambda: datetime.now(timezone.utc))
+    started_at: datetime | None = None
+    finished_at: datetime | None = None
+
+
+_jobs: dict[str, RedetectionJobState] = {}
+_finished_at: dict[str, float] = {}  # job_id -> 完了時刻（monotonic）
+_queue: asyncio.Queue | None = None
+_worker_task: asyncio.Task | None = None
+
+
+def _cleanup() -> None:
+    """保持期間を過ぎた完了ジョブをメモリから削除"""
+    now = time.monotonic()
+    expired = [job_id for job_id, ts in _finished_at.items() if now - ts > JOB_RETENTION_SECONDS]
+    for job_id in expired:
+        _finished_at.pop(job_id, None)
+        _jobs.pop(job_id, None)
+
+
+async def _persist(job: RedetectionJobState) -> None:
+    """ジョブ進捗をDBに保存"""
+    try:
+        async with async_session_maker() as session:
+            await session.merge(RedetectionJob(**asdict(job)))
+            await session.commit()
+    except Exception:
+        logger.warning("Failed to persist redetection job %s", job.id, exc_info=True)
+
+
+def start_worker() -> None:
+    """ワーカーを起動（起動済みの場合は何もしない）
+
+    同じ組織の再検知が並行して差分を取り合わないよう、ジョブは1件ずつ実行する。
+    """
+    global _queue, _worker_task
+    if _worker_task is not None:
+        return
+    _queue = asyncio.Queue()
+    _worker_task = asyncio.create_task(_worker())
+
+
+async def stop_worker() -> None:
+    """ワーカーを停止"""
+    global _queue, _worker_task
+    if _worker_task is None:
+        return
+    _worker_task.cancel()
+    await asyncio.gather(_worker_task, return_exceptions=True)
+    _worker_task = None
+    _queue = None
+
+
+async def enqueue_redetection(
+    organization_id: str,
+    user_id: str,
+    rules: dict,
+    issue_types: list[str],
+    date_from: date | None,
+    date_to: date | None,
+    rebuild_metrics: bool = False,
+) -> RedetectionJobState:
+    """再検知ジョブを登録（rebuild_metrics なら日次集計も作り直す）"""
+    _cleanup()
+    job = RedetectionJobState(
+        organization_id=organization_id,
+        user_id=user_id,
+        rules=dict(rules),
+        issue_types=list(issue_types),
+        date_from=date_from,
+        date_to=date_to,
+        rebuild_metrics=rebuild_metrics,
+    )
+    _jobs[job.id] = job
+    await _persist(job)
+
+    start_worker()
+    await _queue.put(job.id)
+    return job
+
+
+async def get_job(job_id: str, organization_id: str) -> RedetectionJobState | None:
+    """ジョブを取得（他組織のジョブは None）"""
+    job = _jobs.get(job_id)
+    if job is None:
+        async with async_session_maker() as session:
+            row = await session.get(RedetectionJob, job_id)
+        if row is not None:
+            job = RedetectionJobState(
+                **{name: getattr(row, name) for name in RedetectionJobState.__dataclass_fields__}
+            )
+    if job is None or str(job.organization_id) != str(organization_id):
+        return None
+    return job
+
+
+async def _worker() -> None:
+    """キューからジョブを取り出して順に実行"""
+    while True:
+        job_id = await _queue.get()
+        try:
+            job = _jobs.get(job_id)
+            if job is not None:
+                await _run_redetection(job)
+        finally:
+            _queue.task_done()
+
+
+async def _run_redetection(job: RedetectionJobState) -> None:
+    """再検知ジョブ本体（従業員のまとまりごとにコミット）"""
+    job.status = ImportJobStatus.RUNNING.value
+    job.started_at = datetime.now(timezone.utc)
+    await _persist(job)
+    try:
+        async with async_session_maker() as db:
+            employee_ids = (await db.execute(
+                select(Employee.id)
+                .where(Employee.organization_id == job.organization_id)
+                .order_by(Employee.id)
+            )).scalars().all()
+        job.employees_total = len(employee_ids)
+        await _persist(job)
+
+        batch_size = settings.redetect_batch_employees
+        for i in range(0, len(employee_ids), batch_size):
+            batch = employee_ids[i:i + batch_size]
+            async with async_session_maker() as db:
+                try:
+                    if job.rebuild_metrics:
+                        job.metrics_count += await rebuild_employee_metrics(
+                            db, job.organization_id, batch,
+                            job.rules["night_start_hour"], job.rules["night_end_hour"],
+                        )
+                    if job.issue_types:
+                        await redetect_employees(db, job, batch)
+                    await db.commit()
+                except Exception:
+                    await db.rollback()
+                    raise
+            job.employees_processed += len(batch)
+            await _persist(job)
+
+        job.status = ImportJobStatus.COMPLETED.value
+    except Exception:
+        logger.error("Redetection job %s failed", job.id, exc_info=True)
+        job.status = ImportJobStatus.FAILED.value
+        job.error = "再検知中にエラーが発生しました。処理済みの従業員分は反映されています。"
+    finally:
+        job.finished_at = datetime.now(timezone.utc)
+        _finished_at[job.id] = time.monotonic()
+        await _persist(job)
+
+
+async def redetect_employees(db: AsyncSession, job: RedetectionJobState, employee_ids: list[str]) -> None:
+    """従業員のまとまり1つ分を再検知し、差分を反映（コミットは呼び出し側）"""
+    # 判定処理は pandas を含むため初回利用時に読み込む
+    from src.services.detection import detect_issues_bulk, time_to_seconds
+
+    records = (await db.execute(
+        select(
+            AttendanceRecord.id,
+            AttendanceRecord.employee_id,
+            Employee.store_id,
+            AttendanceRecord.date,
+            AttendanceRecord.clock_in,
+            AttendanceRecord.clock_out,
+            AttendanceRecord.break_minutes,
+            AttendanceRecord.work_type,
+        )
+        .join(Employee, Employee.id == AttendanceRecord.employee_id)
+        .where(
+            AttendanceRecord.employee_id.in_(employee_ids),
+            AttendanceRecord.date >= job.date_from,
+            AttendanceRecord.date <= job.date_to,
+        )
+    )).all()
+    if not records:
+        return
+    job.record_count += len(records)
+
+    record_ids, record_employees, store_ids, dates, clock_in, clock_out, breaks, work_types = zip(*records)
+    rule_table = await get_rule_table(db, job.organization_id, job.rules)
+    found = detect_issues_bulk(
+        time_to_seconds(clock_in),
+        time_to_seconds(clock_out),
+        [float("nan") if b is None else b for b in breaks],
+        job.rules,
+        rule_table.gather(store_ids, work_types),
+    )
+    found = found[found["type"].isin(job.issue_types)]
+    # 対象の種別は1レコードにつき高々1件（休憩不足は6時間・8時間のどちらか一方）
+    desired = {
+        (record_ids[row], issue_type): (row, severity, description)
+        for row, issue_type, severity, description in zip(
+            found["row"], found["type"], found["severity"], found["rule_description"]
+        )
+    }
+
+    existing = (await db.execute(
+        select(
+            Issue.attendance_record_id, Issue.type, Issue.id, Issue.status, Issue.rule_description,
+            handled_clause(), auto_closed_clause(),
+        ).where(
+            Issue.employee_id.in_(employee_ids),
+            Issue.date >= job.date_from,
+            Issue.date <= job.date_to,
+            Issue.type.in_(job.issue_types),
+        )
+    )).all()
+    diff = diff_issues(
+        (((record_id, issue_type), *rest) for record_id, issue_type, *rest in existing),
+        {key: description for key, (_, _, description) in desired.items()},
+    )
+    await apply_issue_diff(db, diff, job.user_id, RULE_CHANGE_MEMOS)
+    job.updated_count += len(diff.to_update)
+    job.closed_count += len(diff.to_close)
+    job.reopened_count += len(diff.to_reopen)
+    job.kept_count += diff.kept
+
+    new_issues = [
+        {
+            "attendance_record_id": record_id,
+            "organization_id": job.organization_id,
+            "store_id": store_ids[row],
+            "employee_id": record_employees[row],
+            "date": dates[row],
+            "type": issue_type,
+            "severity": severity,
+            "rule_description": description,
+        }
+        for (record_id, issue_type), (row, severity, description) in desired.items()
+        if (record_id, issue_type) not in diff.matched
+    ]
+    if new_issues:
+        await db.execute(insert(Issue), new_issues)
+        job.created_count += len(new_issues)
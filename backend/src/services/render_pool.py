@@ -0,0 +1,88 @@
+"""レポート描画ワーカープール
+
+reportlab の描画はCPUを占有するため、イベントループ上では実行せず
+プロセスプール（設定によりスレッドプール）で実行する。同時実行数は
+ワーカー数で制限し、待ちが上限を超えた場合は受け付けない。
+待ち件数・実行中件数はヘルスチェックから参照できる。
+"""
+
+import asyncio
+import multiprocessing
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Callable, TypeVar
+
+from src.config import settings
+
+T = TypeVar("T")
+
+
+class RenderQueueFullError(Exception):
+    """描画待ちが上限に達している"""
+
+
+_executor: Executor | None = None
+_semaphore: asyncio.Semaphore | None = None
+_running = 0
+_queued = 0
+
+
+def _get_executor() -> Executor:
+    """プールを取得（初回呼び出し時に作成）"""
+    global _executor
+    if _executor is None:
+        if settings.render_use_processes:
+            # スレッドを持つプロセスからの fork を避けるため spawn で起動する
+            _executor = ProcessPoolExecutor(
+                max_workers=settings.render_workers,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        else:
+            _executor = ThreadPoolExecutor(max_workers=settings.render_workers, thread_name_prefix="render")
+    return _executor
+
+
+def _get_semaphore() -> asyncio.Semaphore:
+    global _semaphore
+    if _semaphore is None:
+        _semaphore = asyncio.Semaphore(settings.render_workers)
+    return _semaphore
+
+
+async def run(fn: Callable[..., T], *args) -> T:
+    """fn(*args) をワーカーで実行（プロセスプールの場合、fn と引数は pickle 可能であること）"""
+    global _running, _queued
+    if _queued >= settings.render_max_queue:
+        raise RenderQueueFullError("レポート生成が混み合っています。しばらく経ってから再度お試しください。")
+
+    _queued += 1
+    try:
+        await _get_semaphore().acquire()
+    finally:
+        _queued -= 1
+
+    _running += 1
+    try:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(_get_executor(), fn, *args)
+    finally:
+        _running -= 1
+        _get_semaphore().release()
+
+
+def stats() -> dict:
+    """プールの状態（ヘルスチェック用）"""
+    return {
+        "workers": settings.render_workers,
+        "mode": "process" if settings.render_use_processes else "thread",
+        "running": _running,
+        "queued": _queued,
+    }
+
+
+def shutdown() -> None:
+    """プールを停止"""
+    global _executor, _semaphore
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
+    _semaphore = None
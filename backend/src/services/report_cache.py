@@ -0,0 +1,157 @@
+"""生成済みレポートのディスクキャッシュ
+
+キーは (組織, 店舗, 対象月, 形式, マスク有無, データバージョン) のハッシュ。
+データバージョンは対象範囲の取り込み・検知・対応ログの最終時刻から作るため、
+データが変わればキーも変わり、古いファイルは参照されなくなって LRU で消える。
+合計サイズが上限を超えたら最終アクセスの古いものから削除する。
+
+索引はプロセスごとに持つが、ヒット判定はファイルの有無で行うため
+複数ワーカーで同じディレクトリを共有しても誤ったファイルは返さない。
+"""
+
+import hashlib
+import os
+import tempfile
+from collections import OrderedDict
+from collections.abc import AsyncIterator
+from pathlib import Path
+from threading import Lock
+
+from src.config import settings
+
+# レイアウト変更時に上げると既存のキャッシュはすべて無効になる
+CACHE_FORMAT_VERSION = 1
+
+_index: "OrderedDict[str, int]" = OrderedDict()  # ファイル名 -> サイズ（古い順）
+_total_size = 0
+_loaded = False
+_lock = Lock()
+
+
+def enabled() -> bool:
+    """キャッシュが有効か（REPORT_CACHE_MAX_MB=0 で無効）"""
+    return settings.report_cache_max_mb > 0
+
+
+def cache_dir() -> Path:
+    """キャッシュの保存先"""
+    path = Path(settings.report_cache_dir or os.path.join(tempfile.gettempdir(), "kintai-reports"))
+    path.mkdir(parents=True, exist_ok=True)
+    return path
+
+
+def make_key(*parts: object) -> str:
+    """キー（= ETag）を作成"""
+    raw = "|".join(str(p) for p in (CACHE_FORMAT_VERSION, *parts))
+    return hashlib.sha256(raw.encode()).hexdigest()
+
+
+def _load_index() -> None:
+    """既存ファイルを更新時刻順に索引へ登録（_lock 取得中に呼ぶ）"""
+    global _total_size, _loaded
+    if _loaded:
+        return
+    entries = []
+    for entry in os.scandir(cache_dir()):
+        if entry.is_file() and not entry.name.startswith("."):
+            stat = entry.stat()
+            entries.append((stat.st_mtime, entry.name, stat.st_size))
+    for _, name, size in sorted(entries):
+        _index[name] = size
+        _total_size += size
+    _loaded = True
+
+
+def _evict() -> None:
+    """上限を超えた分を古い順に削除（_lock 取得中に呼ぶ）"""
+    global _total_size
+    limit = settings.report_cache_max_mb * 1024 * 1024
+    while _total_size > limit and _index:
+        name, size = _index.popitem(last=False)
+        _total_size -= size
+        (cache_dir() / name).unlink(missing_ok=True)
+
+
+def _discard(name: str) -> None:
+    """索引から除外（_lock 取得中に呼ぶ）"""
+    global _total_size
+    size = _index.pop(name, None)
+    if size is not None:
+        _total_size -= size
+
+
+def _register(name: str, size: int) -> None:
+    """索引の末尾（最新）に登録（_lock 取得中に呼ぶ）"""
+    global _total_size
+    _discard(name)
+    _index[name] = size
+    _total_size += size
+
+
+def get(key: str, ext: str) -> Path | None:
+    """キャッシュ済みファイルのパス（なければ None）"""
+    if not enabled():
+        return None
+    name = f"{key}.{ext}"
+    path = cache_dir() / name
+    with _lock:
+        _load_index()
+        if not path.exists():
+            # 他ワーカーが削除済み
+            _discard(name)
+            return None
+        if name not in _index:
+            # 他ワーカーが作成したファイル
+            _register(name, path.stat().st_size)
+        _index.move_to_end(name)
+    os.utime(path)
+    return path
+
+
+def _commit(tmp: Path, key: str, ext: str) -> None:
+    """一時ファイルをキャッシュに登録"""
+    name = f"{key}.{ext}"
+    size = tmp.stat().st_size
+    os.replace(tmp, cache_dir() / name)
+    with _lock:
+        _load_index()
+        _register(name, size)
+        _evict()
+
+
+def put(key: str, ext: str, data: bytes) -> None:
+    """バイト列をキャッシュに保存"""
+    if not enabled():
+        return
+    fd, name = tempfile.mkstemp(prefix=".", dir=cache_dir())
+    tmp = Path(name)
+    try:
+        with os.fdopen(fd, "wb") as out:
+            out.write(data)
+        _commit(tmp, key, ext)
+    except BaseException:
+        tmp.unlink(missing_ok=True)
+        raise
+
+
+async def tee(chunks: AsyncIterator[bytes], key: str, ext: str) -> AsyncIterator[bytes]:
+    """ストリーミング中のチャンクをそのまま返しつつ保存する
+
+    最後まで送信できた場合のみ登録し、途中で切断された場合は破棄する。
+    """
+    if not enabled():
+        async for chunk in chunks:
+            yield chunk
+        return
+
+    fd, name = tempfile.mkstemp(prefix=".", dir=cache_dir())
+    tmp = Path(name)
+    try:
+        with os.fdopen(fd, "wb") as out:
+            async for chunk in chunks:
+                out.write(chunk)
+                yield chunk
+        _commit(tmp, key, ext)
+    except BaseException:
+        tmp.unlink(missing_ok=True)
+        raise
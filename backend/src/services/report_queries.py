@@ -0,0 +1,227 @@
+"""レポート用集計クエリ
+
+異常件数を 店舗 × 種別 × ステータス × 重要度 の1回の GROUP BY で集計する。
+CSV/PDFレポートのサマリーやダッシュボードの件数表示はこの結果から作り、
+個々の Issue を読み込まない。
+レポートキャッシュのキーに使うデータバージョン、日次勤怠集計の月次合算もここで求める。
+"""
+
+from dataclasses import dataclass
+
+from sqlalchemy import select, func, extract
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.models.attendance import AttendanceRecord, AttendanceDailyMetrics
+from src.models.employee import Employee
+from src.models.issue import Issue, IssueLog
+from src.models.store import Store
+
+
+@dataclass(frozen=True)
+class SummaryRow:
+    """集計結果の1行"""
+    store_id: str
+    store_name: str
+    type: str
+    status: str
+    severity: str
+    count: int
+
+
+@dataclass
+class IssueSummary:
+    """異常件数の集計結果（各軸の件数は rows から導出する）"""
+    rows: list[SummaryRow]
+
+    @property
+    def total(self) -> int:
+        return sum(row.count for row in self.rows)
+
+    def _count_by(self, attr: str) -> dict[str, int]:
+        counts: dict[str, int] = {}
+        for row in self.rows:
+            key = getattr(row, attr)
+            counts[key] = counts.get(key, 0) + row.count
+        return dict(sorted(counts.items()))
+
+    def by_type(self) -> dict[str, int]:
+        """種別ごとの件数（キー順）"""
+        return self._count_by("type")
+
+    def by_status(self) -> dict[str, int]:
+        """ステータスごとの件数（キー順）"""
+        return self._count_by("status")
+
+    def by_severity(self) -> dict[str, int]:
+        """重要度ごとの件数（キー順）"""
+        return self._count_by("severity")
+
+    def by_store(self) -> list[tuple[str, str, int]]:
+        """店舗ごとの (店舗ID, 店舗名, 件数)（店舗名順）"""
+        counts: dict[tuple[str, str], int] = {}
+        for row in self.rows:
+            key = (row.store_id, row.store_name)
+            counts[key] = counts.get(key, 0) + row.count
+        return sorted(
+            ((store_id, name, count) for (store_id, name), count in counts.items()),
+            key=lambda item: (item[1], item[0]),
+        )
+
+
+async def summarize_issues(db: AsyncSession, conditions: list) -> IssueSummary:
+    """conditions（Issue のカラムに対する条件）に該当する異常を集計"""
+    result = await db.execute(
+        select(
+            Issue.store_id,
+            Store.name,
+            Issue.type,
+            Issue.status,
+            Issue.severity,
+            func.count(Issue.id),
+        )
+        .outerjoin(Store, Store.id == Issue.store_id)
+        .where(*conditions)
+        .group_by(Issue.store_id, Store.name, Issue.type, Issue.status, Issue.severity)
+    )
+    return IssueSummary(rows=[
+        SummaryRow(
+            store_id=str(store_id),
+            store_name=store_name or "",
+            type=issue_type,
+            status=issue_status,
+            severity=severity,
+            count=count,
+        )
+        for store_id, store_name, issue_type, issue_status, severity, count in result.all()
+    ])
+
+
+async def report_data_version(db: AsyncSession, conditions: list) -> str:
+    """conditions の範囲のデータバージョン
+
+    勤怠の取り込み・異常の検知と更新（再検知による文言の書き換えを含む）・
+    対応ログ（ステータス変更を含む）の最終時刻と件数、および表示に使う
+    従業員名・店舗名の更新時刻から作る。どれかが変われば値も変わる。
+    """
+    issue_stats = await db.execute(
+        select(
+            func.count(Issue.id),
+            func.max(Issue.detected_at),
+            func.max(Issue.updated_at),
+            func.max(AttendanceRecord.imported_at),
+            func.max(Employee.updated_at),
+            func.max(Store.updated_at),
+        )
+        .join(AttendanceRecord, AttendanceRecord.id == Issue.attendance_record_id)
+        .join(Employee, Employee.id == Issue.employee_id)
+        .outerjoin(Store, Store.id == Issue.store_id)
+        .where(*conditions)
+    )
+    last_log = await db.scalar(
+        select(func.max(IssueLog.created_at))
+        .join(Issue, Issue.id == IssueLog.issue_id)
+        .where(*conditions)
+    )
+    return "|".join(str(value) for value in (*issue_stats.one(), last_log))
+
+
+@dataclass(frozen=True)
+class MonthlyMetricsRow:
+    """日次勤怠集計の合算（店舗別、または従業員別）"""
+    store_id: str
+    store_name: str
+    employee_id: str | None
+    employee_code: str | None
+    employee_name: str | None
+    days: int  # 勤怠レコード数
+    worked_days: int  # 実労働を計算できた日数（打刻漏れを除く）
+    worked_minutes: int
+    break_minutes: int
+    night_minutes: int
+    overtime_minutes: int
+
+
+async def summarize_daily_metrics(db: AsyncSession, conditions: list, by_employee: bool) -> list[MonthlyMetricsRow]:
+    """conditions（AttendanceDailyMetrics のカラムに対する条件）の範囲を店舗別・従業員別に合算"""
+    m = AttendanceDailyMetrics
+    keys = [m.store_id, Store.name]
+    if by_employee:
+        keys += [m.employee_id, Employee.employee_code, Employee.name]
+
+    query = (
+        select(
+            *keys,
+            func.count(),
+            func.count(m.worked_minutes),
+            func.coalesce(func.sum(m.worked_minutes), 0),
+            func.coalesce(func.sum(m.break_minutes), 0),
+            func.coalesce(func.sum(m.night_minutes), 0),
+            func.coalesce(func.sum(m.overtime_minutes), 0),
+        )
+        .outerjoin(Store, Store.id == m.store_id)
+        .where(*conditions)
+        .group_by(*keys)
+    )
+    if by_employee:
+        query = query.join(Employee, Employee.id == m.employee_id).order_by(Store.name, Employee.employee_code)
+    else:
+        query = query.order_by(Store.name)
+
+    rows = []
+    for row in (await db.execute(query)).all():
+        if by_employee:
+            store_id, store_name, employee_id, employee_code, employee_name, *totals = row
+        else:
+            store_id, store_name, *totals = row
+            employee_id = employee_code = employee_name = None
+        rows.append(MonthlyMetricsRow(
+            str(store_id), store_name or "", employee_id, employee_code, employee_name, *map(int, totals),
+        ))
+    return rows
+
+
+@dataclass(frozen=True)
+class MonthlyNightRow:
+    """深夜勤務分数の月別合算（店舗別、または従業員別）"""
+    month: str  # YYYY-MM
+    store_id: str
+    store_name: str
+    employee_id: str | None
+    employee_code: str | None
+    employee_name: str | None
+    night_days: int  # 深夜勤務のあった日数
+    night_minutes: int
+
+
+async def summarize_night_minutes(db: AsyncSession, conditions: list, by_employee: bool) -> list[MonthlyNightRow]:
+    """conditions の範囲の深夜勤務分数を 月 × 店舗別・従業員別に合算（深夜勤務のない組は含めない）"""
+    m = AttendanceDailyMetrics
+    year = extract("year", m.date)
+    month = extract("month", m.date)
+    keys = [year, month, m.store_id, Store.name]
+    if by_employee:
+        keys += [m.employee_id, Employee.employee_code, Employee.name]
+
+    query = (
+        select(*keys, func.count(), func.sum(m.night_minutes))
+        .outerjoin(Store, Store.id == m.store_id)
+        .where(*conditions, m.night_minutes > 0)
+        .group_by(*keys)
+    )
+    if by_employee:
+        query = query.join(Employee, Employee.id == m.employee_id).order_by(year, month, Store.name, Employee.employee_code)
+    else:
+        query = query.order_by(year, month, Store.name)
+
+    rows = []
+    for row in (await db.execute(query)).all():
+        if by_employee:
+            row_year, row_month, store_id, store_name, employee_id, employee_code, employee_name, days, minutes = row
+        else:
+            row_year, row_month, store_id, store_name, days, minutes = row
+            employee_id = employee_code = employee_name = None
+        rows.append(MonthlyNightRow(
+            f"{int(row_year):04d}-{int(row_month):02d}", str(store_id), store_name or "",
+            employee_id, employee_code, employee_name, int(days), int(minutes),
+        ))
+    return rows
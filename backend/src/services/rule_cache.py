@@ -0,0 +1,67 @@
+"""検知ルールキャッシュ（インメモリ実装）
+
+組織ごとの検知ルールをプロセス内に保持する。TTL内はDBを参照せず、
+TTL経過後は DetectionRule.updated_at（バージョン）だけを照会して
+他ワーカーでの更新を検出する。更新APIからは明示的に無効化する。
+"""
+
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime
+from threading import Lock
+
+RULE_CACHE_TTL_SECONDS = 60
+RULE_CACHE_MAX_ENTRIES = 256
+
+
+@dataclass
+class CachedRules:
+    """キャッシュエントリ"""
+    rules: dict
+    version: datetime | None  # DetectionRule.updated_at（未設定の組織は None）
+    checked_at: float
+
+
+_cache: "OrderedDict[str, CachedRules]" = OrderedDict()
+_lock = Lock()
+
+
+def get_entry(organization_id: str) -> CachedRules | None:
+    """キャッシュエントリを取得（LRU順を更新）"""
+    with _lock:
+        entry = _cache.get(str(organization_id))
+        if entry is not None:
+            _cache.move_to_end(str(organization_id))
+        return entry
+
+
+def is_fresh(entry: CachedRules) -> bool:
+    """TTL内か（バージョン照会なしで使えるか）"""
+    return time.monotonic() - entry.checked_at < RULE_CACHE_TTL_SECONDS
+
+
+def put(organization_id: str, rules: dict, version: datetime | None) -> None:
+    """エントリを登録（上限超過時は最も古いものを削除）"""
+    with _lock:
+        _cache[str(organization_id)] = CachedRules(rules=rules, version=version, checked_at=time.monotonic())
+        _cache.move_to_end(str(organization_id))
+        while len(_cache) > RULE_CACHE_MAX_ENTRIES:
+            _cache.popitem(last=False)
+
+
+def touch(organization_id: str) -> None:
+    """バージョン確認済みとしてTTLを延長"""
+    with _lock:
+        entry = _cache.get(str(organization_id))
+        if entry is not None:
+            entry.checked_at = time.monotonic()
+
+
+def invalidate(organization_id: str | None = None) -> None:
+    """キャッシュを無効化（organization_id 省略時は全件）"""
+    with _lock:
+        if organization_id is None:
+            _cache.clear()
+        else:
+            _cache.pop(str(organization_id), None)
@@ -0,0 +1,89 @@
+"""検知ルールの店舗別・勤務区分別の上書き
+
+組織の検知ルールに DetectionRuleOverride を 組織 → 店舗 → 勤務区分 → 店舗×勤務区分
+の順に重ねて、(店舗, 勤務区分) ごとの閾値を決める。
+
+取り込み・再検知では対象行に現れる (店舗, 勤務区分) の組だけを一度ずつ解決して
+閾値表を作り、各行の組の番号で表を引いて（インデックス参照）行ごとの閾値配列にする。
+上書きがない組織では閾値配列を作らず、組織のルールだけで判定する。
+"""
+
+from typing import TYPE_CHECKING
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.models.settings import DetectionRuleOverride
+
+if TYPE_CHECKING:
+    import numpy as np
+
+# 上書きできる閾値（深夜時間帯は日次集計にも使うため組織単位のみ）
+OVERRIDE_PARAMS = ("break_minutes_6h", "break_minutes_8h", "daily_work_hours_alert")
+
+
+async def load_rule_overrides(db: AsyncSession, organization_id: str) -> list[DetectionRuleOverride]:
+    """組織の上書き設定を取得"""
+    result = await db.execute(
+        select(DetectionRuleOverride).where(DetectionRuleOverride.organization_id == organization_id)
+    )
+    return list(result.scalars().all())
+
+
+async def get_rule_table(db: AsyncSession, organization_id: str, rules: dict) -> "RuleTable":
+    """組織のルールと上書き設定から閾値表を作成"""
+    return RuleTable(rules, await load_rule_overrides(db, organization_id))
+
+
+class RuleTable:
+    """(店舗, 勤務区分) → 閾値 の解決"""
+
+    def __init__(self, rules: dict, overrides: list[DetectionRuleOverride]) -> None:
+        self.rules = rules
+        self._overrides = {
+            (o.store_id, o.work_type): {
+                name: getattr(o, name) for name in OVERRIDE_PARAMS if getattr(o, name) is not None
+            }
+            for o in overrides
+        }
+
+    def __bool__(self) -> bool:
+        return bool(self._overrides)
+
+    def resolve(self, store_id: str | None, work_type: str | None) -> dict:
+        """1つの (店舗, 勤務区分) に適用する閾値"""
+        resolved = dict(self.rules)
+        layers = [(store_id, None)]
+        if work_type is not None:
+            layers += [(None, work_type), (store_id, work_type)]
+        for key in layers:
+            resolved.update(self._overrides.get(key, {}))
+        return resolved
+
+    def gather(self, store_ids, work_types) -> dict[str, "np.ndarray"] | None:
+        """行ごとの閾値配列（上書きがない場合は None）
+
+        行に現れる (店舗, 勤務区分) の組に番号を振り、組ごとに解決した閾値表を
+        その番号で引く。
+        """
+        if not self._overrides:
+            return None
+        import numpy as np
+        import pandas as pd
+
+        store_codes, store_values = pd.factorize(pd.Series(store_ids, dtype=object), use_na_sentinel=False)
+        type_codes, type_values = pd.factorize(pd.Series(work_types, dtype=object), use_na_sentinel=False)
+        n_types = len(type_values)
+        pairs, codes = np.unique(store_codes * n_types + type_codes, return_inverse=True)
+
+        rows = []
+        for pair in pairs:
+            store_id, work_type = store_values[pair // n_types], type_values[pair % n_types]
+            resolved = self.resolve(
+                None if pd.isna(store_id) else store_id,
+                None if pd.isna(work_type) else work_type,
+            )
+            rows.append([resolved[name] for name in OVERRIDE_PARAMS])
+        table = np.array(rows, dtype=np.int64)
+        gathered = table[codes]
+        return {name: gathered[:, i] for i, name in enumerate(OVERRIDE_PARAMS)}
@@ -0,0 +1,355 @@
+"""検知ルールの登録簿
+
+ルール R001〜R008 を「入力列・判定式・文言テンプレート」の宣言として定義し、
+検知ルール設定（閾値）ごとに一度だけ判定器へコンパイルして再利用する。
+
+  - 入力列: FEATURES に定義した派生列の名前。判定器は必要な列だけを
+    初回参照時に計算し、複数のルールで共有する。
+  - 判定式: 入力列と閾値を受け取り、該当行のマスクを返す（配列演算）。
+    閾値はスカラーでも行ごとの配列でもよい。
+  - 文言テンプレート: str.format 形式。閾値名と入力列名を埋め込める。
+    該当した行についてのみ描画し、行の値を含まない文言は1回だけ作る。
+
+判定器は列配列に対する一括判定（取り込み・再検知）と、1レコードの判定の
+どちらにも使える。ルールを追加する場合は RULES に定義を足す。
+"""
+
+import string
+from collections.abc import Callable
+from dataclasses import dataclass
+from datetime import time
+from functools import lru_cache
+
+import numpy as np
+
+from src.models.issue import IssueType, IssueSeverity
+from src.services.intervals import DAY_SECONDS, night_minutes
+
+# 閾値（DetectionRule の設定項目）
+RULE_PARAMS = ("break_minutes_6h", "break_minutes_8h", "daily_work_hours_alert", "night_start_hour", "night_end_hour")
+
+
+# ========================================
+# 派生列
+# ========================================
+
+def _has_in(c: "RecordColumns") -> np.ndarray:
+    return ~np.isnan(c.clock_in)
+
+
+def _has_out(c: "RecordColumns") -> np.ndarray:
+    return ~np.isnan(c.clock_out)
+
+
+def _both(c: "RecordColumns") -> np.ndarray:
+    return c["has_in"] & c["has_out"]
+
+
+def _work_hours(c: "RecordColumns") -> np.ndarray:
+    """勤務時間（日跨ぎ対応、打刻欠損は NaN）"""
+    span = np.where(c.clock_out < c.clock_in, c.clock_out + DAY_SECONDS, c.clock_out) - c.clock_in
+    return np.where(c["both"], span / 3600, np.nan)
+
+
+def _has_hours(c: "RecordColumns") -> np.ndarray:
+    return ~np.isnan(c["work_hours"])
+
+
+def _break(c: "RecordColumns") -> np.ndarray:
+    """休憩分数（欠損は0）"""
+    return np.nan_to_num(c.break_minutes, nan=0.0)
+
+
+def _actual_break(c: "RecordColumns") -> np.ndarray:
+    """文言表示用の休憩分数（整数）"""
+    return c["break"].astype(np.int64)
+
+
+def _clock_out_hour(c: "RecordColumns") -> np.ndarray:
+    return np.floor(c.clock_out / 3600)
+
+
+FEATURES: dict[str, Callable[["RecordColumns"], np.ndarray]] = {
+    "has_in": _has_in,
+    "has_out": _has_out,
+    "both": _both,
+    "work_hours": _work_hours,
+    "has_hours": _has_hours,
+    "break": _break,
+    "actual_break": _actual_break,
+    "clock_out_hour": _clock_out_hour,
+    # 生の列（深夜0時起点の秒数、欠損は NaN）
+    "clock_in": lambda c: c.clock_in,
+    "clock_out": lambda c: c.clock_out,
+}
+
+
+class RecordColumns:
+    """判定対象の列（派生列は初回参照時に計算して保持）
+
+    打刻欠損の NaN を含む比較を行うため、派生列は np.errstate(invalid="ignore") の中で参照する。
+    """
+
+    def __init__(self, clock_in, clock_out, break_minutes) -> None:
+        self.clock_in = np.asarray(clock_in, dtype=np.float64)
+        self.clock_out = np.asarray(clock_out, dtype=np.float64)
+        self.break_minutes = np.asarray(break_minutes, dtype=np.float64)
+        self._features: dict[str, np.ndarray] = {}
+
+    def __len__(self) -> int:
+        return len(self.clock_in)
+
+    def __getitem__(self, name: str) -> np.ndarray:
+        value = self._features.get(name)
+        if value is None:
+            value = self._features[name] = FEATURES[name](self)
+        return value
+
+
+# ========================================
+# ルール定義
+# ========================================
+
+@dataclass(frozen=True)
+class RuleDefinition:
+    """検知ルールの宣言
+
+    predicate は inputs の列を順に受け取り、最後に閾値の辞書を受け取る。
+    unless に挙げたルールが該当した行では判定しない（R003 と R004 の排他など）。
+    """
+    code: str
+    issue_type: IssueType
+    severity: IssueSeverity
+    inputs: tuple[str, ...]
+    predicate: Callable[..., np.ndarray]
+    template: str
+    unless: tuple[str, ...] = ()
+
+
+def _night_work(cin, cout, p):
+    """深夜帯の勤務が1分以上あるか（日次集計の深夜分数と同じ計算）"""
+    return night_minutes(cin, cout, p["night_start_hour"], p["night_end_hour"]) > 0
+
+
+RULES: tuple[RuleDefinition, ...] = (
+    RuleDefinition(
+        code="R001", issue_type=IssueType.MISSING_CLOCK_IN, severity=IssueSeverity.HIGH,
+        inputs=("has_in", "has_out"),
+        predicate=lambda has_in, has_out, p: ~has_in & has_out,
+        template="出勤打刻がありません（退勤打刻のみ）",
+    ),
+    RuleDefinition(
+        code="R002", issue_type=IssueType.MISSING_CLOCK_OUT, severity=IssueSeverity.HIGH,
+        inputs=("has_in", "has_out"),
+        predicate=lambda has_in, has_out, p: has_in & ~has_out,
+        template="退勤打刻がありません（出勤打刻のみ）",
+    ),
+    RuleDefinition(
+        code="R003", issue_type=IssueType.INSUFFICIENT_BREAK, severity=IssueSeverity.HIGH,
+        inputs=("has_hours", "work_hours", "break"),
+        predicate=lambda has_hours, hours, brk, p: has_hours & (hours > 8) & (brk < p["break_minutes_8h"]),
+        template="8時間超勤務で休憩が{break_minutes_8h}分未満です（実績: {actual_break}分）",
+    ),
+    RuleDefinition(
+        code="R004", issue_type=IssueType.INSUFFICIENT_BREAK, severity=IssueSeverity.HIGH,
+        inputs=("has_hours", "work_hours", "break"),
+        predicate=lambda has_hours, hours, brk, p: has_hours & (hours > 6) & (brk < p["break_minutes_6h"]),
+        template="6時間超勤務で休憩が{break_minutes_6h}分未満です（実績: {actual_break}分）",
+        unless=("R003",),
+    ),
+    RuleDefinition(
+        code="R005", issue_type=IssueType.OVERTIME, severity=IssueSeverity.MEDIUM,
+        inputs=("has_hours", "work_hours"),
+        predicate=lambda has_hours, hours, p: has_hours & (hours > p["daily_work_hours_alert"]),
+        template="日次勤務時間が{daily_work_hours_alert}時間を超えています（実績: {work_hours:.1f}時間）",
+    ),
+    RuleDefinition(
+        code="R006", issue_type=IssueType.NIGHT_WORK, severity=IssueSeverity.LOW,
+        inputs=("clock_in", "clock_out"),
+        predicate=_night_work,
+        template="深夜帯（{night_start_hour}時〜{night_end_hour}時）の勤務があります",
+    ),
+    RuleDefinition(
+        code="R007", issue_type=IssueType.INCONSISTENCY, severity=IssueSeverity.HIGH,
+        inputs=("both", "clock_in", "clock_out", "clock_out_hour"),
+        # 退勤が6時台より後で出勤より前なら日跨ぎではなく入力誤り
+        predicate=lambda both, cin, cout, out_hour, p: both & (cout < cin) & (out_hour > 6),
+        template="退勤時刻が出勤時刻より前です",
+    ),
+    RuleDefinition(
+        code="R008", issue_type=IssueType.INCONSISTENCY, severity=IssueSeverity.HIGH,
+        inputs=("has_hours", "break", "work_hours"),
+        predicate=lambda has_hours, brk, hours, p: has_hours & (brk > hours * 60),
+        template="休憩時間が勤務時間を超えています",
+    ),
+)
+
+
+# ========================================
+# コンパイル
+# ========================================
+
+@dataclass
+class _CompiledRule:
+    definition: RuleDefinition
+    unless: tuple[int, ...]  # 排他ルールの RULES 内の位置
+    param_fields: tuple[str, ...]  # テンプレートに埋め込む閾値
+    row_fields: tuple[str, ...]  # テンプレートに埋め込む入力列
+    message: str  # 閾値を埋め込み済みで、行の値を位置引数で受け取るテンプレート
+
+
+@dataclass
+class RuleMatches:
+    """判定結果（行順→ルール順）"""
+    rows: np.ndarray
+    types: np.ndarray
+    severities: np.ndarray
+    descriptions: np.ndarray
+
+
+def _escape(text: str) -> str:
+    return text.replace("{", "{{").replace("}", "}}")
+
+
+def _positional_template(template: str, fixed: dict, row_fields: tuple[str, ...]) -> str:
+    """fixed の値を埋め込み、row_fields を {0}, {1}... の位置引数に置き換えたテンプレート"""
+    parts = []
+    for literal, name, spec, conversion in string.Formatter().parse(template):
+        parts.append(_escape(literal))
+        if name is None:
+            continue
+        if conversion:
+            raise ValueError(f"変換指定には対応していません: {template}")
+        if name in fixed:
+            parts.append(_escape(format(fixed[name], spec)))
+        else:
+            parts.append(f"{{{row_fields.index(name)}:{spec}}}" if spec else f"{{{row_fields.index(name)}}}")
+    return "".join(parts)
+
+
+class CompiledRuleSet:
+    """閾値を束縛した判定器"""
+
+    def __init__(self, params: dict, rules: tuple[RuleDefinition, ...] = RULES) -> None:
+        self.params = {name: params[name] for name in RULE_PARAMS}
+        positions = {rule.code: i for i, rule in enumerate(rules)}
+        self._rules: list[_CompiledRule] = []
+        for rule in rules:
+            unknown = [name for name in rule.inputs if name not in FEATURES]
+            if unknown:
+                raise ValueError(f"{rule.code}: 未定義の入力列 {unknown}")
+            fields = [name for _, name, _, _ in string.Formatter().parse(rule.template) if name]
+            param_fields = tuple(name for name in fields if name in self.params)
+            row_fields = tuple(name for name in fields if name not in self.params)
+            self._rules.append(_CompiledRule(
+                definition=rule,
+                unless=tuple(positions[code] for code in rule.unless),
+                param_fields=param_fields,
+                row_fields=row_fields,
+                message=_positional_template(rule.template, self.params, row_fields),
+            ))
+        self._types = np.array([rule.issue_type.value for rule in rules], dtype=object)
+        self._severities = np.array([rule.severity.value for rule in rules], dtype=object)
+
+    def _render(self, rule: _CompiledRule, columns: RecordColumns, idx: np.ndarray, params: dict) -> list[str]:
+        """該当行の文言を描画（閾値が配列の場合は行ごとの値を使う）"""
+        per_row = tuple(name for name in rule.param_fields if np.ndim(params[name]))
+        if per_row:
+            names = per_row + rule.row_fields
+            fixed = {name: params[name] for name in rule.param_fields if name not in per_row}
+            message = _positional_template(rule.definition.template, fixed, names)
+            values = [np.asarray(params[name])[idx].tolist() for name in per_row]
+        else:
+            message = rule.message
+            values = []
+        values += [columns[name][idx].tolist() for name in rule.row_fields]
+
+        if not values:
+            return [message] * len(idx)
+        if len(values) == 1:
+            return list(map(message.format, values[0]))
+        return [message.format(*row) for row in zip(*values)]
+
+    def evaluate(self, clock_in, clock_out, break_minutes, params: dict | None = None) -> RuleMatches:
+        """列配列をまとめて判定
+
+        clock_in / clock_out は深夜0時起点の秒数、break_minutes は分数（いずれも欠損は NaN）。
+        params を渡すとコンパイル時の閾値を上書きする（行ごとの配列も可）。
+        """
+        columns = RecordColumns(clock_in, clock_out, break_minutes)
+        params = self.params if params is None else {**self.params, **params}
+
+        masks: list[np.ndarray] = []
+        rows: list[np.ndarray] = []
+        positions: list[np.ndarray] = []
+        descriptions: list[str] = []
+        with np.errstate(invalid="ignore"):
+            for position, rule in enumerate(self._rules):
+                definition = rule.definition
+                mask = definition.predicate(*(columns[name] for name in definition.inputs), params)
+                for other in rule.unless:
+                    mask = mask & ~masks[other]
+                masks.append(mask)
+
+                idx = np.flatnonzero(mask)
+                if len(idx) == 0:
+                    continue
+                rows.append(idx)
+                positions.append(np.full(len(idx), position))
+                descriptions.extend(self._render(rule, columns, idx, params))
+
+        if not rows:
+            empty = np.empty(0, dtype=object)
+            return RuleMatches(rows=np.empty(0, dtype=np.int64), types=empty, severities=empty, descriptions=empty)
+
+        # ルール順を保ったまま行順に並べ替え（安定ソート）
+        row_index = np.concatenate(rows)
+        order = np.argsort(row_index, kind="stable")
+        rule_index = np.concatenate(positions)[order]
+        description_array = np.empty(len(descriptions), dtype=object)
+        description_array[:] = descriptions
+        return RuleMatches(
+            rows=row_index[order],
+            types=self._types[rule_index],
+            severities=self._severities[rule_index],
+            descriptions=description_array[order],
+        )
+
+    def evaluate_record(
+        self,
+        clock_in: time | None,
+        clock_out: time | None,
+        break_minutes: int | None,
+    ) -> list[tuple[IssueType, IssueSeverity, str]]:
+        """1レコードを判定し、(異常種別, 重要度, ルール説明) を R001〜R008 の順で返す
+
+        列配列の代わりにスカラー（0次元）の値で同じ判定式を評価する。
+        """
+        def seconds(t: time | None) -> float:
+            return np.nan if t is None else t.hour * 3600 + t.minute * 60 + t.second
+
+        columns = RecordColumns(
+            seconds(clock_in), seconds(clock_out), np.nan if break_minutes is None else break_minutes,
+        )
+        fired: list[bool] = []
+        found: list[tuple[IssueType, IssueSeverity, str]] = []
+        with np.errstate(invalid="ignore"):
+            for rule in self._rules:
+                definition = rule.definition
+                hit = bool(definition.predicate(*(columns[name] for name in definition.inputs), self.params))
+                hit = hit and not any(fired[other] for other in rule.unless)
+                fired.append(hit)
+                if hit:
+                    values = [columns[name].item() for name in rule.row_fields]
+                    found.append((definition.issue_type, definition.severity, rule.message.format(*values)))
+        return found
+
+
+@lru_cache(maxsize=256)
+def _compile(params: tuple[tuple[str, object], ...]) -> CompiledRuleSet:
+    return CompiledRuleSet(dict(params))
+
+
+def compile_rules(rules: dict) -> CompiledRuleSet:
+    """検知ルール設定から判定器を取得（同じ閾値の組み合わせはコンパイル済みを再利用）"""
+    return _compile(tuple((name, rules[name]) for name in RULE_PARAMS))
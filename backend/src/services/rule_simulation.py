@@ -0,0 +1,194 @@
+"""検知ルール変更のシミュレーション
+
+過去の勤怠レコードを読み込み、現在のルールと候補のルールでそれぞれ
+detect_issues_bulk を実行して、異常種別×店舗×月の件数を比較する。
+DBへの書き込みは行わない。
+
+対象期間の勤怠は日次集計（attendance_daily_metrics）の組織・日付インデックスで
+絞り込み、打刻の列だけを配列として読み込む。読み込んだ配列はデータが
+変わらない限り再利用するため、閾値を変えながらの再試行は判定のみで済む。
+"""
+
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import date
+from threading import Lock
+from typing import TYPE_CHECKING
+
+from sqlalchemy import select, func
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.models.attendance import AttendanceRecord, AttendanceDailyMetrics
+from src.models.employee import Employee
+from src.models.settings import DetectionRuleOverride
+from src.services.rule_overrides import RuleTable
+
+if TYPE_CHECKING:
+    import numpy as np
+
+# 読み込んだ勤怠を保持する件数（組織×期間×店舗）
+HISTORY_CACHE_SIZE = 8
+
+
+@dataclass(frozen=True)
+class AttendanceHistory:
+    """シミュレーション用の勤怠（列ごとの配列）"""
+    store_ids: "np.ndarray"
+    work_types: "np.ndarray"
+    months: "np.ndarray"  # 1970-01 起点の月番号
+    clock_in: "np.ndarray"  # 深夜0時起点の秒数（欠損は NaN）
+    clock_out: "np.ndarray"
+    break_minutes: "np.ndarray"  # 欠損は NaN
+
+    def __len__(self) -> int:
+        return len(self.store_ids)
+
+
+@dataclass
+class SimulationRow:
+    """異常種別×店舗×月ごとの件数"""
+    type: str
+    store_id: str
+    month: str
+    current_count: int
+    candidate_count: int
+
+
+_history: "OrderedDict[tuple, tuple[tuple, AttendanceHistory]]" = OrderedDict()
+_lock = Lock()
+
+
+async def _history_version(
+    db: AsyncSession,
+    conditions: list,
+    organization_id: str,
+    date_from: date,
+    date_to: date,
+    store_id: str | None,
+) -> tuple:
+    """対象範囲の勤怠が変わったかを判定するためのバージョン
+
+    読み込む列は日次集計と勤怠レコードの両方にあるため、日次集計の件数・計算時刻に加えて
+    勤怠レコード（勤務区分など）の更新時刻の最大値を見る。勤怠レコード側は
+    従業員・日付のインデックスで引く（日次集計からの結合より速い）。
+    """
+    m = AttendanceDailyMetrics
+    count, computed_at = (await db.execute(
+        select(func.count(), func.max(m.computed_at)).select_from(m).where(*conditions)
+    )).one()
+
+    record_conditions = [
+        Employee.organization_id == organization_id,
+        AttendanceRecord.date >= date_from,
+        AttendanceRecord.date <= date_to,
+    ]
+    if store_id:
+        record_conditions.append(Employee.store_id == store_id)
+    updated_at = await db.scalar(
+        select(func.max(AttendanceRecord.updated_at))
+        .join(Employee, Employee.id == AttendanceRecord.employee_id)
+        .where(*record_conditions)
+    )
+    return count, computed_at, updated_at
+
+
+async def load_history(
+    db: AsyncSession,
+    organization_id: str,
+    date_from: date,
+    date_to: date,
+    store_id: str | None = None,
+) -> AttendanceHistory:
+    """対象期間の勤怠を配列で読み込む（データが変わっていなければキャッシュを返す）"""
+    import numpy as np
+    from src.services.detection import time_to_seconds
+
+    m = AttendanceDailyMetrics
+    conditions = [m.organization_id == organization_id, m.date >= date_from, m.date <= date_to]
+    if store_id:
+        conditions.append(m.store_id == store_id)
+
+    key = (organization_id, date_from, date_to, store_id)
+    version = await _history_version(db, conditions, organization_id, date_from, date_to, store_id)
+    with _lock:
+        cached = _history.get(key)
+        if cached is not None and cached[0] == version:
+            _history.move_to_end(key)
+            return cached[1]
+
+    # ORM のエンティティ処理を通さずに列だけを受け取る
+    connection = await db.connection()
+    rows = (await connection.execute(
+        select(
+            m.store_id, AttendanceRecord.work_type, m.date,
+            AttendanceRecord.clock_in, AttendanceRecord.clock_out, AttendanceRecord.break_minutes,
+        )
+        .join(AttendanceRecord, AttendanceRecord.id == m.attendance_record_id)
+        .where(*conditions)
+    )).all()
+
+    if rows:
+        store_ids, work_types, dates, clock_in, clock_out, breaks = zip(*rows)
+    else:
+        store_ids = work_types = dates = clock_in = clock_out = breaks = ()
+    history = AttendanceHistory(
+        store_ids=np.array(store_ids, dtype=object),
+        work_types=np.array(work_types, dtype=object),
+        months=np.array(dates, dtype="datetime64[M]").astype(np.int64),
+        clock_in=time_to_seconds(clock_in),
+        clock_out=time_to_seconds(clock_out),
+        break_minutes=np.array([np.nan if b is None else b for b in breaks], dtype=np.float64),
+    )
+
+    with _lock:
+        _history[key] = (version, history)
+        _history.move_to_end(key)
+        while len(_history) > HISTORY_CACHE_SIZE:
+            _history.popitem(last=False)
+    return history
+
+
+def count_issues(
+    history: AttendanceHistory,
+    rules: dict,
+    overrides: list[DetectionRuleOverride] = (),
+) -> dict[tuple[str, str, str], int]:
+    """ルールで判定した異常件数を (種別, 店舗, 月) ごとに数える
+
+    overrides は店舗別・勤務区分別の上書き（ルールを変えても上書きはそのまま適用される）。
+    """
+    from src.services.detection import detect_issues_bulk
+
+    if len(history) == 0:
+        return {}
+    row_params = RuleTable(rules, list(overrides)).gather(history.store_ids, history.work_types)
+    found = detect_issues_bulk(history.clock_in, history.clock_out, history.break_minutes, rules, row_params)
+    if found.empty:
+        return {}
+    rows = found["row"].to_numpy()
+    counts = found.assign(
+        store_id=history.store_ids[rows],
+        month=history.months[rows],
+    ).groupby(["type", "store_id", "month"]).size()
+    return {
+        (issue_type, store_id, f"{1970 + month // 12:04d}-{month % 12 + 1:02d}"): int(n)
+        for (issue_type, store_id, month), n in counts.items()
+    }
+
+
+def compare_counts(
+    current: dict[tuple[str, str, str], int],
+    candidate: dict[tuple[str, str, str], int],
+) -> list[SimulationRow]:
+    """現在・候補の件数を突き合わせる（種別・月・店舗順）"""
+    keys = sorted(current.keys() | candidate.keys(), key=lambda k: (k[0], k[2], k[1]))
+    return [
+        SimulationRow(
+            type=issue_type,
+            store_id=store_id,
+            month=month,
+            current_count=current.get((issue_type, store_id, month), 0),
+            candidate_count=candidate.get((issue_type, store_id, month), 0),
+        )
+        for issue_type, store_id, month in keys
+    ]
@@ -0,0 +1,391 @@
+"""複数日にまたがる検知ルール（週・月・年・連続勤務）
+
+日次勤怠集計（attendance_daily_metrics）を従業員×日付順の配列として読み込み、
+グループ内の累積和・移動平均でまとめて判定する。
+
+  W001: 週40時間超（日曜始まりの週の実労働合計）
+  W002: 36協定 月45時間超（法定時間外労働の月累計）
+  W003: 36協定 年360時間超（協定年度の累計）
+  W004: 時間外労働 月100時間以上
+  W005: 時間外労働 2〜6か月平均80時間超
+  W006: 7日以上の連続勤務
+
+法定時間外労働は「1日8時間を超えた分」と「週の累計が40時間を超えた分
+（1日8時間超として数えた分を除く）」の合計で、休日労働は区別しない。
+異常は閾値を超えた日の勤怠レコードに紐付ける（平均は対象月の最終勤務日）。
+取り込み後は影響する従業員・期間だけを再判定し、既存の異常との差分を反映する
+（該当しなくなった異常は削除せず自動で完了にする。issue_sync を参照）。
+"""
+
+from dataclasses import dataclass
+from datetime import date, timedelta
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import select, insert, or_, func
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.models.attendance import AttendanceRecord, AttendanceDailyMetrics
+from src.models.issue import Issue, IssueType, IssueSeverity
+from src.services.issue_sync import (
+    DATA_CHANGE_MEMOS, handled_clause, auto_closed_clause, diff_issues, apply_issue_diff,
+)
+
+LEGAL_WEEKLY_MINUTES = 40 * 60
+MONTHLY_OVERTIME_LIMIT_MINUTES = 45 * 60
+ANNUAL_OVERTIME_LIMIT_MINUTES = 360 * 60
+MONTHLY_OVERTIME_CAP_MINUTES = 100 * 60
+AVERAGE_OVERTIME_CAP_MINUTES = 80 * 60
+AVERAGE_WINDOW_MONTHS = range(2, 7)  # 2〜6か月平均
+CONSECUTIVE_WORKDAY_LIMIT = 7
+
+AGREEMENT_YEAR_START_MONTH = 4  # 36協定の起算月（4月）
+LEGAL_DAILY_MINUTES = 8 * 60
+
+# 複数日ルールで作成する異常種別（差分反映の対象）
+WINDOW_ISSUE_TYPES = (
+    IssueType.WEEKLY_OVERTIME.value,
+    IssueType.MONTHLY_OVERTIME.value,
+    IssueType.ANNUAL_OVERTIME.value,
+    IssueType.OVERTIME_100H.value,
+    IssueType.OVERTIME_AVERAGE_80H.value,
+    IssueType.CONSECUTIVE_WORKDAYS.value,
+)
+
+WINDOW_FRAME_COLUMNS = [
+    "attendance_record_id", "store_id", "employee_id", "date", "type", "severity", "rule_description",
+]
+
+IN_CLAUSE_CHUNK = 500
+
+
+def _hours(minutes: float) -> str:
+    return f"{minutes / 60:.1f}"
+
+
+def _month_start(d: date) -> date:
+    return d.replace(day=1)
+
+
+def _add_months(d: date, months: int) -> date:
+    """月初日に months か月を加える"""
+    index = d.year * 12 + d.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def _agreement_year_start(d: date) -> date:
+    year = d.year if d.month >= AGREEMENT_YEAR_START_MONTH else d.year - 1
+    return date(year, AGREEMENT_YEAR_START_MONTH, 1)
+
+
+def _week_start(d: date) -> date:
+    """日曜始まりの週の初日"""
+    return d - timedelta(days=(d.weekday() + 1) % 7)
+
+
+# ========================================
+# 判定（DBアクセスなし）
+# ========================================
+
+def _crossings(frame: pd.DataFrame, keys: list[str], values: str, threshold: float) -> pd.DataFrame:
+    """keys ごとの values の累計が threshold を初めて超えた行（累計・グループ合計を付与）"""
+    cumulative = frame.groupby(keys, sort=False)[values].cumsum()
+    previous = cumulative - frame[values]
+    crossed = frame[(cumulative > threshold) & (previous <= threshold)].copy()
+    crossed["cumulative"] = cumulative[crossed.index]
+    crossed["group_total"] = frame.groupby(keys, sort=False)[values].transform("sum")[crossed.index]
+    return crossed
+
+
+def _issue_frame(
+    rows: pd.DataFrame, issue_type: IssueType, severity: IssueSeverity, descriptions: list[str],
+) -> pd.DataFrame:
+    out = rows[["attendance_record_id", "store_id", "employee_id", "date"]].copy()
+    out["type"] = issue_type.value
+    out["severity"] = severity.value
+    out["rule_description"] = descriptions
+    return out
+
+
+def evaluate_window_rules(metrics: pd.DataFrame) -> pd.DataFrame:
+    """複数日ルールを判定
+
+    metrics は attendance_record_id, store_id, employee_id, date, worked_minutes,
+    overtime_minutes, present（出勤・退勤いずれかの打刻あり）を持つ DataFrame。
+    判定期間（週・月・協定年度・平均の対象月）は全日分が含まれている前提。
+    WINDOW_FRAME_COLUMNS の DataFrame を返す。
+    """
+    if metrics.empty:
+        return pd.DataFrame(columns=WINDOW_FRAME_COLUMNS)
+
+    frame = metrics.sort_values(["employee_id", "date"], ignore_index=True)
+    dates = pd.to_datetime(frame["date"])
+    worked = frame["worked_minutes"].astype("float64").fillna(0.0)
+    daily_overtime = frame["overtime_minutes"].astype("float64").fillna(0.0)
+    frame = frame.assign(
+        worked=worked,
+        within_daily=worked - daily_overtime,
+        week=dates - pd.to_timedelta((dates.dt.dayofweek + 1) % 7, unit="D"),
+        month=dates.dt.to_period("M"),
+        agreement_year=dates.dt.year - (dates.dt.month < AGREEMENT_YEAR_START_MONTH).astype(int),
+    )
+
+    # 法定時間外 = 日8時間超 + 週40時間超（日8時間以内の部分の週累計が40時間を超えた分）
+    within_cum = frame.groupby(["employee_id", "week"], sort=False)["within_daily"].cumsum()
+    weekly_excess = (
+        (within_cum - LEGAL_WEEKLY_MINUTES).clip(lower=0)
+        - (within_cum - frame["within_daily"] - LEGAL_WEEKLY_MINUTES).clip(lower=0)
+    )
+    frame["legal_overtime"] = daily_overtime + weekly_excess
+
+    found: list[pd.DataFrame] = []
+
+    # W001: 週40時間超
+    rows = _crossings(frame, ["employee_id", "week"], "worked", LEGAL_WEEKLY_MINUTES)
+    found.append(_issue_frame(rows, IssueType.WEEKLY_OVERTIME, IssueSeverity.MEDIUM, [
+        f"週の労働時間が40時間を超えています（{week:%m/%d}からの週: {_hours(total)}時間）"
+        for week, total in zip(rows["week"], rows["group_total"])
+    ]))
+
+    # W002: 月45時間超
+    rows = _crossings(frame, ["employee_id", "month"], "legal_overtime", MONTHLY_OVERTIME_LIMIT_MINUTES)
+    found.append(_issue_frame(rows, IssueType.MONTHLY_OVERTIME, IssueSeverity.HIGH, [
+        f"36協定の月45時間を超える時間外労働です（{month.month}月: {_hours(total)}時間）"
+        for month, total in zip(rows["month"], rows["group_total"])
+    ]))
+
+    # W004: 月100時間以上
+    rows = _crossings(frame, ["employee_id", "month"], "legal_overtime", MONTHLY_OVERTIME_CAP_MINUTES - 1)
+    found.append(_issue_frame(rows, IssueType.OVERTIME_100H, IssueSeverity.HIGH, [
+        f"時間外労働が月100時間以上です（{month.month}月: {_hours(total)}時間）"
+        for month, total in zip(rows["month"], rows["group_total"])
+    ]))
+
+    # W003: 年360時間超
+    rows = _crossings(frame, ["employee_id", "agreement_year"], "legal_overtime", ANNUAL_OVERTIME_LIMIT_MINUTES)
+    found.append(_issue_frame(rows, IssueType.ANNUAL_OVERTIME, IssueSeverity.HIGH, [
+        f"36協定の年360時間を超える時間外労働です（{year}年度: {_hours(total)}時間）"
+        for year, total in zip(rows["agreement_year"], rows["group_total"])
+    ]))
+
+    found.append(_average_overtime(frame))
+    found.append(_consecutive_workdays(frame))
+
+    result = pd.concat([f for f in found if not f.empty], ignore_index=True) if any(
+        not f.empty for f in found
+    ) else pd.DataFrame(columns=WINDOW_FRAME_COLUMNS)
+    return result.sort_values(["employee_id", "date"], kind="stable", ignore_index=True)
+
+
+def _average_overtime(frame: pd.DataFrame) -> pd.DataFrame:
+    """W005: 2〜6か月平均80時間超（勤務のない月は0時間として平均する）"""
+    monthly = frame.groupby(["employee_id", "month"])["legal_overtime"].sum()
+    flagged = []
+    for employee_id, series in monthly.groupby(level="employee_id", sort=False):
+        series = series.droplevel("employee_id")
+        months = pd.period_range(series.index.min(), series.index.max(), freq="M")
+        totals = series.reindex(months, fill_value=0.0)
+        worst = pd.Series(0.0, index=months)
+        worst_window = pd.Series(0, index=months)
+        for window in AVERAGE_WINDOW_MONTHS:
+            average = totals.rolling(window).mean()
+            better = average > worst
+            worst = worst.where(~better, average)
+            worst_window = worst_window.where(~better, window)
+        for month in worst.index[worst > AVERAGE_OVERTIME_CAP_MINUTES]:
+            if month in series.index:
+                flagged.append((employee_id, month, int(worst_window[month]), float(worst[month])))
+
+    if not flagged:
+        return pd.DataFrame(columns=WINDOW_FRAME_COLUMNS)
+
+    keys = pd.DataFrame(flagged, columns=["employee_id", "month", "window", "average"])
+    last_days = frame.groupby(["employee_id", "month"], sort=False).tail(1)
+    rows = last_days.merge(keys, on=["employee_id", "month"])
+    return _issue_frame(rows, IssueType.OVERTIME_AVERAGE_80H, IssueSeverity.HIGH, [
+        f"時間外労働の{window}か月平均が80時間を超えています（{month.month}月まで: 平均{_hours(average)}時間）"
+        for month, window, average in zip(rows["month"], rows["window"], rows["average"])
+    ])
+
+
+def _consecutive_workdays(frame: pd.DataFrame) -> pd.DataFrame:
+    """W006: 7日以上の連続勤務（連続の7日目に1件）"""
+    worked = frame[frame["present"]].reset_index(drop=True)
+    if worked.empty:
+        return pd.DataFrame(columns=WINDOW_FRAME_COLUMNS)
+
+    days = pd.to_datetime(worked["date"]).to_numpy().astype("datetime64[D]").astype(np.int64)
+    employee = worked["employee_id"].to_numpy()
+    new_streak = np.ones(len(worked), dtype=bool)
+    new_streak[1:] = (employee[1:] != employee[:-1]) | (np.diff(days) != 1)
+    streak_id = np.cumsum(new_streak)
+    position = worked.groupby(streak_id).cumcount().to_numpy() + 1
+    length = pd.Series(streak_id).map(pd.Series(streak_id).value_counts()).to_numpy()
+    first_day = worked.groupby(streak_id)["date"].transform("first")
+
+    anchor = position == CONSECUTIVE_WORKDAY_LIMIT
+    rows = worked[anchor]
+    return _issue_frame(rows, IssueType.CONSECUTIVE_WORKDAYS, IssueSeverity.MEDIUM, [
+        f"{CONSECUTIVE_WORKDAY_LIMIT}日以上連続で勤務しています（{start:%m/%d}から{n}日連続）"
+        for start, n in zip(first_day[anchor], length[anchor])
+    ])
+
+
+# ========================================
+# 取り込み後の差分反映
+# ========================================
+
+@dataclass
+class WindowRange:
+    """再判定する期間と、そのために読み込む期間"""
+    evaluate_from: date
+    evaluate_to: date
+    load_from: date
+
+
+def affected_range(date_min: date, date_max: date) -> WindowRange:
+    """date_min〜date_max の勤怠が変わったときに結果が変わりうる期間
+
+    週・月・協定年度は該当日を含む期間全体、平均は以降5か月、連続勤務は前後6日に影響する。
+    平均と連続勤務の判定のため、読み込みは再判定期間の6か月前から行う。
+    """
+    evaluate_from = min(_week_start(date_min), _agreement_year_start(date_min), date_min - timedelta(days=6))
+    evaluate_to = max(
+        _add_months(_agreement_year_start(date_max), 12) - timedelta(days=1),
+        _add_months(_month_start(date_max), 6) - timedelta(days=1),
+        date_max + timedelta(days=6),
+    )
+    return WindowRange(
+        evaluate_from=evaluate_from,
+        evaluate_to=evaluate_to,
+        load_from=_add_months(_month_start(evaluate_from), -6),
+    )
+
+
+async def load_window_metrics(
+    db: AsyncSession,
+    employee_ids: list[str],
+    date_from: date,
+    date_to: date,
+) -> pd.DataFrame:
+    """evaluate_window_rules の入力を読み込む"""
+    m = AttendanceDailyMetrics
+    rows = []
+    for i in range(0, len(employee_ids), IN_CLAUSE_CHUNK):
+        result = await db.execute(
+            select(
+                m.attendance_record_id, m.store_id, m.employee_id, m.date,
+                m.worked_minutes, m.overtime_minutes,
+                or_(AttendanceRecord.clock_in.isnot(None), AttendanceRecord.clock_out.isnot(None)),
+            )
+            .join(AttendanceRecord, AttendanceRecord.id == m.attendance_record_id)
+            .where(
+                m.employee_id.in_(employee_ids[i:i + IN_CLAUSE_CHUNK]),
+                m.date >= date_from,
+                m.date <= date_to,
+            )
+        )
+        rows.extend(result.all())
+    return pd.DataFrame(rows, columns=[
+        "attendance_record_id", "store_id", "employee_id", "date",
+        "worked_minutes", "overtime_minutes", "present",
+    ]).astype({"present": bool})
+
+
+async def apply_window_issues(
+    db: AsyncSession,
+    organization_id: str,
+    employee_ids: list[str],
+    evaluate_from: date,
+    evaluate_to: date,
+    found: pd.DataFrame,
+    user_id: str,
+) -> int:
+    """判定結果と既存の異常の差分を反映し、新規作成した件数を返す
+
+    (従業員, 種別, 日付) が一致する既存の異常は残し、文言だけ更新する。
+    該当しなくなった異常・再び該当した異常は issue_sync の方針で完了・未対応に戻し、
+    user_id（取り込みを行ったユーザー）の名前でログを残す。
+    """
+    found = found[(found["date"] >= evaluate_from) & (found["date"] <= evaluate_to)]
+    desired = {
+        (row.employee_id, row.type, row.date): row
+        for row in found.itertuples(index=False)
+    }
+
+    existing = []
+    for i in range(0, len(employee_ids), IN_CLAUSE_CHUNK):
+        result = await db.execute(
+            select(
+                Issue.employee_id, Issue.type, Issue.date,
+                Issue.id, Issue.status, Issue.rule_description, handled_clause(), auto_closed_clause(),
+            ).where(
+                Issue.organization_id == organization_id,
+                Issue.employee_id.in_(employee_ids[i:i + IN_CLAUSE_CHUNK]),
+                Issue.type.in_(WINDOW_ISSUE_TYPES),
+                Issue.date >= evaluate_from,
+                Issue.date <= evaluate_to,
+            )
+        )
+        existing.extend(
+            ((employee_id, issue_type, issue_date), *rest)
+            for employee_id, issue_type, issue_date, *rest in result.all()
+        )
+
+    diff = diff_issues(existing, {key: row.rule_description for key, row in desired.items()})
+    await apply_issue_diff(db, diff, user_id, DATA_CHANGE_MEMOS)
+
+    new_issues = [
+        {
+            "attendance_record_id": row.attendance_record_id,
+            "organization_id": organization_id,
+            "store_id": row.store_id,
+            "employee_id": row.employee_id,
+            "date": row.date,
+            "type": row.type,
+            "severity": row.severity,
+            "rule_description": row.rule_description,
+        }
+        for key, row in desired.items()
+        if key not in diff.matched
+    ]
+    if new_issues:
+        await db.execute(insert(Issue), new_issues)
+    return len(new_issues)
+
+
+async def detect_window_issues(
+    db: AsyncSession,
+    organization_id: str,
+    employee_ids: list[str],
+    date_min: date,
+    date_max: date,
+    user_id: str,
+) -> int:
+    """date_min〜date_max の勤怠が変わった従業員について複数日ルールを再判定
+
+    影響する期間だけを読み込んで判定し、差分を反映する。新規作成した件数を返す。
+    user_id は自動で完了・未対応に戻したときのログに記録するユーザー。
+    """
+    if not employee_ids:
+        return 0
+    window = affected_range(date_min, date_max)
+    metrics = await load_window_metrics(db, employee_ids, window.load_from, window.evaluate_to)
+    found = evaluate_window_rules(metrics)
+    return await apply_window_issues(
+        db, organization_id, employee_ids, window.evaluate_from, window.evaluate_to, found, user_id,
+    )
+
+
+async def detect_window_issues_for_organization(db: AsyncSession, organization_id: str, user_id: str) -> int:
+    """組織の全勤怠について複数日ルールを判定（既存データの初期作成用）"""
+    m = AttendanceDailyMetrics
+    date_min, date_max = (await db.execute(
+        select(func.min(m.date), func.max(m.date)).where(m.organization_id == organization_id)
+    )).one()
+    if date_min is None:
+        return 0
+    employee_ids = (await db.execute(
+        select(m.employee_id).where(m.organization_id == organization_id).distinct()
+    )).scalars().all()
+    return await detect_window_issues(db, organization_id, sorted(employee_ids), date_min, date_max, user_id)
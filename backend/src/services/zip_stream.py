@@ -0,0 +1,66 @@
+"""ZIPのストリーミング生成
+
+zipfile にシーク不可の出力先を渡すと、各エントリのサイズ・CRCを
+データ記述子として後置する形式で書き出される。書き込まれたバイト列を
+その都度取り出して返すことで、アーカイブ全体をメモリに持たずに送信できる。
+"""
+
+import os
+import time
+import zipfile
+from collections.abc import Iterator
+from typing import BinaryIO
+
+ZIP_COPY_CHUNK_SIZE = 64 * 1024
+
+
+class _Sink:
+    """書き込まれたバイト列を溜めておく出力先（シーク不可）"""
+
+    def __init__(self) -> None:
+        self._buf = bytearray()
+
+    def write(self, data: bytes) -> int:
+        self._buf += data
+        return len(data)
+
+    def flush(self) -> None:
+        pass
+
+    def drain(self) -> bytes:
+        data = bytes(self._buf)
+        self._buf.clear()
+        return data
+
+
+class ZipStream:
+    """エントリを追加するたびに出力済みのバイト列を返すZIPライター"""
+
+    def __init__(self) -> None:
+        self._sink = _Sink()
+        self._zip = zipfile.ZipFile(self._sink, "w")
+
+    def add_file(self, name: str, fp: BinaryIO, compress: bool = True) -> Iterator[bytes]:
+        """ファイルオブジェクトの内容をエントリとして追加"""
+        info = zipfile.ZipInfo(name, date_time=time.localtime()[:6])
+        info.compress_type = zipfile.ZIP_DEFLATED if compress else zipfile.ZIP_STORED
+        # シーク不可のため ZIP64 の要否を事前に判定させる
+        info.file_size = os.fstat(fp.fileno()).st_size
+        with self._zip.open(info, "w") as entry:
+            while chunk := fp.read(ZIP_COPY_CHUNK_SIZE):
+                entry.write(chunk)
+                if data := self._sink.drain():
+                    yield data
+        yield self._sink.drain()
+
+    def add_bytes(self, name: str, data: bytes, compress: bool = True) -> bytes:
+        """バイト列をエントリとして追加"""
+        info = zipfile.ZipInfo(name, date_time=time.localtime()[:6])
+        info.compress_type = zipfile.ZIP_DEFLATED if compress else zipfile.ZIP_STORED
+        self._zip.writestr(info, data)
+        return self._sink.drain()
+
+    def close(self) -> bytes:
+        """セントラルディレクトリを書き出して終了"""
+        self._zip.close()
+        return self._sink.drain()
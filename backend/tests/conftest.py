@@ -0,0 +1,10 @@
+"""テスト共通設定
+
+src.config は読み込み時に設定を検証するため、src を import する前に環境変数を設定する。
+"""
+
+import os
+
+os.environ.setdefault("JWT_SECRET_KEY", "test-secret-key")
+os.environ.setdefault("DATABASE_URL", "sqlite+aiosqlite:///:memory:")
+os.environ.setdefault("RENDER_USE_PROCESSES", "false")
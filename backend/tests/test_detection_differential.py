@@ -0,0 +1,251 @@
+"""一括判定（detect_issues_bulk）と1レコード判定（evaluate_record）の差分テスト
+
+生成したシフトを、ベクトル化前の1レコードずつの判定ロジック（datetime による計算）を
+移植した参照実装と突き合わせる。日跨ぎシフト・日付をまたぐ深夜帯・打刻欠損・
+休憩時間の境界値を含める。
+
+深夜勤務（R006）は user-025 の修正後の仕様（深夜帯との重なりが1分以上）で判定する。
+"""
+
+import random
+from datetime import date, datetime, time, timedelta
+
+import numpy as np
+import pytest
+
+from src.models.issue import IssueType, IssueSeverity
+from src.services.detection import detect_issues_bulk, evaluate_record, time_to_seconds
+
+_REF_DATE = date(2000, 1, 1)
+_DAY = timedelta(days=1)
+
+
+# ========================================
+# 参照実装（1レコードずつ）
+# ========================================
+
+def _work_hours(clock_in: time | None, clock_out: time | None) -> float | None:
+    if clock_in is None or clock_out is None:
+        return None
+    dt_in = datetime.combine(_REF_DATE, clock_in)
+    dt_out = datetime.combine(_REF_DATE, clock_out)
+    if dt_out < dt_in:
+        dt_out += _DAY
+    return (dt_out - dt_in).total_seconds() / 3600
+
+
+def _night_work(clock_in: time | None, clock_out: time | None, night_start: int, night_end: int) -> bool:
+    """前日・当日・翌日の深夜帯との重なりが1分以上あるか"""
+    if clock_in is None or clock_out is None:
+        return False
+    shift_start = datetime.combine(_REF_DATE, clock_in)
+    shift_end = datetime.combine(_REF_DATE, clock_out)
+    if shift_end < shift_start:
+        shift_end += _DAY
+    band_start = datetime.combine(_REF_DATE, time(night_start))
+    band_end = datetime.combine(_REF_DATE, time(night_end))
+    if band_end <= band_start:
+        band_end += _DAY
+
+    overlap = timedelta(0)
+    for days in (-1, 0, 1):
+        start = max(shift_start, band_start + days * _DAY)
+        end = min(shift_end, band_end + days * _DAY)
+        if end > start:
+            overlap += end - start
+    return overlap >= timedelta(minutes=1)
+
+
+def reference_issues(
+    clock_in: time | None,
+    clock_out: time | None,
+    break_minutes: int | None,
+    rules: dict,
+) -> list[tuple[IssueType, IssueSeverity, str]]:
+    """ベクトル化前の detect_issues の判定を R001〜R008 の順に行う"""
+    found = []
+    brk = break_minutes or 0
+    work_hours = _work_hours(clock_in, clock_out)
+
+    if clock_in is None and clock_out is not None:
+        found.append((IssueType.MISSING_CLOCK_IN, IssueSeverity.HIGH, "出勤打刻がありません（退勤打刻のみ）"))
+    if clock_in is not None and clock_out is None:
+        found.append((IssueType.MISSING_CLOCK_OUT, IssueSeverity.HIGH, "退勤打刻がありません（出勤打刻のみ）"))
+
+    if work_hours is not None:
+        if work_hours > 8 and brk < rules["break_minutes_8h"]:
+            found.append((
+                IssueType.INSUFFICIENT_BREAK, IssueSeverity.HIGH,
+                f"8時間超勤務で休憩が{rules['break_minutes_8h']}分未満です（実績: {brk}分）",
+            ))
+        elif work_hours > 6 and brk < rules["break_minutes_6h"]:
+            found.append((
+                IssueType.INSUFFICIENT_BREAK, IssueSeverity.HIGH,
+                f"6時間超勤務で休憩が{rules['break_minutes_6h']}分未満です（実績: {brk}分）",
+            ))
+
+    if work_hours is not None and work_hours > rules["daily_work_hours_alert"]:
+        found.append((
+            IssueType.OVERTIME, IssueSeverity.MEDIUM,
+            f"日次勤務時間が{rules['daily_work_hours_alert']}時間を超えています（実績: {work_hours:.1f}時間）",
+        ))
+
+    if _night_work(clock_in, clock_out, rules["night_start_hour"], rules["night_end_hour"]):
+        found.append((
+            IssueType.NIGHT_WORK, IssueSeverity.LOW,
+            f"深夜帯（{rules['night_start_hour']}時〜{rules['night_end_hour']}時）の勤務があります",
+        ))
+
+    if clock_in is not None and clock_out is not None:
+        dt_in = datetime.combine(_REF_DATE, clock_in)
+        dt_out = datetime.combine(_REF_DATE, clock_out)
+        if dt_out < dt_in and dt_out.hour > 6:
+            found.append((IssueType.INCONSISTENCY, IssueSeverity.HIGH, "退勤時刻が出勤時刻より前です"))
+
+    if work_hours is not None and brk > work_hours * 60:
+        found.append((IssueType.INCONSISTENCY, IssueSeverity.HIGH, "休憩時間が勤務時間を超えています"))
+
+    return found
+
+
+# ========================================
+# シフトの生成
+# ========================================
+
+def _time_of(seconds: int) -> time:
+    seconds %= 24 * 3600
+    return time(seconds // 3600, seconds // 60 % 60, seconds % 60)
+
+
+def _random_clock(rng: random.Random, rules: dict) -> int:
+    """打刻（0時からの秒数）。深夜帯の境界・0時前後を多めに含める"""
+    choice = rng.random()
+    if choice < 0.3:
+        hour = rng.choice([rules["night_start_hour"], rules["night_end_hour"], 0, 6, 7])
+        return (hour * 3600 + rng.choice([-61, -60, -59, -1, 0, 1, 59, 60, 61])) % (24 * 3600)
+    if choice < 0.4:
+        return rng.randrange(24 * 3600)  # 秒単位
+    return rng.randrange(24 * 60) * 60
+
+
+def _random_shift(rng: random.Random, rules: dict) -> tuple[time | None, time | None, int | None]:
+    start = _random_clock(rng, rules)
+    choice = rng.random()
+    if choice < 0.05:
+        end = start  # 出勤と退勤が同時刻
+    elif choice < 0.35:
+        # 境界付近の勤務時間（6時間・8時間・アラート時間ちょうど前後）
+        hours = rng.choice([6, 8, rules["daily_work_hours_alert"]])
+        end = start + hours * 3600 + rng.choice([-60, -1, 0, 1, 60])
+    elif choice < 0.7:
+        end = start + rng.randrange(1, 24 * 60) * 60  # 日跨ぎを含む
+    else:
+        end = _random_clock(rng, rules)  # 退勤が出勤より前（入力誤り）も含む
+    clock_in, clock_out = _time_of(start), _time_of(end)
+
+    missing = rng.random()
+    if missing < 0.08:
+        clock_in = None
+    elif missing < 0.16:
+        clock_out = None
+    elif missing < 0.18:
+        clock_in = clock_out = None
+
+    break_choice = rng.random()
+    if break_choice < 0.15:
+        break_minutes = None
+    elif break_choice < 0.5:
+        threshold = rng.choice([rules["break_minutes_6h"], rules["break_minutes_8h"]])
+        break_minutes = max(0, threshold + rng.choice([-1, 0, 1]))
+    elif break_choice < 0.6:
+        break_minutes = rng.choice([0, 24 * 60, 2000])  # 勤務時間を超える休憩
+    else:
+        break_minutes = rng.randrange(0, 181)
+    return clock_in, clock_out, break_minutes
+
+
+def _random_rules(rng: random.Random) -> dict:
+    return {
+        "break_minutes_6h": rng.randrange(0, 121),
+        "break_minutes_8h": rng.randrange(0, 121),
+        "daily_work_hours_alert": rng.randrange(1, 25),
+        # 終了 <= 開始 は日付をまたぐ深夜帯（22時〜5時など）
+        "night_start_hour": rng.randrange(0, 24),
+        "night_end_hour": rng.randrange(0, 24),
+    }
+
+
+DEFAULT_RULES = {
+    "break_minutes_6h": 45,
+    "break_minutes_8h": 60,
+    "daily_work_hours_alert": 10,
+    "night_start_hour": 22,
+    "night_end_hour": 5,
+}
+
+
+def _rule_sets() -> list[dict]:
+    rng = random.Random(20261017)
+    return [
+        DEFAULT_RULES,
+        {**DEFAULT_RULES, "night_start_hour": 0, "night_end_hour": 5},  # 日付をまたがない深夜帯
+        {**DEFAULT_RULES, "night_start_hour": 23, "night_end_hour": 0},  # 終了が0時
+        {**DEFAULT_RULES, "night_start_hour": 2, "night_end_hour": 5},
+    ] + [_random_rules(rng) for _ in range(36)]
+
+
+def _bulk_issues(shifts, rules: dict, row_params=None) -> list[list[tuple]]:
+    clock_in, clock_out, break_minutes = zip(*shifts)
+    found = detect_issues_bulk(
+        time_to_seconds(clock_in),
+        time_to_seconds(clock_out),
+        [np.nan if b is None else b for b in break_minutes],
+        rules,
+        row_params,
+    )
+    per_row: list[list[tuple]] = [[] for _ in shifts]
+    for row, issue_type, severity, description in zip(
+        found["row"], found["type"], found["severity"], found["rule_description"]
+    ):
+        per_row[row].append((IssueType(issue_type), IssueSeverity(severity), description))
+    return per_row
+
+
+@pytest.mark.parametrize("rules", _rule_sets())
+def test_bulk_and_record_match_reference(rules: dict):
+    rng = random.Random(str(sorted(rules.items())))
+    shifts = [_random_shift(rng, rules) for _ in range(500)]
+
+    bulk = _bulk_issues(shifts, rules)
+    for (clock_in, clock_out, break_minutes), bulk_found in zip(shifts, bulk):
+        expected = reference_issues(clock_in, clock_out, break_minutes, rules)
+        assert evaluate_record(clock_in, clock_out, break_minutes, rules) == expected, (clock_in, clock_out, break_minutes)
+        assert bulk_found == expected, (clock_in, clock_out, break_minutes)
+
+
+def test_bulk_row_params_match_reference():
+    """行ごとの閾値（店舗別・勤務区分別の上書き）でも各行のルールで判定した結果と一致する"""
+    rng = random.Random(7)
+    row_rules = [_random_rules(rng) for _ in range(2000)]
+    shifts = [_random_shift(rng, rules) for rules in row_rules]
+    row_params = {name: np.array([rules[name] for rules in row_rules]) for name in DEFAULT_RULES}
+
+    bulk = _bulk_issues(shifts, DEFAULT_RULES, row_params)
+    for (clock_in, clock_out, break_minutes), rules, bulk_found in zip(shifts, row_rules, bulk):
+        assert bulk_found == reference_issues(clock_in, clock_out, break_minutes, rules), (clock_in, clock_out, break_minutes, rules)
+
+
+@pytest.mark.parametrize(("clock_in", "clock_out", "night"), [
+    (time(21, 0), time(23, 0), True),    # 深夜帯の開始をまたぐ
+    (time(22, 0), time(6, 0), True),     # 日跨ぎ
+    (time(1, 0), time(3, 0), True),      # 0時以降の部分のみ
+    (time(4, 0), time(9, 0), True),
+    (time(5, 0), time(21, 59), False),   # 深夜帯の外
+    (time(21, 59), time(22, 0), False),  # 境界で接するだけ
+    (time(4, 59, 30), time(5, 0), False),  # 重なりが1分未満
+    (time(9, 0), time(9, 0), False),     # 出勤と退勤が同時刻（勤務0時間）
+])
+def test_night_band_wrap_cases(clock_in: time, clock_out: time, night: bool):
+    types = [issue_type for issue_type, _, _ in evaluate_record(clock_in, clock_out, 0, DEFAULT_RULES)]
+    assert (IssueType.NIGHT_WORK in types) is night
+    assert reference_issues(clock_in, clock_out, 0, DEFAULT_RULES) == evaluate_record(clock_in, clock_out, 0, DEFAULT_RULES)
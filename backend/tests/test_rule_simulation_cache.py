@@ -0,0 +1,117 @@
+"""シミュレーション用の勤怠キャッシュが勤怠レコードの更新で無効になることのテスト"""
+
+import asyncio
+from datetime import date, time
+
+import pytest
+import pytest_asyncio
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+import src.models  # noqa: F401  全テーブルをメタデータに登録
+from src.core.database import Base
+from src.models.attendance import AttendanceRecord, AttendanceDailyMetrics
+from src.models.employee import Employee
+from src.models.store import Organization, Store
+from src.services import rule_simulation
+
+DATE_FROM = date(2026, 9, 1)
+DATE_TO = date(2026, 9, 30)
+
+
+@pytest_asyncio.fixture
+async def db(tmp_path):
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'test.db'}")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    session_maker = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    async with session_maker() as session:
+        yield session
+    await engine.dispose()
+
+
+@pytest_asyncio.fixture
+async def record(db: AsyncSession) -> AttendanceRecord:
+    """1組織・1店舗・1従業員・勤怠1件（日次集計あり）"""
+    organization = Organization(name="org")
+    db.add(organization)
+    await db.flush()
+    store = Store(organization_id=organization.id, code="S1", name="店舗")
+    db.add(store)
+    await db.flush()
+    employee = Employee(organization_id=organization.id, store_id=store.id, employee_code="E1", name="従業員")
+    db.add(employee)
+    await db.flush()
+    record = AttendanceRecord(
+        employee_id=employee.id, date=date(2026, 9, 1),
+        clock_in=time(9, 0), clock_out=time(19, 0), break_minutes=60, work_type="day",
+    )
+    db.add(record)
+    await db.flush()
+    db.add(AttendanceDailyMetrics(
+        attendance_record_id=record.id, organization_id=organization.id, store_id=store.id,
+        employee_id=employee.id, date=record.date,
+        worked_minutes=540, break_minutes=60, night_minutes=0, overtime_minutes=60,
+    ))
+    await db.commit()
+    rule_simulation._history.clear()
+    return record
+
+
+async def _organization_id(db: AsyncSession, record: AttendanceRecord) -> str:
+    return await db.scalar(select(Employee.organization_id).where(Employee.id == record.employee_id))
+
+
+async def _version(db: AsyncSession, organization_id: str) -> tuple:
+    m = AttendanceDailyMetrics
+    conditions = [m.organization_id == organization_id, m.date >= DATE_FROM, m.date <= DATE_TO]
+    return await rule_simulation._history_version(db, conditions, organization_id, DATE_FROM, DATE_TO, None)
+
+
+@pytest.mark.asyncio
+async def test_orm_edit_changes_version_and_reloads_history(db: AsyncSession, record: AttendanceRecord):
+    organization_id = await _organization_id(db, record)
+    history = await rule_simulation.load_history(db, organization_id, DATE_FROM, DATE_TO)
+    assert history.work_types.tolist() == ["day"]
+    before = await _version(db, organization_id)
+
+    await asyncio.sleep(0.01)
+    record.work_type = "night"
+    await db.commit()
+
+    assert await _version(db, organization_id) != before
+    history = await rule_simulation.load_history(db, organization_id, DATE_FROM, DATE_TO)
+    assert history.work_types.tolist() == ["night"]
+
+
+@pytest.mark.asyncio
+async def test_core_update_changes_version(db: AsyncSession, record: AttendanceRecord):
+    organization_id = await _organization_id(db, record)
+    before = await _version(db, organization_id)
+
+    await asyncio.sleep(0.01)
+    await db.execute(
+        update(AttendanceRecord).where(AttendanceRecord.id == record.id).values(clock_out=time(20, 0))
+    )
+    await db.commit()
+
+    assert await _version(db, organization_id) != before
+
+
+@pytest.mark.asyncio
+async def test_bulk_update_by_primary_key_changes_version(db: AsyncSession, record: AttendanceRecord):
+    organization_id = await _organization_id(db, record)
+    before = await _version(db, organization_id)
+
+    await asyncio.sleep(0.01)
+    await db.execute(update(AttendanceRecord), [{"id": record.id, "break_minutes": 30}])
+    await db.commit()
+
+    assert await _version(db, organization_id) != before
+
+
+@pytest.mark.asyncio
+async def test_unchanged_data_keeps_cached_history(db: AsyncSession, record: AttendanceRecord):
+    organization_id = await _organization_id(db, record)
+    first = await rule_simulation.load_history(db, organization_id, DATE_FROM, DATE_TO)
+    assert await rule_simulation.load_history(db, organization_id, DATE_FROM, DATE_TO) is first
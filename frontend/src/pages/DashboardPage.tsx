@@ -299,7 +299,7 @@ export default function DashboardPage() {
         <CardContent>
           <Typography variant="h6" gutterBottom>
             異常一覧
-            {issuesData?.total !== undefined && (
+            {issuesData?.total != null && (
               <Typography component="span" variant="body2" color="text.secondary" ml={1}>
                 ({issuesData.total}件)
               </Typography>
@@ -375,7 +375,7 @@ export default function DashboardPage() {
             </TableContainer>
             <TablePagination
               component="div"
-              count={issuesData?.total || 0}
+              count={issuesData?.total ?? (issuesData?.nextCursor ? -1 : page * rowsPerPage + issues.length)}
               page={page}
               onPageChange={(_, newPage) => setPage(newPage)}
               rowsPerPage={rowsPerPage}
@@ -1,6 +1,7 @@
 import axios, { type AxiosError, type InternalAxiosRequestConfig } from 'axios';
 import { config } from '../config';
 import { useAuthStore } from '../stores/authStore';
+import type { IssueListResponse } from '../types';
 
 // Axiosインスタンス作成
 export const api = axios.create({
@@ -252,7 +253,7 @@ export const issuesApi = {
     dateFrom?: string;
     dateTo?: string;
   }) => {
-    const response = await api.get('/api/issues', { params });
+    const response = await api.get<IssueListResponse>('/api/issues', { params });
     return response.data;
   },
 
@@ -13,7 +13,13 @@ export type IssueType =
   | 'insufficient_break'
   | 'overtime'
   | 'night_work'
-  | 'inconsistency';
+  | 'inconsistency'
+  | 'weekly_overtime'
+  | 'monthly_overtime'
+  | 'annual_overtime'
+  | 'overtime_100h'
+  | 'overtime_average_80h'
+  | 'consecutive_workdays';
 
 // 異常の重要度
 export type IssueSeverity = 'high' | 'medium' | 'low';
@@ -160,6 +166,15 @@ export interface PaginatedResponse<T> {
   totalPages: number;
 }
 
+// 異常一覧（total_mode=none の場合 total は null。nextCursor は次ページがなければ null）
+export interface IssueListResponse {
+  items: Issue[];
+  total: number | null;
+  page: number;
+  pageSize: number;
+  nextCursor: string | null;
+}
+
 export interface IssueFilter {
   storeId?: string;
   employeeId?: string;
@@ -203,6 +218,12 @@ export const ISSUE_TYPE_LABELS: Record<IssueType, string> = {
   overtime: '長時間労働',
   night_work: '深夜勤務',
   inconsistency: '不整合',
+  weekly_overtime: '週40時間超',
+  monthly_overtime: '月45時間超',
+  annual_overtime: '年360時間超',
+  overtime_100h: '月100時間以上',
+  overtime_average_80h: '複数月平均80時間超',
+  consecutive_workdays: '連続勤務',
 };
 
 export const SEVERITY_LABELS: Record<IssueSeverity, string> = {